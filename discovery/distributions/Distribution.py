@@ -12,7 +12,7 @@ import subprocess
 import yaml
 
 from mill import defaults, factory
-from discovery import architectures
+from discovery import architectures, repos
 
 log = logging.getLogger(__name__)
 
@@ -79,6 +79,15 @@ class Distribution(factory.Factory, defaults.DefaultsFileInfo):
 
   ####################################################################
   # Public factory-behavior methods
+  ####################################################################
+  @classmethod
+  def cacheAge(cls, architecture = None):
+    """Returns the age, in seconds, of the cached repos from which the
+    distribution's roots for the architecture are determined or None if
+    they are not (completely) cached.
+    """
+    return cls._repo().cacheAge(architecture)
+
   ####################################################################
   @classmethod
   def categoryMappingChoices(cls):
@@ -295,13 +304,17 @@ class Distribution(factory.Factory, defaults.DefaultsFileInfo):
 
   ####################################################################
   @classmethod
-  def _mapping(cls, option = None):
+  def _mapping(cls, option = None, deadline = None):
     """'option', if present, is a tuple of (category, architecture) - both may
     be None - which indicates what mapping to utilize.
 
     A (category, architecture) of (None, None) is equivalent to not specifying
     an option, for which the default is to use the default category and
     architecture.
+
+    'deadline', if not None, is the time (as returned by time.time()) by which
+    repo discovery must complete.  If discovery is cut short the mapping is a
+    repos.PartialResult (and is not retained).
     """
     (category, architecture) = cls._decodeOption(option)
 
@@ -309,7 +322,7 @@ class Distribution(factory.Factory, defaults.DefaultsFileInfo):
                 "latest"              : cls._mappingLatest,
                 "nightly"             : cls._mappingNightly }
 
-    return mapping[category](architecture)
+    return mapping[category](architecture, deadline)
 
   ####################################################################
   @classmethod
@@ -334,9 +347,11 @@ class Distribution(factory.Factory, defaults.DefaultsFileInfo):
     minimumVersion = float(major if minor is None
                                   else "{0}.{1}".format(major, minor))
 
-    roots = dict([(key, value) for (key, value) in roots.items()
-                                if float(key) >= minimumVersion])
-    return roots
+    allowable = dict([(key, value) for (key, value) in roots.items()
+                                    if float(key) >= minimumVersion])
+    if isinstance(roots, repos.PartialResult):
+      allowable = repos.PartialResult(allowable)
+    return allowable
 
   ####################################################################
   @classmethod
@@ -353,11 +368,12 @@ class Distribution(factory.Factory, defaults.DefaultsFileInfo):
 
   ####################################################################
   @classmethod
-  def _latestRoots(cls, architecture):
+  def _latestRoots(cls, architecture, deadline = None):
     """Returns the available latest roots for the specified architecture
     filtered by the limits specified in the defaults file.
     """
-    return cls._allowableRoots(cls._repo().availableLatestRoots(architecture))
+    return cls._allowableRoots(
+                    cls._repo(deadline).availableLatestRoots(architecture))
 
   ####################################################################
   @classmethod
@@ -424,59 +440,59 @@ class Distribution(factory.Factory, defaults.DefaultsFileInfo):
 
   ####################################################################
   @classmethod
-  def _mappingLatest(cls, architecture):
+  def _mappingLatest(cls, architecture, deadline = None):
     if cls.__mappingLatest is None:
       cls.__mappingLatest = {}
 
     if architecture not in cls.__mappingLatest:
       log.debug("creating {0} 'latest' classes".format(architecture))
 
-      cls.__mappingLatest[architecture] = (
-        cls._makeDistributionMapping(
-                                architecture,
-                                dict([(klass,
-                                       klass._latestRoots(architecture))
-                                      for klass in
-                                        super(Distribution,
-                                              cls)._mapping().values()])))
+      roots = dict([(klass, klass._latestRoots(architecture, deadline))
+                    for klass in super(Distribution, cls)._mapping().values()])
+      mapping = cls._makeDistributionMapping(architecture, roots)
+      if any([isinstance(x, repos.PartialResult) for x in roots.values()]):
+        log.warn("{0} 'latest' repo discovery incomplete at deadline"
+                  .format(architecture))
+        return repos.PartialResult(mapping)
+      cls.__mappingLatest[architecture] = mapping
     return cls.__mappingLatest[architecture]
 
   ####################################################################
   @classmethod
-  def _mappingNightly(cls, architecture):
+  def _mappingNightly(cls, architecture, deadline = None):
     if cls.__mappingNightly is None:
       cls.__mappingNightly = {}
 
     if architecture not in cls.__mappingNightly:
       log.debug("creating {0} 'nightly' classes".format(architecture))
 
-      cls.__mappingNightly[architecture] = (
-        cls._makeDistributionMapping(
-                                architecture,
-                                dict([(klass,
-                                       klass._nightlyRoots(architecture))
-                                      for klass in
-                                        super(Distribution,
-                                              cls)._mapping().values()])))
+      roots = dict([(klass, klass._nightlyRoots(architecture, deadline))
+                    for klass in super(Distribution, cls)._mapping().values()])
+      mapping = cls._makeDistributionMapping(architecture, roots)
+      if any([isinstance(x, repos.PartialResult) for x in roots.values()]):
+        log.warn("{0} 'nightly' repo discovery incomplete at deadline"
+                  .format(architecture))
+        return repos.PartialResult(mapping)
+      cls.__mappingNightly[architecture] = mapping
     return cls.__mappingNightly[architecture]
 
   ####################################################################
   @classmethod
-  def _mappingReleased(cls, architecture):
+  def _mappingReleased(cls, architecture, deadline = None):
     if cls.__mappingReleased is None:
       cls.__mappingReleased = {}
 
     if architecture not in cls.__mappingReleased:
       log.debug("creating {0} 'released' classes".format(architecture))
 
-      cls.__mappingReleased[architecture] = (
-        cls._makeDistributionMapping(
-                                architecture,
-                                dict([(klass,
-                                       klass._releasedRoots(architecture))
-                                      for klass in
-                                        super(Distribution,
-                                              cls)._mapping().values()])))
+      roots = dict([(klass, klass._releasedRoots(architecture, deadline))
+                    for klass in super(Distribution, cls)._mapping().values()])
+      mapping = cls._makeDistributionMapping(architecture, roots)
+      if any([isinstance(x, repos.PartialResult) for x in roots.values()]):
+        log.warn("{0} 'released' repo discovery incomplete at deadline"
+                  .format(architecture))
+        return repos.PartialResult(mapping)
+      cls.__mappingReleased[architecture] = mapping
     return cls.__mappingReleased[architecture]
 
   ####################################################################
@@ -486,26 +502,28 @@ class Distribution(factory.Factory, defaults.DefaultsFileInfo):
 
   ####################################################################
   @classmethod
-  def _nightlyRoots(cls, architecture):
+  def _nightlyRoots(cls, architecture, deadline = None):
     """Returns the available nightly roots for the specified architecture
     filtered by the limits specified in the defaults file.
     """
-    return cls._allowableRoots(cls._repo().availableNightlyRoots(architecture))
+    return cls._allowableRoots(
+                    cls._repo(deadline).availableNightlyRoots(architecture))
 
   ####################################################################
   @classmethod
-  def _releasedRoots(cls, architecture):
+  def _releasedRoots(cls, architecture, deadline = None):
     """Returns the available released roots for the specified architecture
     filtered by the limits specified in the defaults file.
     """
-    return cls._allowableRoots(cls._repo().availableRoots(architecture))
+    return cls._allowableRoots(
+                    cls._repo(deadline).availableRoots(architecture))
 
   ####################################################################
   @classmethod
-  def _repo(cls):
+  def _repo(cls, deadline = None):
     """Returns an instance of the repo class associated with the distribution.
     """
-    return cls._repoClass()()
+    return cls._repoClass()(deadline = deadline)
 
   ####################################################################
   @classmethod
@@ -8,7 +8,7 @@ from __future__ import print_function
 import argparse
 
 from mill import command
-from discovery import architectures
+from discovery import architectures, repos
 from .Distribution import Distribution, DistributionUnknownCombinationException
 
 ########################################################################
@@ -54,6 +54,12 @@ class DistrosCommand(command.Command):
                         choices = names,
                         default = default)
 
+    parser.add_argument("--offline",
+                        help = "use the cached repos regardless of their" \
+                                " age and make no network requests" \
+                                "; the age of each distribution's cached" \
+                                " repos is reported",
+                        action = "store_true")
 
     parents = super(DistrosCommand, cls).parserParents()
     parents.append(parser)
@@ -65,6 +71,9 @@ class DistrosCommand(command.Command):
   def run(self):
     all = not (self.args.latest or self.args.nightly or self.args.released)
 
+    if self.args.offline:
+      repos.Repository.useOffline()
+
     root = self._distributionRoot
 
     command.CommandShell(root).printChoices()
@@ -79,7 +88,10 @@ class DistrosCommand(command.Command):
       for choice in root.choices():
         try:
           instance = root.makeItem(choice, self.args, self.args.architecture)
-          print("\t\t{0}: {1}".format(instance.name(), instance.repoRoot))
+          print("\t\t{0}: {1}{2}".format(instance.name(),
+                                         instance.repoRoot,
+                                         self.__cacheAgeDescription(
+                                                                instance)))
         except DistributionUnknownCombinationException:
           pass
 
@@ -90,7 +102,10 @@ class DistrosCommand(command.Command):
           instance = root.makeItemLatest(choice,
                                          self.args,
                                          self.args.architecture)
-          print("\t\t{0}: {1}".format(instance.name(), instance.repoRoot))
+          print("\t\t{0}: {1}{2}".format(instance.name(),
+                                         instance.repoRoot,
+                                         self.__cacheAgeDescription(
+                                                                instance)))
         except DistributionUnknownCombinationException:
           pass
 
@@ -101,7 +116,10 @@ class DistrosCommand(command.Command):
           instance = root.makeItemNightly(choice,
                                           self.args,
                                           self.args.architecture)
-          print("\t\t{0}: {1}".format(instance.name(), instance.repoRoot))
+          print("\t\t{0}: {1}{2}".format(instance.name(),
+                                         instance.repoRoot,
+                                         self.__cacheAgeDescription(
+                                                                instance)))
         except DistributionUnknownCombinationException:
           pass
 
@@ -145,3 +163,10 @@ class DistrosCommand(command.Command):
   ####################################################################
   # Private instance-behavior methods
   ####################################################################
+  def __cacheAgeDescription(self, instance):
+    if not self.args.offline:
+      return ""
+    age = instance.cacheAge(self.args.architecture)
+    if age is None:
+      return " (not completely cached)"
+    return " (cached {0} minute(s) ago)".format(int(age // 60))
@@ -0,0 +1,372 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import asyncio
+import contextlib
+import logging
+import socket
+import time
+import weakref
+
+from http import client as httplib
+from urllib import parse as urlparse
+
+from .CircuitBreaker import CircuitBreaker
+from .CrawlArchive import CrawlArchive
+from .TransportPolicy import TransportPolicy
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class _AsyncConnection(object):
+  """HTTP/1.1 connection, to netloc, over an asyncio stream.
+  """
+  ####################################################################
+  # Public methods
+  ####################################################################
+  async def close(self):
+    self.writer.close()
+    try:
+      await self.writer.wait_closed()
+    except (OSError, asyncio.IncompleteReadError):
+      # The connection was reset; it is closed regardless.
+      pass
+
+  ####################################################################
+  def isStale(self):
+    # An idle connection is stale if the server has closed it.
+    return self.writer.is_closing() or self.reader.at_eof()
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, netloc, reader, writer):
+    super(_AsyncConnection, self).__init__()
+    self.netloc = netloc
+    self.reader = reader
+    self.writer = writer
+    # Set to True once the connection has been used for a request; a
+    # request failure on a reused connection is most likely the server
+    # having closed it while it was idle.
+    self.reused = False
+
+######################################################################
+######################################################################
+class AsyncCrawler(object):
+  """Asynchronous retrieval engine for use within an asyncio event loop.
+
+  The number of requests concurrently in progress, across all users of the
+  crawler within an event loop, is limited to the crawler's concurrency.
+  Concurrent retrievals of the same key share a single retrieval and
+  requests are subject to the crawler's circuit breaker and transport
+  policy.
+
+  Within a session (see session()) connections are persistent (keep-alive):
+  at most the crawler's concurrency of idle connections are retained per
+  network location until the event loop's last session ends.
+  """
+  # Exceptions indicative of the server having closed a kept-alive
+  # connection.
+  __STALE_EXCEPTIONS = (ConnectionError, asyncio.IncompleteReadError)
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  async def gather(self, keys, retrieve):
+    """Concurrently awaits retrieve(key) for each of the keys.
+    """
+    await asyncio.gather(*[self.__retrieveOnce(key, retrieve)
+                            for key in keys])
+
+  ####################################################################
+  async def request(self, netloc, method, path, headers = None,
+                    timeout = None):
+    """Performs the specified request returning a tuple of the response
+    status, the response headers (as a dictionary with lower-cased keys)
+    and the response body.
+
+    The request is made once permitted by the transport policy's limits on
+    requests in flight to, and the rate of requests to, the network location.
+    The timeout, if not None, bounds the wait for a request in flight to
+    complete and, less that wait, caps both the policy's connect and read
+    timeouts; a wait or rate limit delay exceeding it is reported as a
+    timeout.
+
+    A timeout is reported as socket.timeout and a truncated response as
+    http.client.IncompleteRead in the same manner as a synchronous request.
+    If the crawler has an archive the exchange is recorded in it or, in
+    replay mode, the archived response is returned without any network
+    access.
+
+    Raises CircuitOpenException if the network location's circuit is open.
+    """
+    if (self.__archive is not None) and self.__archive.isReplaying():
+      return self.__archive.replay(netloc, method, path)
+    if self.__archive is not None:
+      headers = self.__archive.requestHeaders(headers)
+
+    (semaphore, _, hostSemaphores, _) = self.__loopState()
+    if netloc not in hostSemaphores:
+      maxInFlight = self.__transportPolicy.maxInFlight(netloc)
+      hostSemaphores[netloc] = (None if maxInFlight is None
+                                  else asyncio.Semaphore(maxInFlight))
+    hostSemaphore = hostSemaphores[netloc]
+
+    if hostSemaphore is not None:
+      # Awaiting a request slot counts against the timeout.
+      start = time.time()
+      try:
+        await asyncio.wait_for(hostSemaphore.acquire(), timeout)
+      except asyncio.TimeoutError:
+        raise socket.timeout("timed out awaiting a request slot for {0}"
+                              .format(netloc))
+      if timeout is not None:
+        timeout = max(0, timeout - (time.time() - start))
+    timeouts = self.__transportPolicy.timeouts(netloc)
+    if timeout is not None:
+      timeouts = tuple([min(timeout, x) for x in timeouts])
+    try:
+      delay = self.__transportPolicy.delay(netloc)
+      if (timeout is not None) and (delay > timeout):
+        raise socket.timeout("rate limit delay of {0:.2f} second(s) for {1}"
+                             " exceeds timeout".format(delay, netloc))
+      if delay > 0:
+        log.debug("delaying request to {0} {1:.2f} second(s) for rate limit"
+                    .format(netloc, delay))
+        await asyncio.sleep(delay)
+      with self.__circuitBreaker.attempt(netloc):
+        async with semaphore:
+          try:
+            response = await self.__mappedRequest(netloc, method, path,
+                                                  headers, timeouts)
+          except CrawlArchive.failureExceptions as ex:
+            if self.__archive is not None:
+              self.__archive.recordFailure(netloc, method, path, ex)
+            raise
+          if self.__archive is not None:
+            self.__archive.record(netloc, method, path, *response)
+          return response
+    finally:
+      if hostSemaphore is not None:
+        hostSemaphore.release()
+
+  ####################################################################
+  @contextlib.asynccontextmanager
+  async def session(self):
+    """Asynchronous context manager within which connections made in the
+    running event loop are kept alive; on exit from the loop's last session
+    its idle connections are closed.
+    """
+    loopState = self.__loopState()
+    loopState[3]["sessions"] += 1
+    try:
+      yield
+    finally:
+      loopState[3]["sessions"] -= 1
+      if loopState[3]["sessions"] == 0:
+        idle = loopState[3]["connections"]
+        loopState[3]["connections"] = {}
+        await asyncio.gather(*[connection.close()
+                                for connections in idle.values()
+                                  for connection in connections])
+
+  ####################################################################
+  async def sleep(self, seconds):
+    await asyncio.sleep(seconds)
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, concurrency = 16, circuitBreaker = None,
+               transportPolicy = None, archive = None):
+    super(AsyncCrawler, self).__init__()
+    self.__concurrency = concurrency
+    self.__circuitBreaker = (CircuitBreaker() if circuitBreaker is None
+                                              else circuitBreaker)
+    self.__transportPolicy = (TransportPolicy() if transportPolicy is None
+                                                else transportPolicy)
+    # CrawlArchive in which requests are recorded or from which they are
+    # replayed, if any.
+    self.__archive = archive
+    # Per event loop tuple of (semaphore, in-progress retrievals by key,
+    # per netloc semaphores, the number of sessions and, keyed by netloc,
+    # idle connections).
+    self.__loopStates = weakref.WeakKeyDictionary()
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  async def __acquire(self, netloc, connectTimeout):
+    idle = self.__loopState()[3]["connections"].get(netloc, [])
+    while len(idle) > 0:
+      connection = idle.pop()
+      if not connection.isStale():
+        return connection
+      await connection.close()
+    return await self.__connect(netloc, connectTimeout)
+
+  ####################################################################
+  async def __connect(self, netloc, connectTimeout):
+    parsed = urlparse.urlsplit("//{0}".format(netloc))
+    (reader, writer) = await asyncio.wait_for(
+                              asyncio.open_connection(parsed.hostname,
+                                                      parsed.port or 80),
+                              connectTimeout)
+    return _AsyncConnection(netloc, reader, writer)
+
+  ####################################################################
+  def __loopState(self):
+    loop = asyncio.get_running_loop()
+    if loop not in self.__loopStates:
+      self.__loopStates[loop] = (asyncio.Semaphore(self.__concurrency), {}, {},
+                                 { "sessions" : 0, "connections" : {} })
+    return self.__loopStates[loop]
+
+  ####################################################################
+  async def __mappedRequest(self, netloc, method, path, headers, timeouts):
+    # Performs the request reporting failures as a synchronous request
+    # would.
+    try:
+      return await self.__request(netloc, method, path, headers, timeouts)
+    except asyncio.TimeoutError:
+      raise socket.timeout("timed out requesting {0}{1}".format(netloc, path))
+    except asyncio.IncompleteReadError as ex:
+      raise httplib.IncompleteRead(ex.partial, ex.expected)
+
+  ####################################################################
+  async def __readBody(self, reader, headers, timeout):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+      chunks = []
+      while True:
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        size = int(line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+          # Discard any trailers.
+          while ((await asyncio.wait_for(reader.readline(), timeout))
+                  not in (b"\r\n", b"\n", b"")):
+            pass
+          break
+        chunks.append(await asyncio.wait_for(reader.readexactly(size),
+                                             timeout))
+        await asyncio.wait_for(reader.readline(), timeout)
+      return b"".join(chunks)
+
+    if "content-length" in headers:
+      return await asyncio.wait_for(
+                          reader.readexactly(int(headers["content-length"])),
+                          timeout)
+
+    chunks = []
+    while True:
+      data = await asyncio.wait_for(reader.read(8192), timeout)
+      if len(data) == 0:
+        break
+      chunks.append(data)
+    return b"".join(chunks)
+
+  ####################################################################
+  async def __release(self, connection, keepAlive):
+    sessions = self.__loopState()[3]
+    idle = sessions["connections"].setdefault(connection.netloc, [])
+    if (keepAlive and (sessions["sessions"] > 0)
+        and (len(idle) < self.__concurrency)):
+      connection.reused = True
+      idle.append(connection)
+    else:
+      await connection.close()
+
+  ####################################################################
+  async def __request(self, netloc, method, path, headers, timeouts):
+    # Each read is subject to the read timeout as with a synchronous
+    # request.
+    (connectTimeout, readTimeout) = timeouts
+    connection = await self.__acquire(netloc, connectTimeout)
+    try:
+      try:
+        (status, responseHeaders, statusLine) = await self.__response(
+                                                              connection,
+                                                              method,
+                                                              path,
+                                                              headers,
+                                                              readTimeout)
+      except self.__STALE_EXCEPTIONS:
+        if not connection.reused:
+          raise
+        # The server closed the idle connection; retry once on a new one.
+        log.debug("reused connection to {0} closed by server; reconnecting"
+                    .format(netloc))
+        await connection.close()
+        connection = await self.__connect(netloc, connectTimeout)
+        (status, responseHeaders, statusLine) = await self.__response(
+                                                              connection,
+                                                              method,
+                                                              path,
+                                                              headers,
+                                                              readTimeout)
+
+      body = b""
+      delimited = True
+      if (method != "HEAD") and (status not in (204, 304)) and (status >= 200):
+        delimited = (("content-length" in responseHeaders)
+                     or (responseHeaders.get("transfer-encoding", "").lower()
+                          == "chunked"))
+        body = await self.__readBody(connection.reader, responseHeaders,
+                                     readTimeout)
+    except BaseException:
+      await connection.close()
+      raise
+
+    # The connection is kept alive if the response was delimited (rather
+    # than by the connection's close) and the server has not indicated it
+    # will close the connection.
+    closing = responseHeaders.get("connection", "").lower()
+    await self.__release(connection,
+                         delimited
+                           and (closing != "close")
+                           and ((statusLine[0] != "HTTP/1.0")
+                                or (closing == "keep-alive")))
+    return (status, responseHeaders, body)
+
+  ####################################################################
+  async def __response(self, connection, method, path, headers, timeout):
+    # Sends the request on the connection returning a tuple of the response
+    # status, headers and status line (as a list of its fields).
+    lines = ["{0} {1} HTTP/1.1".format(method, path),
+             "Host: {0}".format(connection.netloc)]
+    lines.extend(["{0}: {1}".format(key, value)
+                    for (key, value) in ({} if headers is None
+                                            else headers).items()])
+    connection.writer.write("{0}\r\n\r\n".format("\r\n".join(lines))
+                              .encode("latin-1"))
+    await asyncio.wait_for(connection.writer.drain(), timeout)
+
+    statusLine = (await asyncio.wait_for(connection.reader.readline(),
+                                         timeout)
+                  ).decode("latin-1").split(None, 2)
+    if (len(statusLine) < 2) or (not statusLine[0].startswith("HTTP/")):
+      raise ConnectionResetError("invalid status line from {0}"
+                                  .format(connection.netloc))
+    status = int(statusLine[1])
+
+    responseHeaders = {}
+    while True:
+      line = (await asyncio.wait_for(connection.reader.readline(), timeout)
+              ).decode("latin-1")
+      if line in ("\r\n", "\n", ""):
+        break
+      (key, _, value) = line.partition(":")
+      responseHeaders[key.strip().lower()] = value.strip()
+
+    return (status, responseHeaders, statusLine)
+
+  ####################################################################
+  async def __retrieveOnce(self, key, retrieve):
+    (_, inProgress, _, _) = self.__loopState()
+    if key not in inProgress:
+      inProgress[key] = asyncio.ensure_future(retrieve(key))
+      inProgress[key].add_done_callback(
+        lambda future: inProgress.pop(key, None))
+    await asyncio.shield(inProgress[key])
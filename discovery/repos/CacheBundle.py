@@ -0,0 +1,136 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class CacheBundleException(Exception):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, msg, *args, **kwargs):
+    super(CacheBundleException, self).__init__(*args, **kwargs)
+    self._msg = msg
+
+  ######################################################################
+  def __str__(self):
+    return self._msg
+
+######################################################################
+######################################################################
+class CacheBundle(object):
+  """Portable bundle of the cached results of repo discovery, as exported
+  by Repository.exportCache, of any number of repo classes held in a single
+  gzip compressed file.
+
+  The bundle is independent of the cache storage from which it was
+  exported; it may be imported (see Repository.importCache) into a cache
+  using any storage.
+  """
+  # The version of the bundle's format.
+  __VERSION = 1
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def classNames(self):
+    """Returns a list of the names of the repo classes in the bundle.
+    """
+    return sorted(self.__entries.keys())
+
+  ####################################################################
+  def created(self):
+    """Returns the time (per time.time()) at which the bundle was saved or
+    None if it has not been.
+    """
+    return self.__created
+
+  ####################################################################
+  def entries(self, className):
+    """Returns the list of the cached results of the named repo class in
+    the bundle.
+    """
+    return list(self.__entries.get(className, []))
+
+  ####################################################################
+  def load(self):
+    """Reads the bundle from its file replacing its contents.  Raises
+    CacheBundleException if the file cannot be read or is of an unsupported
+    version.
+    """
+    try:
+      with gzip.open(self.__path, "rb") as bundleFile:
+        bundle = json.loads(bundleFile.read().decode("UTF-8"))
+    except (IOError, OSError, ValueError) as ex:
+      raise CacheBundleException("could not read cache bundle {0}: {1}"
+                                  .format(self.__path, ex))
+    if (not isinstance(bundle, dict)) \
+        or (bundle.get("version") != self.__VERSION) \
+        or (not isinstance(bundle.get("classes"), dict)):
+      raise CacheBundleException("unsupported cache bundle version in {0}"
+                                  .format(self.__path))
+    self.__created = bundle.get("created")
+    self.__entries = dict([(className, entries)
+                            for (className, entries)
+                              in bundle["classes"].items()
+                            if isinstance(entries, list)])
+    log.debug("loaded cache bundle: {0}".format(self.__path))
+
+  ####################################################################
+  def path(self):
+    return self.__path
+
+  ####################################################################
+  def save(self):
+    """Atomically writes the bundle to its file.
+    """
+    self.__created = time.time()
+    bundle = { "version" : self.__VERSION,
+               "created" : self.__created,
+               "classes" : self.__entries }
+    directory = os.path.dirname(self.__path)
+    (fd, temporary) = tempfile.mkstemp(
+                        prefix = ".{0}.".format(os.path.basename(self.__path)),
+                        dir = directory)
+    try:
+      with os.fdopen(fd, "wb") as temporaryFile:
+        with gzip.GzipFile(fileobj = temporaryFile, mode = "wb") as bundleFile:
+          bundleFile.write(json.dumps(bundle,
+                                      separators = (",", ":"),
+                                      sort_keys = True).encode("UTF-8"))
+      os.chmod(temporary, 0o644)
+      os.rename(temporary, self.__path)
+    except:
+      try:
+        os.unlink(temporary)
+      except OSError:
+        pass
+      raise
+    log.debug("saved cache bundle: {0}".format(self.__path))
+
+  ####################################################################
+  def setEntries(self, className, entries):
+    """Sets the cached results of the named repo class in the bundle.
+    """
+    self.__entries[className] = list(entries)
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, path):
+    super(CacheBundle, self).__init__()
+    self.__path = os.path.abspath(os.path.expanduser(path))
+    self.__created = None
+    # The cached results keyed by repo class name.
+    self.__entries = {}
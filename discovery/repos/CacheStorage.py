@@ -0,0 +1,167 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class CacheStorageBusyException(Exception):
+  """Raised in lieu of waiting on the lock of a cache entry held by another.
+  """
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, name, *args, **kwargs):
+    super(CacheStorageBusyException, self).__init__(*args, **kwargs)
+    self._msg = "cache entry locked: {0}".format(name)
+
+  ######################################################################
+  def __str__(self):
+    return self._msg
+
+######################################################################
+######################################################################
+class CacheEntry(object):
+  """A cache entry opened, and locked, via CacheStorage.open.  The lock is
+  released on close (or exit of the entry as a context).
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def close(self):
+    raise NotImplementedError
+
+  ####################################################################
+  def mtime(self):
+    """Returns the time (per time.time()) at which the entry's roots were
+    saved or None if it has none.
+    """
+    raise NotImplementedError
+
+  ####################################################################
+  def roots(self):
+    """Returns the roots saved to the entry or None if it has none.
+    """
+    raise NotImplementedError
+
+  ####################################################################
+  def save(self, roots, mtime = None):
+    """Saves the roots to the entry, which must be locked exclusively,
+    replacing any it has.  If mtime is not None it is recorded as the time
+    at which the roots were saved.
+    """
+    raise NotImplementedError
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __enter__(self):
+    return self
+
+  ####################################################################
+  def __exit__(self, exceptionType, exception, traceback):
+    self.close()
+    return False
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _parse(self, data, source):
+    """Returns the roots serialized as data or None if data is None or
+    cannot be read (e.g., is torn by a crash while being written), in which
+    case the entry is to be scanned anew.
+    """
+    if data is None:
+      return None
+    try:
+      roots = json.loads(data)
+    except ValueError:
+      roots = None
+    if not isinstance(roots, dict):
+      log.warn("discarding unreadable cache entry: {0}".format(source))
+      return None
+    return roots
+
+######################################################################
+######################################################################
+class CacheStorage(object):
+  """Storage of the cached results of repo discovery as named entries, each
+  holding the roots (as serialized to JSON) saved to it and when they were
+  saved.
+
+  Entries are locked for the duration of their use: shared by those which
+  read them, so that readers proceed concurrently, and exclusively by those
+  which update them.  Scanning an entry anew is serialized by the entry's
+  claim, rather than its lock, so that the entry is scanned by at most one
+  process (or thread) at a time while its readers continue to use its
+  current roots; the scan's result atomically replaces them.
+
+  The durability of updates is one of:
+    FSYNC: each update is synced to stable storage as it is made
+    BATCH: updates are synced together on sync()
+    NONE:  updates are never explicitly synced
+  An entry which is unreadable (e.g., torn by a crash) has no roots.
+  """
+  FSYNC = "fsync"
+  BATCH = "batch"
+  NONE = "none"
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def claim(self, name, blocking = True):
+    """Context manager providing True once the claim to scan the named entry
+    anew is acquired or, if blocking is False and another holds it, False;
+    the claim is held, by at most one at a time, until exit.  The claim is
+    independent of the entry's lock.
+    """
+    raise NotImplementedError
+
+  ####################################################################
+  def durability(self):
+    return self.__durability
+
+  ####################################################################
+  def mtime(self, name):
+    """Returns the time (per time.time()) at which the named entry's roots
+    were saved or None if it has none (e.g., is unreadable), as would the
+    entry's mtime().  The entry is not locked.
+    """
+    raise NotImplementedError
+
+  ####################################################################
+  def open(self, name, blocking = True, shared = False):
+    """Returns the named CacheEntry, created if need be, once its lock is
+    acquired; exclusively unless shared is True.  If blocking is False
+    raises CacheStorageBusyException rather than waiting on the lock.
+    """
+    raise NotImplementedError
+
+  ####################################################################
+  def replace(self, name, roots, mtime = None):
+    """Atomically replaces the named entry's roots.  If mtime is not None it
+    is recorded as the time at which the roots were saved.
+    """
+    with self.open(name) as entry:
+      entry.save(roots, mtime)
+
+  ####################################################################
+  def sync(self):
+    """Syncs the updates made since the last sync to stable storage; of no
+    effect unless the durability is BATCH.
+    """
+    pass
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, durability = FSYNC):
+    super(CacheStorage, self).__init__()
+    self.__durability = durability
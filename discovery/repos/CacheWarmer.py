@@ -0,0 +1,125 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import errno
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+from discovery import architectures
+from .Repository import Repository
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class CacheWarmer(object):
+  """Keeps the cached results of repo discovery warm for every combination
+  of repo choice and architecture (an entry), across all categories.
+
+  An entry's cache files are refreshed (see Repository.refreshCache) once
+  any of them is due; that is, shortly before it expires.  Each entry is
+  scheduled at a random time in the first half of the interval between
+  when it is due and when it expires so that the refreshes of entries
+  which expire together are spread out.
+
+  When the cache files of each entry were last refreshed, along with when
+  they are next due and expire, is saved in warmer.json in the repo's cache
+  directory keyed by architecture then cache file name.
+  """
+  # Seconds after which an entry whose refresh failed (or produced no
+  # cached results) is retried.
+  __RETRY = 300
+
+  # The minimum number of seconds between refreshes of an entry.
+  __MINIMUM_INTERVAL = 60
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def refresh(self, choice, architecture):
+    """Refreshes those cache files of the entry which are due returning the
+    time (per time.time()) at which it is next to be refreshed.
+    """
+    now = time.time()
+    try:
+      repository = Repository.makeItem(choice, self.__args)
+      status = repository.refreshCache(architecture)
+      self.__saveStatus(repository, architecture, status)
+    except Exception as ex:
+      log.warn("exception refreshing {0} {1} repos: {2}"
+                .format(choice, architecture, ex))
+      return now + self.__RETRY
+
+    if any([entry["due"] is None for entry in status.values()]):
+      return now + self.__RETRY
+    scheduled = min([entry["due"]
+                      + random.uniform(0, (entry["expires"] - entry["due"])
+                                          / 2.0)
+                      for entry in status.values()])
+    log.info("{0} {1} repos refreshed; next refresh at {2}"
+              .format(choice, architecture, time.ctime(scheduled)))
+    return max(scheduled, now + self.__MINIMUM_INTERVAL)
+
+  ####################################################################
+  def run(self):
+    """Refreshes the entries as they come due until interrupted (e.g., via
+    Ctrl-C), then returns.
+    """
+    schedule = dict([((choice, architecture), 0)
+                      for choice in sorted(Repository.choices())
+                        for architecture
+                          in sorted(architectures.Architecture.choices())])
+    try:
+      while True:
+        (entry, scheduled) = min(schedule.items(),
+                                 key = lambda item: item[1])
+        delay = scheduled - time.time()
+        if delay > 0:
+          time.sleep(delay)
+        schedule[entry] = self.refresh(*entry)
+    except KeyboardInterrupt:
+      log.info("cache warmer interrupted; stopping")
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, args = None):
+    super(CacheWarmer, self).__init__()
+    self.__args = args
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __saveStatus(self, repository, architecture, status):
+    path = os.path.join(repository.cacheDirectory(), "warmer.json")
+    try:
+      with open(path) as statusFile:
+        saved = json.load(statusFile)
+    except (IOError, OSError, ValueError):
+      saved = {}
+    saved[architecture] = status
+
+    try:
+      os.makedirs(repository.cacheDirectory(), 0o700)
+    except OSError as ex:
+      if ex.errno != errno.EEXIST:
+        raise
+    (fd, temporary) = tempfile.mkstemp(prefix = ".warmer.json.",
+                                       dir = repository.cacheDirectory())
+    try:
+      os.fchmod(fd, 0o640)
+      with os.fdopen(fd, "w") as temporaryFile:
+        json.dump(saved, temporaryFile, indent = 2, sort_keys = True)
+      os.rename(temporary, path)
+    except:
+      try:
+        os.unlink(temporary)
+      except OSError:
+        pass
+      raise
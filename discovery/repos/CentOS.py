@@ -3,6 +3,7 @@
 #
 # Copyright Red Hat
 #
+import functools
 import re
 
 from .Repository import Repository
@@ -14,6 +15,10 @@ class CentOS(Repository):
   __CENTOS_MINIMUM_MAJOR = 8
   __CENTOS_MINIMUM_MINOR = 3
 
+  # Patterns matched against the names of listing directory entries.
+  __MAJOR_PATTERN = re.compile(r"(?i)centos-(\d+)$")
+  __MINOR_PATTERN = re.compile(r"(\d+)\.(\d+)(|\.\d+)$")
+
   # Available via Factory.
   _available = True
 
@@ -23,13 +28,13 @@ class CentOS(Repository):
   def _filterRepos(self, repos, architecture):
     repos = super(CentOS, self)._filterRepos(repos, architecture)
 
-    regex = re.compile(r"(?i)<a\s+href=\"({0}/)\">\1</a>".format(architecture))
-
-    return dict([ (key, value)
-      for (key, value) in repos.items()
-        if re.search(regex,
-                     self._uri_contents(
-                      "{0}/{1}".format(value, "BaseOS"))) is not None ])
+    # The listing is only read as far as the architecture's subdir.
+    subdir = architecture.lower()
+    return self._filterReposConcurrently(
+      repos,
+      lambda key, value: any(entry.isDir and (entry.name.lower() == subdir)
+                             for entry in self._uri_streamed_entries(
+                              "{0}/{1}".format(value, "BaseOS"))))
 
   ####################################################################
   def _findAgnosticLatestRoots(self, architecture):
@@ -44,20 +49,26 @@ class CentOS(Repository):
     roots = {}
     path = self._releasedStartingPath()
     if path is not None:
-      data = self._path_contents("{0}/".format(path))
+      entries = self._path_entries("{0}/".format(path),
+                                   detailed = self._scanningIncrementally())
 
-      if data == self.uriError:
+      if entries is None:
         roots = self.uriErrorRoot
       else:
         # Find all the released versions greater than or equal to the CentOS
-        # minimum major and then find their minors.
-        regex = r"(?i)<a\s+href=\"(centos-(\d+))/\">\1/</a>"
+        # minimum major and then find their minors; a major's minors are only
+        # found anew if its directory has changed.
+        mtimes = dict([(entry.name, entry.mtime) for entry in entries])
         for release in filter(
                         lambda x: int(x[1]) >= self.__CENTOS_MINIMUM_MAJOR,
-                        re.findall(regex, data)):
-          roots.update(self._availableReleasedMinors(
-                          "{0}/centos-{1}".format(path, release[1]),
-                          int(release[1])))
+                        self._matchEntries(entries, self.__MAJOR_PATTERN)):
+          majorPath = "{0}/{1}".format(path, release[0])
+          roots.update(self._walkEntry(majorPath,
+                                       mtimes.get(release[0]),
+                                       functools.partial(
+                                        self._availableReleasedMinors,
+                                        majorPath,
+                                        int(release[1]))))
     return roots
 
   ####################################################################
@@ -66,12 +77,13 @@ class CentOS(Repository):
   def _availableReleasedMinors(self, path, major):
     available = {}
 
-    data = self._path_contents("{0}/".format(path))
-    if data == self.uriError:
+    entries = self._path_entries("{0}/".format(path))
+    if entries is None:
       available = self.uriErrorRoot
     else:
-      regex = r"(?i)<a\s+href=\"({0}\.(\d+)(|\.\d+))/\">\1/</a>".format(major)
-      matches = re.findall(regex, data)
+      matches = [(x[0], x[2], x[3])
+                  for x in self._matchEntries(entries, self.__MINOR_PATTERN)
+                  if int(x[1]) == major]
       if major == self.__CENTOS_MINIMUM_MAJOR:
         matches = filter(lambda x: int(x[1]) >= self.__CENTOS_MINIMUM_MINOR,
                          matches)
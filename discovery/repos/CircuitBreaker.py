@@ -0,0 +1,163 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import platform
+if int(platform.python_version_tuple()[0]) < 3:
+  import httplib
+else:
+  from http import client as httplib
+
+import contextlib
+import logging
+import socket
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class CircuitOpenException(socket.error):
+  """Raised in lieu of performing a request to a network location whose
+  circuit is open.
+  """
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, netloc, *args, **kwargs):
+    super(CircuitOpenException, self).__init__(*args, **kwargs)
+    self._msg = "circuit open for {0}".format(netloc)
+
+  ######################################################################
+  def __str__(self):
+    return self._msg
+
+######################################################################
+######################################################################
+class CircuitBreaker(object):
+  """Per network location (i.e., host[:port]) circuit breaker.
+
+  After threshold consecutive connection failures (including timeouts) to a
+  network location its circuit opens: requests to it fail immediately, with
+  CircuitOpenException, for coolDown seconds.  Thereafter a single request
+  is let through as a probe (the circuit is half-open); its success closes
+  the circuit while its failure reopens it for another coolDown seconds.
+  Given a transport policy the threshold and cool-down of each network
+  location are per the policy.
+
+  Any response from the network location, whatever its status, is a
+  success.  The breaker is safe for use by multiple threads.
+  """
+  # Exceptions indicative of a network location being unreachable.
+  __FAILURE_EXCEPTIONS = (socket.error, httplib.HTTPException)
+
+  # Circuit states.
+  __CLOSED = "closed"
+  __OPEN = "open"
+  __HALF_OPEN = "half-open"
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  @contextlib.contextmanager
+  def attempt(self, netloc):
+    """Context manager within which a request to the network location is
+    performed; raises CircuitOpenException on entry if the circuit is open.
+
+    A connection failure or timeout raised from within the context counts
+    toward opening the circuit; completion of the context closes it.
+    """
+    self.__admit(netloc)
+    try:
+      yield
+    except self.__FAILURE_EXCEPTIONS:
+      self.__failed(netloc)
+      raise
+    except BaseException:
+      # Neither success nor failure; e.g., the request was cancelled.
+      self.__abandoned(netloc)
+      raise
+    self.__succeeded(netloc)
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, threshold = 5, coolDown = 60, transportPolicy = None):
+    super(CircuitBreaker, self).__init__()
+    self.__threshold = threshold
+    self.__coolDown = coolDown
+    self.__transportPolicy = transportPolicy
+    self.__lock = threading.Lock()
+    # Circuit states keyed by netloc as dictionaries with keys "state",
+    # "failures" (consecutive) and "opened" (time).
+    self.__circuits = {}
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __abandoned(self, netloc):
+    with self.__lock:
+      circuit = self.__circuit(netloc)
+      if circuit["state"] == self.__HALF_OPEN:
+        # Allow another probe without waiting out a further cool-down.
+        circuit["state"] = self.__OPEN
+        circuit["opened"] = time.time() - self.__coolDownOf(netloc)
+
+  ####################################################################
+  def __admit(self, netloc):
+    with self.__lock:
+      circuit = self.__circuit(netloc)
+      if circuit["state"] == self.__CLOSED:
+        return
+      if ((circuit["state"] == self.__OPEN)
+          and ((time.time() - circuit["opened"])
+               >= self.__coolDownOf(netloc))):
+        log.info("circuit for {0} half-open; probing".format(netloc))
+        circuit["state"] = self.__HALF_OPEN
+        return
+    raise CircuitOpenException(netloc)
+
+  ####################################################################
+  def __circuit(self, netloc):
+    return self.__circuits.setdefault(netloc, { "state"    : self.__CLOSED,
+                                                "failures" : 0,
+                                                "opened"   : 0 })
+
+  ####################################################################
+  def __coolDownOf(self, netloc):
+    if self.__transportPolicy is None:
+      return self.__coolDown
+    return self.__transportPolicy.circuitCoolDown(netloc)
+
+  ####################################################################
+  def __failed(self, netloc):
+    with self.__lock:
+      circuit = self.__circuit(netloc)
+      circuit["failures"] += 1
+      if ((circuit["state"] == self.__HALF_OPEN)
+          or ((circuit["state"] == self.__CLOSED)
+              and (circuit["failures"] >= self.__thresholdOf(netloc)))):
+        log.warn("circuit for {0} open after {1} consecutive failure(s);"
+                 " failing requests for {2} second(s)"
+                  .format(netloc, circuit["failures"],
+                          self.__coolDownOf(netloc)))
+        circuit["state"] = self.__OPEN
+        circuit["opened"] = time.time()
+
+  ####################################################################
+  def __succeeded(self, netloc):
+    with self.__lock:
+      circuit = self.__circuit(netloc)
+      if circuit["state"] != self.__CLOSED:
+        log.info("circuit for {0} closed".format(netloc))
+      circuit["state"] = self.__CLOSED
+      circuit["failures"] = 0
+
+  ####################################################################
+  def __thresholdOf(self, netloc):
+    if self.__transportPolicy is None:
+      return self.__threshold
+    return self.__transportPolicy.circuitThreshold(netloc)
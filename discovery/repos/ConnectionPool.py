@@ -0,0 +1,320 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import platform
+if int(platform.python_version_tuple()[0]) < 3:
+  import httplib
+else:
+  from http import client as httplib
+
+import atexit
+import contextlib
+import logging
+import select
+import socket
+import threading
+import time
+import weakref
+
+from .CircuitBreaker import CircuitBreaker
+from .CrawlArchive import CrawlArchive
+from .TransportPolicy import TransportPolicy
+
+log = logging.getLogger(__name__)
+
+# The pools whose idle connections are closed at exit.
+_pools = weakref.WeakSet()
+
+def _closePools():
+  for pool in list(_pools):
+    pool.close()
+atexit.register(_closePools)
+
+######################################################################
+######################################################################
+class _PooledConnection(httplib.HTTPConnection):
+  """HTTPConnection which obtains the address to which it connects from
+  its pool rather than resolving the host itself.
+
+  The connection's timeout applies to reads; connecting is subject to its
+  connectTimeout.
+  """
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, netloc, timeouts, pool):
+    super(_PooledConnection, self).__init__(netloc, timeout = timeouts[1])
+    self.__pool = pool
+    self.netloc = netloc
+    self.connectTimeout = timeouts[0]
+    # Set to True once the connection has been used for a request; a
+    # request failure on a reused connection is most likely the server
+    # having closed it while it was idle.
+    self.reused = False
+
+  ####################################################################
+  def connect(self):
+    address = self.__pool._address(self.host, self.port)
+    try:
+      self.sock = socket.create_connection((address, self.port),
+                                           self.connectTimeout,
+                                           self.source_address)
+    except socket.error:
+      self.__pool._forgetAddress(self.host, self.port)
+      raise
+    self.sock.settimeout(self.timeout)
+    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+######################################################################
+######################################################################
+class ConnectionPool(object):
+  """Pool of persistent (keep-alive) HTTP connections keyed by network
+  location (i.e., host[:port]).
+
+  Host address resolution is cached for dnsTtl seconds and at most
+  maxConnections idle connections are retained per network location.
+  Requests are subject to the pool's circuit breaker and transport policy.
+  The pool is safe for use by multiple threads; all idle connections are
+  closed at exit.
+  """
+  # Exceptions indicative of the server having closed a kept-alive
+  # connection.
+  __STALE_EXCEPTIONS = (httplib.BadStatusLine, socket.error)
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def close(self):
+    """Closes all idle connections.
+    """
+    with self.__lock:
+      idle = self.__idle
+      self.__idle = {}
+    for connections in idle.values():
+      for connection in connections:
+        connection.close()
+
+  ####################################################################
+  @contextlib.contextmanager
+  def response(self, netloc, method, path, headers = None, timeout = None):
+    """Context manager performing the specified request and providing the
+    HTTPResponse.
+
+    On exit the connection is returned to the pool if the response was
+    completely read and the server has not indicated it will close the
+    connection; otherwise the connection is closed.
+
+    The request is made once permitted by the transport policy's limits on
+    requests in flight to, and the rate of requests to, the network location.
+    The timeout, if not None, bounds the wait for a request in flight to
+    complete and, less that wait, caps both the policy's connect and read
+    timeouts; a wait or rate limit delay exceeding it is reported as
+    socket.timeout.
+
+    If the pool has an archive the exchange is recorded in it or, in replay
+    mode, the archived response is provided without any network access.
+
+    Raises CircuitOpenException if the network location's circuit is open.
+    """
+    if (self.__archive is not None) and self.__archive.isReplaying():
+      yield self.__archive.replayResponse(netloc, method, path)
+      return
+    if self.__archive is not None:
+      headers = self.__archive.requestHeaders(headers)
+
+    semaphore = self.__transportPolicy.semaphore(netloc)
+    if semaphore is not None:
+      # Awaiting a request slot counts against the timeout.
+      start = time.time()
+      if not semaphore.acquire(timeout = timeout):
+        raise socket.timeout("timed out awaiting a request slot for {0}"
+                              .format(netloc))
+      if timeout is not None:
+        timeout = max(0, timeout - (time.time() - start))
+    timeouts = self.__transportPolicy.timeouts(netloc)
+    if timeout is not None:
+      timeouts = tuple([min(timeout, x) for x in timeouts])
+    try:
+      delay = self.__transportPolicy.delay(netloc)
+      if (timeout is not None) and (delay > timeout):
+        raise socket.timeout("rate limit delay of {0:.2f} second(s) for {1}"
+                             " exceeds timeout".format(delay, netloc))
+      if delay > 0:
+        log.debug("delaying request to {0} {1:.2f} second(s) for rate limit"
+                    .format(netloc, delay))
+        time.sleep(delay)
+
+      try:
+        with self.__circuitBreaker.attempt(netloc):
+          (connection, response) = self.__response(netloc, method, path,
+                                                   headers, timeouts)
+      except CrawlArchive.failureExceptions as ex:
+        if self.__archive is not None:
+          self.__archive.recordFailure(netloc, method, path, ex)
+        raise
+
+      try:
+        yield (response if self.__archive is None
+                else self.__archive.recordingResponse(netloc, method, path,
+                                                      response))
+      finally:
+        if response.isclosed() and (not response.will_close):
+          self.__release(connection)
+        else:
+          connection.close()
+    finally:
+      if semaphore is not None:
+        semaphore.release()
+
+  ####################################################################
+  def request(self, netloc, method, path, headers = None, timeout = None):
+    """Performs the specified request returning a tuple of the response
+    status, the response headers (as a dictionary with lower-cased keys)
+    and the response body.
+    """
+    with self.response(netloc, method, path, headers, timeout) as response:
+      body = response.read()
+      return (response.status,
+              dict([(key.lower(), value)
+                      for (key, value) in response.getheaders()]),
+              body)
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, maxConnections = 4, dnsTtl = 300, circuitBreaker = None,
+               transportPolicy = None, archive = None):
+    super(ConnectionPool, self).__init__()
+    self.__maxConnections = maxConnections
+    self.__dnsTtl = dnsTtl
+    self.__circuitBreaker = (CircuitBreaker() if circuitBreaker is None
+                                              else circuitBreaker)
+    self.__transportPolicy = (TransportPolicy() if transportPolicy is None
+                                                else transportPolicy)
+    # CrawlArchive in which requests are recorded or from which they are
+    # replayed, if any.
+    self.__archive = archive
+    self.__lock = threading.Lock()
+    # Idle connections; keyed by netloc.
+    self.__idle = {}
+    # Resolved addresses, keyed by (host, port), as (expiration, address).
+    self.__addresses = {}
+    _pools.add(self)
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _address(self, host, port):
+    """Returns the (cached) address for the specified host and port.
+    """
+    key = (host, port)
+    with self.__lock:
+      cached = self.__addresses.get(key)
+    if (cached is not None) and (cached[0] > time.time()):
+      return cached[1]
+
+    info = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    address = info[0][4][0]
+    log.debug("resolved {0} to {1}".format(host, address))
+    with self.__lock:
+      self.__addresses[key] = (time.time() + self.__dnsTtl, address)
+    return address
+
+  ####################################################################
+  def _forgetAddress(self, host, port):
+    with self.__lock:
+      self.__addresses.pop((host, port), None)
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __acquire(self, netloc, timeouts):
+    connection = None
+    with self.__lock:
+      connections = self.__idle.get(netloc, [])
+      while (connection is None) and (len(connections) > 0):
+        connection = connections.pop()
+        if self.__isStale(connection):
+          connection.close()
+          connection = None
+    if connection is None:
+      connection = _PooledConnection(netloc, timeouts, self)
+    else:
+      (connection.connectTimeout, connection.timeout) = timeouts
+      connection.sock.settimeout(connection.timeout)
+    return connection
+
+  ####################################################################
+  def __isStale(self, connection):
+    # An idle connection is stale if the server has closed it (or sent
+    # unsolicited data); either is indicated by the socket being readable.
+    if connection.sock is None:
+      return True
+    try:
+      (readable, _, _) = select.select([connection.sock], [], [], 0)
+    except (socket.error, ValueError):
+      return True
+    return len(readable) > 0
+
+  ####################################################################
+  def __release(self, connection):
+    connection.reused = True
+    with self.__lock:
+      connections = self.__idle.setdefault(connection.netloc, [])
+      if len(connections) < self.__maxConnections:
+        connections.append(connection)
+        connection = None
+    if connection is not None:
+      connection.close()
+
+  ####################################################################
+  def __response(self, netloc, method, path, headers, timeouts):
+    connection = self.__request(netloc, method, path, headers, timeouts)
+    try:
+      response = connection.getresponse()
+    except self.__STALE_EXCEPTIONS as ex:
+      if isinstance(ex, socket.timeout) or (not connection.reused):
+        connection.close()
+        raise
+      # The server closed the idle connection; retry once on a new one.
+      log.debug("reused connection to {0} closed by server; reconnecting"
+                  .format(netloc))
+      connection.close()
+      connection = self.__request(netloc, method, path, headers, timeouts,
+                                  reuse = False)
+      try:
+        response = connection.getresponse()
+      except:
+        connection.close()
+        raise
+    except:
+      connection.close()
+      raise
+    return (connection, response)
+
+  ####################################################################
+  def __request(self, netloc, method, path, headers, timeouts, reuse = True):
+    connection = (self.__acquire(netloc, timeouts) if reuse
+                    else _PooledConnection(netloc, timeouts, self))
+    try:
+      connection.request(method, path,
+                         headers = {} if headers is None else headers)
+    except self.__STALE_EXCEPTIONS as ex:
+      connection.close()
+      if isinstance(ex, socket.timeout) or (not connection.reused):
+        raise
+      log.debug("reused connection to {0} closed by server; reconnecting"
+                  .format(netloc))
+      connection = _PooledConnection(netloc, timeouts, self)
+      try:
+        connection.request(method, path,
+                           headers = {} if headers is None else headers)
+      except:
+        connection.close()
+        raise
+    except:
+      connection.close()
+      raise
+    return connection
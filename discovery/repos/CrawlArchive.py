@@ -0,0 +1,340 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import platform
+if int(platform.python_version_tuple()[0]) < 3:
+  import httplib
+else:
+  from http import client as httplib
+
+import atexit
+import base64
+import gzip
+import io
+import json
+import logging
+import os
+import socket
+import threading
+
+from .CircuitBreaker import CircuitOpenException
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class CrawlArchiveException(Exception):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, msg, *args, **kwargs):
+    super(CrawlArchiveException, self).__init__(*args, **kwargs)
+    self._msg = msg
+
+  ######################################################################
+  def __str__(self):
+    return self._msg
+
+######################################################################
+######################################################################
+class _ArchivedResponse(object):
+  """Response, akin to HTTPResponse, served from an archive.
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def getheader(self, name, default = None):
+    return self.__headers.get(name.lower(), default)
+
+  ####################################################################
+  def getheaders(self):
+    return list(self.__headers.items())
+
+  ####################################################################
+  def isclosed(self):
+    return self.__body.tell() == self.__length
+
+  ####################################################################
+  def read(self, amt = None):
+    return self.__body.read() if amt is None else self.__body.read(amt)
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, status, headers, body):
+    super(_ArchivedResponse, self).__init__()
+    self.status = status
+    self.will_close = True
+    self.__headers = headers
+    self.__body = io.BytesIO(body)
+    self.__length = len(body)
+
+######################################################################
+######################################################################
+class _RecordingResponse(object):
+  """Wrapper of an HTTPResponse which records the response in an archive
+  once it has been completely read (or reading it fails).
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def getheader(self, name, default = None):
+    return self.__response.getheader(name, default)
+
+  ####################################################################
+  def getheaders(self):
+    return self.__response.getheaders()
+
+  ####################################################################
+  def isclosed(self):
+    return self.__response.isclosed()
+
+  ####################################################################
+  def read(self, amt = None):
+    try:
+      data = (self.__response.read() if amt is None
+                else self.__response.read(amt))
+    except CrawlArchive.failureExceptions as ex:
+      self.__archive.recordFailure(self.__netloc, self.__method,
+                                   self.__path, ex)
+      raise
+    self.__chunks.append(data)
+    if (not self.__recorded) and self.__response.isclosed():
+      self.__recorded = True
+      self.__archive.record(self.__netloc, self.__method, self.__path,
+                            self.__response.status,
+                            dict([(key.lower(), value)
+                                    for (key, value)
+                                      in self.__response.getheaders()]),
+                            b"".join(self.__chunks))
+    return data
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, response, archive, netloc, method, path):
+    super(_RecordingResponse, self).__init__()
+    self.__response = response
+    self.__archive = archive
+    self.__netloc = netloc
+    self.__method = method
+    self.__path = path
+    self.__chunks = []
+    self.__recorded = False
+
+  ####################################################################
+  def __getattr__(self, name):
+    return getattr(self.__response, name)
+
+######################################################################
+######################################################################
+class CrawlArchive(object):
+  """Archive of the requests made in discovering repos and the responses
+  (or failures) they received, held in a single gzip compressed file.
+
+  In record mode the transports perform their requests as usual and add
+  each exchange to the archive, which is written on save() (and at exit).
+  Conditional request headers are not sent so that every listing is
+  archived in full.
+
+  In replay mode the transports make no network access whatever; each
+  request is served the archived responses to the same method and uri in
+  the order they were recorded, the last repeating once exhausted.  Failing
+  that, as the format in which a listing is requested can depend on the
+  order of the requests, it is served those to the same uri sans query.  A
+  request absent from the archive is served a 404 (not found) response.
+
+  The archive is safe for use by multiple threads.
+  """
+  RECORD = "record"
+  REPLAY = "replay"
+
+  # Failures of requests which are archived.
+  failureExceptions = (socket.error, httplib.HTTPException)
+
+  # The version of the archive's format.
+  __VERSION = 1
+
+  # Request headers omitted in recording.
+  __CONDITIONAL_HEADERS = ("if-modified-since", "if-none-match")
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def isRecording(self):
+    return self.__mode == self.RECORD
+
+  ####################################################################
+  def isReplaying(self):
+    return self.__mode == self.REPLAY
+
+  ####################################################################
+  def mode(self):
+    return self.__mode
+
+  ####################################################################
+  def path(self):
+    return self.__path
+
+  ####################################################################
+  def record(self, netloc, method, path, status, headers, body):
+    """Records the response, as its status, headers (lower-cased keys) and
+    body, to the specified request.
+    """
+    self.__add(netloc, method, path,
+               { "status"  : status,
+                 "headers" : headers,
+                 "body"    : base64.b64encode(body).decode("ascii") })
+
+  ####################################################################
+  def recordFailure(self, netloc, method, path, exception):
+    """Records the failure of the specified request; the failure of a
+    request not attempted due to an open circuit is not recorded.
+    """
+    if not isinstance(exception, CircuitOpenException):
+      self.__add(netloc, method, path,
+                 { "failure" : "{0}".format(exception) or
+                                 type(exception).__name__ })
+
+  ####################################################################
+  def recordingResponse(self, netloc, method, path, response):
+    """Returns a wrapper of the HTTPResponse to the specified request which
+    records the response once it is read.
+    """
+    return _RecordingResponse(response, self, netloc, method, path)
+
+  ####################################################################
+  def replay(self, netloc, method, path):
+    """Returns the next archived response to the specified request as a
+    tuple of its status, headers (lower-cased keys) and body; raises
+    socket.error if the archived request failed.
+    """
+    exchange = self.__next(netloc, method, path)
+    if "failure" in exchange:
+      raise socket.error("archived failure requesting {0}{1}: {2}"
+                          .format(netloc, path, exchange["failure"]))
+    return (exchange["status"],
+            dict(exchange["headers"]),
+            base64.b64decode(exchange["body"]))
+
+  ####################################################################
+  def replayResponse(self, netloc, method, path):
+    """Returns the next archived response to the specified request as an
+    object akin to HTTPResponse; raises socket.error if the archived request
+    failed.
+    """
+    return _ArchivedResponse(*self.replay(netloc, method, path))
+
+  ####################################################################
+  def requestHeaders(self, headers):
+    """Returns the headers to send with a request being recorded.
+    """
+    if (headers is None) or (not self.isRecording()):
+      return headers
+    return dict([(key, value) for (key, value) in headers.items()
+                  if key.lower() not in self.__CONDITIONAL_HEADERS])
+
+  ####################################################################
+  def save(self):
+    """Writes the recorded exchanges to the archive file.
+    """
+    if not self.isRecording():
+      return
+    with self.__lock:
+      if not self.__dirty:
+        return
+      archive = { "version"   : self.__VERSION,
+                  "exchanges" : [dict([("method", key[0]),
+                                       ("netloc", key[1]),
+                                       ("path", key[2]),
+                                       ("responses", responses)])
+                                  for (key, responses)
+                                    in sorted(self.__exchanges.items())] }
+      temporary = "{0}.{1}.tmp".format(self.__path, os.getpid())
+      with gzip.open(temporary, "wb") as archiveFile:
+        archiveFile.write(json.dumps(archive,
+                                     separators = (",", ":")).encode("UTF-8"))
+      os.rename(temporary, self.__path)
+      self.__dirty = False
+    log.debug("saved crawl archive: {0}".format(self.__path))
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, path, mode):
+    """Raises CrawlArchiveException if the mode is unknown or, in replay
+    mode, the archive cannot be read.
+    """
+    super(CrawlArchive, self).__init__()
+    if mode not in (self.RECORD, self.REPLAY):
+      raise CrawlArchiveException("unknown crawl archive mode: {0}"
+                                    .format(mode))
+    self.__path = os.path.abspath(os.path.expanduser(path))
+    self.__mode = mode
+    self.__lock = threading.Lock()
+    # Archived responses, keyed by (method, netloc, path), and, in replay
+    # mode, the number of each served.
+    self.__exchanges = {}
+    self.__served = {}
+    # In replay mode, the archived responses keyed by (method, netloc,
+    # path sans query).
+    self.__unqueried = {}
+    self.__dirty = False
+    if self.isReplaying():
+      self.__load()
+    else:
+      atexit.register(self.save)
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __add(self, netloc, method, path, response):
+    if not self.isRecording():
+      return
+    with self.__lock:
+      self.__exchanges.setdefault((method, netloc, path),
+                                  []).append(response)
+      self.__dirty = True
+
+  ####################################################################
+  def __load(self):
+    try:
+      with gzip.open(self.__path, "rb") as archiveFile:
+        archive = json.loads(archiveFile.read().decode("UTF-8"))
+    except (IOError, OSError, ValueError) as ex:
+      raise CrawlArchiveException("could not read crawl archive {0}: {1}"
+                                    .format(self.__path, ex))
+    if (not isinstance(archive, dict)) \
+        or (archive.get("version") != self.__VERSION):
+      raise CrawlArchiveException("unsupported crawl archive version in {0}"
+                                    .format(self.__path))
+    for exchange in archive.get("exchanges", []):
+      self.__exchanges[(exchange["method"],
+                        exchange["netloc"],
+                        exchange["path"])] = exchange["responses"]
+      self.__unqueried.setdefault((exchange["method"],
+                                   exchange["netloc"],
+                                   exchange["path"].split("?", 1)[0]),
+                                  exchange["responses"])
+    log.debug("loaded crawl archive: {0}".format(self.__path))
+
+  ####################################################################
+  def __next(self, netloc, method, path):
+    key = (method, netloc, path)
+    with self.__lock:
+      responses = self.__exchanges.get(key)
+      if not responses:
+        key = (method, netloc, path.split("?", 1)[0])
+        responses = self.__unqueried.get(key)
+      if not responses:
+        log.warn("no archived response for {0} {1}{2}; serving not found"
+                  .format(method, netloc, path))
+        return { "status" : 404, "headers" : {}, "body" : "" }
+      served = self.__served.get(key, 0)
+      self.__served[key] = served + 1
+    return responses[min(served, len(responses) - 1)]
@@ -3,6 +3,7 @@
 #
 # Copyright Red Hat
 #
+import functools
 import json
 import re
 
@@ -15,6 +16,9 @@ class Fedora(Repository):
   # Exclude any release prior to 28.
   __FEDORA_MINIMUM_MAJOR = 28
 
+  # Pattern matched against the names of listing directory entries.
+  __VERSION_PATTERN = re.compile(r"(\d+)$")
+
   # Available via Factory.
   _available = True
 
@@ -41,11 +45,11 @@ class Fedora(Repository):
   def _filterRepos(self, repos, architecture):
     repos = super(Fedora, self)._filterRepos(repos, architecture)
 
-    repos = dict([ (key, value)
-                      for (key, value) in repos.items()
-                        if self._uri_contents(
-                          "{0}/Everything/{1}"
-                            .format(value, architecture)) != self.uriError ])
+    repos = self._filterReposConcurrently(
+              repos,
+              lambda key, value: self._uri_exists(
+                                  "{0}/Everything/{1}/"
+                                    .format(value, architecture)))
     return repos
 
   ####################################################################
@@ -79,19 +83,26 @@ class Fedora(Repository):
   def _agnosticCommon(self, path):
     roots = {}
     if path is not None:
-      data = self._path_contents("{0}/".format(path))
+      entries = self._path_entries("{0}/".format(path),
+                                   detailed = self._scanningIncrementally())
 
-      if data == self.uriError:
+      if entries is None:
         roots = self.uriErrorRoot
       else:
         # Find all the released versions greater than or equal to the Fedora
         # minimum major (limited to no less than 28, Fedora 28 being the
-        # version first incorporating VDO).
-        regex = r"(?i)<a\s+href=\"(\d+)/\">\1/</a>"
+        # version first incorporating VDO).  A version's location is only
+        # determined anew if its directory has changed.
+        mtimes = dict([(entry.name, entry.mtime) for entry in entries])
         roots = dict([
-          (x,  self._availableUri(path, x))
-            for x in filter(lambda x: int(x) >= self.__FEDORA_MINIMUM_MAJOR,
-                            re.findall(regex, data)) ])
+          (x[0],  self._walkEntry("{0}/{1}".format(path, x[0]),
+                                  mtimes[x[0]],
+                                  functools.partial(self._availableUri,
+                                                    path,
+                                                    x[0])))
+            for x in filter(lambda x: int(x[1]) >= self.__FEDORA_MINIMUM_MAJOR,
+                            self._matchEntries(entries,
+                                               self.__VERSION_PATTERN)) ])
 
     return roots
 
@@ -103,11 +114,11 @@ class Fedora(Repository):
   def _availableUri(self, path, version):
     # If the version has a README file that indicates it has been moved to
     # the archive server.
-    data = self._path_contents("{0}/{1}/".format(path, version))
-    regex = r"(?i)<a\s+href=\"(README)\">\1</a>"
     host = self._host()
-    match = re.search(regex, data)
-    if match is not None:
+    if ((host is not None)
+        and self._uri_exists("http://{0}{1}/{2}/README".format(host,
+                                                                path,
+                                                                version))):
       host = self._archivedHost()
       path = path.replace("/pub/", "/pub/archive/", 1)
     uri = None if host is None else "http://{0}{1}/{2}".format(host, path,
@@ -0,0 +1,259 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import contextlib
+import errno
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from .CacheStorage import CacheEntry, CacheStorage, CacheStorageBusyException
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class _FileCacheEntry(CacheEntry):
+  """Cache entry held in an open (and locked) file, at path, of a storage;
+  an empty file has no roots.  The file is read on first use.
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def close(self):
+    self.__file.close()
+
+  ####################################################################
+  def mtime(self):
+    self.__load()
+    return self.__mtime
+
+  ####################################################################
+  def roots(self):
+    self.__load()
+    return self.__roots
+
+  ####################################################################
+  def save(self, roots, mtime = None):
+    data = json.dumps(roots)
+    self.__file.truncate(0)
+    self.__file.seek(0)
+    self.__file.write(data)
+    self.__file.flush()
+    if mtime is not None:
+      os.utime(self.__file.fileno(), (mtime, mtime))
+    self.__storage._written(self.__file, self.__path)
+    self.__roots = json.loads(data)
+    self.__mtime = os.fstat(self.__file.fileno()).st_mtime
+    self.__loaded = True
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, storage, openFile, path):
+    super(_FileCacheEntry, self).__init__()
+    self.__storage = storage
+    self.__file = openFile
+    self.__path = path
+    self.__loaded = False
+    self.__roots = None
+    self.__mtime = None
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __load(self):
+    if self.__loaded:
+      return
+    stats = os.fstat(self.__file.fileno())
+    if stats.st_size > 0:
+      self.__file.seek(0)
+      self.__roots = self._parse(self.__file.read(), self.__path)
+      if self.__roots is not None:
+        self.__mtime = stats.st_mtime
+    self.__loaded = True
+
+######################################################################
+######################################################################
+class FileCacheStorage(CacheStorage):
+  """Cache storage holding each entry in a JSON file of the same name in a
+  directory, locked (shared or exclusively) via flock.
+
+  With FSYNC durability each entry's file, and the directory on its
+  replacement, is synced as it is written.  With BATCH durability sync()
+  syncs the files of the entries updated since the last sync followed by
+  the directory.
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  @contextlib.contextmanager
+  def claim(self, name, blocking = True):
+    path = "{0}.refresh".format(self.__path(name))
+    self.__makeDirectory()
+    with os.fdopen(os.open(path, os.O_CREAT | os.O_RDWR, 0o640),
+                   "r+") as lockFile:
+      try:
+        fcntl.flock(lockFile,
+                    fcntl.LOCK_EX if blocking
+                      else (fcntl.LOCK_EX | fcntl.LOCK_NB))
+      except (IOError, OSError) as ex:
+        if ex.errno not in (errno.EAGAIN, errno.EACCES):
+          raise
+        yield False
+        return
+      yield True
+
+  ####################################################################
+  def mtime(self, name):
+    """Returns, as does the entry, None if the named entry's file is empty or
+    unreadable; the file is read, though not locked, to determine the
+    latter.
+    """
+    path = self.__path(name)
+    try:
+      openFile = open(path)
+    except (IOError, OSError) as ex:
+      if ex.errno != errno.ENOENT:
+        raise
+      return None
+    with _FileCacheEntry(self, openFile, path) as entry:
+      return entry.mtime()
+
+  ####################################################################
+  def open(self, name, blocking = True, shared = False):
+    self.__makeDirectory()
+    path = self.__path(name)
+    try:
+      fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o640)
+    except OSError as ex:
+      if ex.errno != errno.EEXIST:
+        raise
+      fd = os.open(path, os.O_RDWR, 0o640)
+    try:
+      openFile = os.fdopen(fd, "r+")
+    except:
+      os.close(fd)
+      raise
+
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    try:
+      if blocking:
+        fcntl.flock(openFile, operation)
+      else:
+        try:
+          fcntl.flock(openFile, operation | fcntl.LOCK_NB)
+        except (IOError, OSError) as ex:
+          if ex.errno not in (errno.EAGAIN, errno.EACCES):
+            raise
+          raise CacheStorageBusyException(path)
+    except:
+      openFile.close()
+      raise
+
+    # The file may have been replaced while we awaited its lock; if so, we
+    # open its replacement.
+    if os.fstat(openFile.fileno()).st_ino != os.stat(path).st_ino:
+      openFile.close()
+      return self.open(name, blocking, shared)
+
+    return _FileCacheEntry(self, openFile, path)
+
+  ####################################################################
+  def replace(self, name, roots, mtime = None):
+    """Atomically replaces the named entry's file with one holding the
+    roots.
+    """
+    self.__makeDirectory()
+    (fd, temporary) = tempfile.mkstemp(prefix = ".{0}.".format(name),
+                                       dir = self.__directory)
+    try:
+      os.fchmod(fd, 0o640)
+      with _FileCacheEntry(self, os.fdopen(fd, "w"), None) as entry:
+        entry.save(roots, mtime)
+      # Replacing the file while holding its lock orders the replacement
+      # with respect to its other users.
+      with self.open(name):
+        os.rename(temporary, self.__path(name))
+      if self.durability() == self.FSYNC:
+        self.__syncDirectory()
+      elif self.durability() == self.BATCH:
+        with self.__pendingLock:
+          self.__pending.add(self.__path(name))
+    except:
+      try:
+        os.unlink(temporary)
+      except OSError:
+        pass
+      raise
+
+  ####################################################################
+  def sync(self):
+    with self.__pendingLock:
+      (pending, self.__pending) = (self.__pending, set())
+    for path in sorted(pending):
+      try:
+        fd = os.open(path, os.O_RDONLY)
+      except OSError as ex:
+        if ex.errno != errno.ENOENT:
+          raise
+        continue
+      try:
+        os.fsync(fd)
+      finally:
+        os.close(fd)
+    if len(pending) > 0:
+      self.__syncDirectory()
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, directory, durability = CacheStorage.FSYNC):
+    super(FileCacheStorage, self).__init__(durability)
+    self.__directory = directory
+    # The paths of the entries' files which, with BATCH durability, have
+    # been updated since the last sync.
+    self.__pending = set()
+    self.__pendingLock = threading.Lock()
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _written(self, openFile, path):
+    """Called once an entry's file at path (or, if path is None, a file
+    which is to replace one) has been written via openFile.
+    """
+    if self.durability() == self.FSYNC:
+      os.fsync(openFile.fileno())
+    elif (self.durability() == self.BATCH) and (path is not None):
+      with self.__pendingLock:
+        self.__pending.add(path)
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __makeDirectory(self):
+    try:
+      os.makedirs(self.__directory, 0o700)
+    except OSError as ex:
+      if ex.errno != errno.EEXIST:
+        raise
+
+  ####################################################################
+  def __path(self, name):
+    return os.path.sep.join([self.__directory, name])
+
+  ####################################################################
+  def __syncDirectory(self):
+    fd = os.open(self.__directory, os.O_RDONLY)
+    try:
+      os.fsync(fd)
+    finally:
+      os.close(fd)
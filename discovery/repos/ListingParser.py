@@ -0,0 +1,140 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import platform
+if int(platform.python_version_tuple()[0]) < 3:
+  import urllib as urlparse
+else:
+  from urllib import parse as urlparse
+
+import calendar
+import collections
+import re
+import time
+
+######################################################################
+######################################################################
+class ListingParser(object):
+  """Incremental parser of the entries of a directory listing (autoindex)
+  as generated by Apache (fancy, table or compact formats) or nginx.
+
+  The listing is fed to the parser as it is read; each feed returns the
+  entries completed by the text fed so far and close() returns any entry
+  remaining at the end of the listing.  Only the text which may be part of
+  an incomplete entry is retained between feeds.
+  """
+  # A listing entry.
+  # name is the entry's name, sans any trailing "/", isDir whether it is a
+  # directory, mtime its modification time (seconds since the epoch) and
+  # size its approximate size in bytes; mtime and size are None if not
+  # present in the listing.
+  Entry = collections.namedtuple("Entry", ["name", "isDir", "mtime", "size"])
+
+  # A link followed by the remainder of its line (up to any following link);
+  # __ENTRY requires that the line (or link) be terminated.
+  __ENTRY = re.compile(r"(?i)<a\s+href=\"([^\"]*)\"[^>]*>([^<]*)</a>"
+                       r"((?:(?!<a\s)[^\n])*)(?=\n|<a\s)")
+  __FINAL_ENTRY = re.compile(r"(?i)<a\s+href=\"([^\"]*)\"[^>]*>([^<]*)</a>"
+                             r"((?:(?!<a\s)[^\n])*)")
+
+  # The modification time and size following a link.
+  __DETAILS = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}(?::\d{2})?"
+                         r"|\d{2}-[A-Za-z]{3}-\d{4} \d{2}:\d{2}(?::\d{2})?)"
+                         r"\s+(-|\d+(?:\.\d+)?[KMGTP]?)(?:\s|$)")
+  __TAG = re.compile(r"<[^>]*>|&nbsp;")
+
+  __MTIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S",
+                     "%d-%b-%Y %H:%M", "%d-%b-%Y %H:%M:%S")
+  __SIZE_MULTIPLIERS = { "K" : 1 << 10, "M" : 1 << 20, "G" : 1 << 30,
+                         "T" : 1 << 40, "P" : 1 << 50 }
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  @classmethod
+  def parse(cls, text):
+    """Returns a list of the entries in the complete listing text.
+    """
+    parser = cls()
+    return parser.feed(text) + parser.close()
+
+  ####################################################################
+  def close(self):
+    """Returns a list of the entries remaining at the end of the listing.
+    """
+    entries = self.__entries(self.__FINAL_ENTRY, len(self.__buffer))[0]
+    self.__buffer = ""
+    return entries
+
+  ####################################################################
+  def feed(self, text):
+    """Returns a list of the entries completed by the text.
+    """
+    self.__buffer = "{0}{1}".format(self.__buffer, text)
+    (entries, position) = self.__entries(self.__ENTRY, len(self.__buffer))
+
+    # Retain only a trailing incomplete entry.
+    start = self.__buffer.lower().find("<a", position)
+    if (start < 0) and self.__buffer.endswith("<"):
+      start = len(self.__buffer) - 1
+    self.__buffer = "" if start < 0 else self.__buffer[start:]
+
+    return entries
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self):
+    super(ListingParser, self).__init__()
+    self.__buffer = ""
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __entries(self, pattern, end):
+    entries = []
+    position = 0
+    for match in pattern.finditer(self.__buffer, 0, end):
+      position = match.end()
+      entry = self.__entry(*match.groups())
+      if entry is not None:
+        entries.append(entry)
+    return (entries, position)
+
+  ####################################################################
+  def __entry(self, href, text, details):
+    # Only links to the listing's children are entries; e.g., parent
+    # directory and column sorting links are not.
+    if ((href == "") or href.startswith(("/", "?", "#", "."))
+        or (":" in href) or ("/" in href.rstrip("/"))):
+      return None
+
+    mtime = None
+    size = None
+    match = self.__DETAILS.search(self.__TAG.sub(" ", details))
+    if match is not None:
+      mtime = self.__mtime(match.group(1))
+      size = self.__size(match.group(2))
+
+    return self.Entry(urlparse.unquote(href.rstrip("/")),
+                      href.endswith("/"),
+                      mtime,
+                      size)
+
+  ####################################################################
+  def __mtime(self, text):
+    for mtimeFormat in self.__MTIME_FORMATS:
+      try:
+        return calendar.timegm(time.strptime(text, mtimeFormat))
+      except ValueError:
+        pass
+    return None
+
+  ####################################################################
+  def __size(self, text):
+    if text == "-":
+      return None
+    multiplier = self.__SIZE_MULTIPLIERS.get(text[-1], 1)
+    return int(float(text.rstrip("KMGTP")) * multiplier)
@@ -0,0 +1,216 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import errno
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class ListingStore(object):
+  """Persistent store of the parsed entries of retrieved directory listings,
+  keyed by uri, along with the validators (ETag and/or Last-Modified) with
+  which they were served.
+
+  The validators allow a listing to be revalidated with a conditional
+  request; a response of 304 (not modified) means the stored listing can be
+  used as is.
+
+  If the store has a ttl it also acts as a cache: listings, with or without
+  validators, retrieved (or revalidated) within the ttl are fresh and may be
+  used without any request.  The total size of the stored listings is
+  bounded by evicting the least recently retrieved.
+
+  The store is loaded on first use and merged into the file on save, which
+  atomically replaces the file; saves are serialized by a lock file
+  alongside it.  The store is safe for use by multiple threads and
+  processes.
+  """
+  # The version of the file's format; a file of any other version is
+  # discarded.
+  __VERSION = 1
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def get(self, uri):
+    """Returns the stored entry for the uri, if any, as a dictionary with
+    keys "entries" (each a list of the fields of a ListingParser.Entry),
+    "etag", "last-modified", "retrieved" and "size".
+    """
+    with self.__lock:
+      self.__load()
+      return self.__entries.get(uri)
+
+  ####################################################################
+  def isFresh(self, entry):
+    """Returns True if the entry may be used without revalidation.
+    """
+    return ((self.__ttl is not None)
+            and ((time.time() - entry["retrieved"]) < self.__ttl))
+
+  ####################################################################
+  def load(self):
+    """Loads the store from its file if it has yet to be loaded; e.g., ahead
+    of its use from within an event loop.
+    """
+    with self.__lock:
+      self.__load()
+
+  ####################################################################
+  def put(self, uri, entries, etag = None, lastModified = None):
+    """Stores the listing entries for the uri with its validators.  Unless
+    the store has a ttl a listing with no validators cannot be used and is
+    not stored.
+    """
+    if (self.__ttl is None) and (etag is None) and (lastModified is None):
+      return
+    with self.__lock:
+      self.__load()
+      entries = [list(entry) for entry in entries]
+      self.__entries[uri] = { "entries"       : entries,
+                              "etag"          : etag,
+                              "last-modified" : lastModified,
+                              "retrieved"     : time.time(),
+                              "size"          : len(json.dumps(entries)) }
+      self.__dirty.add(uri)
+
+  ####################################################################
+  def revalidated(self, uri):
+    """Records that the stored listing for the uri has been revalidated.
+    """
+    with self.__lock:
+      self.__load()
+      if uri in self.__entries:
+        self.__entries[uri]["retrieved"] = time.time()
+        self.__dirty.add(uri)
+
+  ####################################################################
+  def save(self):
+    """Merges the entries stored since the last save into the file.
+    """
+    with self.__lock:
+      if len(self.__dirty) == 0:
+        return
+      directory = os.path.dirname(self.__path)
+      try:
+        os.makedirs(directory, 0o700)
+      except OSError as ex:
+        if ex.errno != errno.EEXIST:
+          raise
+      fd = os.open("{0}.lock".format(self.__path), os.O_CREAT | os.O_RDWR,
+                   0o640)
+      with os.fdopen(fd, "r+") as lockFile:
+        fcntl.flock(lockFile, fcntl.LOCK_EX)
+        entries = self.__read()
+        entries.update(dict([(uri, self.__entries[uri])
+                              for uri in self.__dirty]))
+        self.__evict(entries)
+        self.__write(directory, entries)
+      self.__entries = entries
+      self.__dirty = set()
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, path, ttl = None, maxSize = None, sync = True):
+    """ttl, if not None, is the number of seconds for which a stored listing
+    is fresh.  maxSize, if not None, is the maximum total size, in bytes, of
+    the stored listings as serialized.  sync indicates whether each save is
+    synced to stable storage.
+    """
+    super(ListingStore, self).__init__()
+    self.__path = path
+    self.__ttl = ttl
+    self.__maxSize = maxSize
+    self.__sync = sync
+    self.__lock = threading.RLock()
+    self.__entries = None
+    self.__dirty = set()
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __evict(self, entries):
+    if self.__maxSize is None:
+      return
+    size = sum([entry["size"] for entry in entries.values()])
+    for uri in sorted(entries, key = lambda x: entries[x]["retrieved"]):
+      if size <= self.__maxSize:
+        break
+      log.debug("evicting stored listing: {0}".format(uri))
+      size -= entries[uri]["size"]
+      del entries[uri]
+
+  ####################################################################
+  def __load(self):
+    if self.__entries is not None:
+      return
+    self.__entries = self.__read()
+
+  ####################################################################
+  def __parse(self, data):
+    if len(data) == 0:
+      return {}
+    try:
+      store = json.loads(data)
+    except ValueError:
+      store = None
+    if ((not isinstance(store, dict))
+        or (store.get("version") != self.__VERSION)
+        or (not isinstance(store.get("listings"), dict))):
+      log.warn("discarding unreadable listing store: {0}".format(self.__path))
+      return {}
+    return store["listings"]
+
+  ####################################################################
+  def __read(self):
+    """Returns the entries in the file; as the file is only ever replaced
+    atomically it is read without locking.
+    """
+    try:
+      with open(self.__path, "r") as openFile:
+        return self.__parse(openFile.read())
+    except (IOError, OSError) as ex:
+      if ex.errno != errno.ENOENT:
+        raise
+    return {}
+
+  ####################################################################
+  def __write(self, directory, entries):
+    """Atomically replaces the file with one holding the entries, synced to
+    stable storage if the store syncs.
+    """
+    (fd, temporary) = tempfile.mkstemp(
+                        prefix = ".{0}.".format(os.path.basename(self.__path)),
+                        dir = directory)
+    try:
+      os.fchmod(fd, 0o640)
+      with os.fdopen(fd, "w") as temporaryFile:
+        temporaryFile.write(json.dumps({ "version"  : self.__VERSION,
+                                         "listings" : entries }))
+        temporaryFile.flush()
+        if self.__sync:
+          os.fsync(temporaryFile.fileno())
+      os.rename(temporary, self.__path)
+    except:
+      try:
+        os.unlink(temporary)
+      except OSError:
+        pass
+      raise
+    if self.__sync:
+      fd = os.open(directory, os.O_RDONLY)
+      try:
+        os.fsync(fd)
+      finally:
+        os.close(fd)
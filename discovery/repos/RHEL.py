@@ -3,6 +3,7 @@
 #
 # Copyright Red Hat
 #
+import functools
 import re
 
 from .Repository import Repository
@@ -14,6 +15,12 @@ class RHEL(Repository):
   __RHEL_MINIMUM_MAJOR = 7
   __RHEL_MINIMUM_MINOR = 5
 
+  # Patterns matched against the names of listing directory entries.
+  __LATEST_MAJOR_PATTERN = re.compile(r"rhel-(\d+)$")
+  __LATEST_MINOR_PATTERN = re.compile(r"(?i)latest-RHEL-(\d+)\.(\d+)(|\.\d+)$")
+  __RELEASED_MAJOR_PATTERN = re.compile(r"RHEL-(\d+)$")
+  __RELEASED_MINOR_PATTERN = re.compile(r"(\d+)\.(\d+)(|\.\d+)$")
+
   # Available via Factory.
   _available = True
 
@@ -23,15 +30,15 @@ class RHEL(Repository):
   def _filterRepos(self, repos, architecture):
     repos = super(RHEL, self)._filterRepos(repos, architecture)
 
-    regex = re.compile(r"(?i)<a\s+href=\"({0}/)\">\1</a>".format(architecture))
-
-    return dict([ (key, value)
-      for (key, value) in repos.items()
-        if re.search(regex,
-                     self._uri_contents(
-                      "{0}/{1}".format(value,
-                                       "Server" if float(key) < 8
-                                                else "BaseOS"))) is not None ])
+    # The listing is only read as far as the architecture's subdir.
+    subdir = architecture.lower()
+    return self._filterReposConcurrently(
+      repos,
+      lambda key, value: any(entry.isDir and (entry.name.lower() == subdir)
+                             for entry in self._uri_streamed_entries(
+                              "{0}/{1}".format(value,
+                                               "Server" if float(key) < 8
+                                                        else "BaseOS"))))
 
   ####################################################################
   def _findAgnosticLatestRoots(self, architecture):
@@ -40,9 +47,8 @@ class RHEL(Repository):
     roots = {}
     path = self._latestStartingPath()
     if path is not None:
-      majorRhels = self._findMajorRhels(path,
-                                        r"<a\s+href=\"(rhel-(\d+))/\">\1/</a>")
-      if (len(majorRhels) == 1) and (majorRhels[0] == self.uriError):
+      majorRhels = self._findMajorRhels(path, self.__LATEST_MAJOR_PATTERN)
+      if majorRhels is None:
         roots = self.uriErrorRoot
       else:
         for rhel in majorRhels:
@@ -60,9 +66,8 @@ class RHEL(Repository):
     roots = {}
     path = self._nightlyStartingPath()
     if path is not None:
-      majorRhels = self._findMajorRhels(path,
-                                        r"<a\s+href=\"(rhel-(\d+))/\">\1/</a>")
-      if (len(majorRhels) == 1) and (majorRhels[0] == self.uriError):
+      majorRhels = self._findMajorRhels(path, self.__LATEST_MAJOR_PATTERN)
+      if majorRhels is None:
         roots = self.uriErrorRoot
       else:
         for rhel in majorRhels:
@@ -80,16 +85,19 @@ class RHEL(Repository):
     # minimum major and then find their minors.
     path = self._releasedStartingPath()
     if path is not None:
-      majorRhels = self._findMajorRhels(path,
-                                        r"<a\s+href=\"(RHEL-(\d+))/\">\1/</a>")
-      if (len(majorRhels) == 1) and (majorRhels[0] == self.uriError):
+      # A major's minors are only found anew if its directory has changed.
+      majorRhels = self._findMajorRhels(path, self.__RELEASED_MAJOR_PATTERN)
+      if majorRhels is None:
         roots = self.uriErrorRoot
       else:
         for rhel in majorRhels:
-          roots.update(self._availableReleasedMinors(
-                                                "{0}/{1}".format(path,
-                                                                 rhel[0]),
-                                                                 int(rhel[1])))
+          majorPath = "{0}/{1}".format(path, rhel[0])
+          roots.update(self._walkEntry(majorPath,
+                                       rhel[2],
+                                       functools.partial(
+                                        self._availableReleasedMinors,
+                                        majorPath,
+                                        int(rhel[1]))))
     return roots
 
   ####################################################################
@@ -98,14 +106,14 @@ class RHEL(Repository):
   def _availableLatestMinors(self, path):
     available = {}
 
-    data = self._path_contents("{0}/".format(path))
-    if data == self.uriError:
+    entries = self._path_entries("{0}/".format(path))
+    if entries is None:
       available = self.uriErrorRoot
     else:
       # Find all the latest greater than or equal to the RHEL minimum major.
-      regex = r"(?i)<a\s+href=\"(latest-RHEL-(\d+)\.(\d+)(|\.\d+))/\">\1/</a>"
       matches = filter(lambda x: int(x[1]) >= self.__RHEL_MINIMUM_MAJOR,
-                       re.findall(regex, data))
+                       self._matchEntries(entries,
+                                          self.__LATEST_MINOR_PATTERN))
       # Convert the major/minor/zStream to integers.
       matches = [(x[0],
                   int(x[1]),
@@ -145,12 +153,14 @@ class RHEL(Repository):
   def _availableReleasedMinors(self, path, major):
     available = {}
 
-    data = self._path_contents("{0}/".format(path))
-    if data == self.uriError:
+    entries = self._path_entries("{0}/".format(path))
+    if entries is None:
       available = self.uriErrorRoot
     else:
-      regex = r"<a\s+href=\"({0}\.(\d+)(|\.\d+))/\">\1/</a>".format(major)
-      matches = re.findall(regex, data)
+      matches = [(x[0], x[2], x[3])
+                  for x in self._matchEntries(entries,
+                                              self.__RELEASED_MINOR_PATTERN)
+                  if int(x[1]) == major]
       if major == self.__RHEL_MINIMUM_MAJOR:
         matches = filter(lambda x: int(x[1]) >= self.__RHEL_MINIMUM_MINOR,
                          matches)
@@ -173,12 +183,20 @@ class RHEL(Repository):
     return available
 
   ####################################################################
-  def _findMajorRhels(self, path, regex):
-    data = self._path_contents("{0}/".format(path))
-    if data == self.uriError:
-      return [self.uriError]
+  def _findMajorRhels(self, path, pattern):
+    """Returns a list of tuples of the name, major and modification time
+    (None if not given by the listing) of the directories in the path's
+    listing matching the pattern or None if the listing could not be
+    retrieved.
+    """
+    entries = self._path_entries("{0}/".format(path),
+                                 detailed = self._scanningIncrementally())
+    if entries is None:
+      return None
 
     # Find all the released versions greater than or equal to the RHEL
     # minimum major.
-    return list(filter(lambda x: int(x[1]) >= self.__RHEL_MINIMUM_MAJOR,
-                       re.findall(regex, data)))
+    mtimes = dict([(entry.name, entry.mtime) for entry in entries])
+    return [x + (mtimes[x[0]],)
+              for x in self._matchEntries(entries, pattern)
+              if int(x[1]) >= self.__RHEL_MINIMUM_MAJOR]
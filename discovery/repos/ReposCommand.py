@@ -10,6 +10,9 @@ import yaml
 
 from mill import command
 from discovery import architectures
+from .CacheBundle import CacheBundle
+from .CacheWarmer import CacheWarmer
+from .CrawlArchive import CrawlArchive
 from .Repository import Repository
 
 ########################################################################
@@ -42,6 +45,49 @@ class ReposCommand(command.Command):
                         action = "store_true",
                         dest = "forceScan")
 
+    parser.add_argument("--daemon",
+                        help = "run until interrupted keeping the cached" \
+                                " repos of every distribution and" \
+                                " architecture warm by refreshing them" \
+                                " shortly before they expire",
+                        action = "store_true")
+
+    parser.add_argument("--offline",
+                        help = "report only the cached repos, regardless" \
+                                " of their age, without fetching anything" \
+                                " from the network; each distribution and" \
+                                " architecture is reported with the age of" \
+                                " its cached repos",
+                        action = "store_true")
+
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--export-cache",
+                       help = "export the cached repos of every" \
+                               " distribution and architecture, with when" \
+                               " each was discovered, to the cache bundle" \
+                               " FILE and exit",
+                       metavar = "FILE",
+                       dest = "exportCache")
+    group.add_argument("--import-cache",
+                       help = "merge the cached repos in the cache bundle" \
+                               " FILE (see --export-cache) into the cache," \
+                               " replacing those less recently discovered," \
+                               " and exit",
+                       metavar = "FILE",
+                       dest = "importCache")
+
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record",
+                       help = "record the requests made, and their" \
+                               " responses, in the crawl archive FILE" \
+                               "; use with --force-scan to record a" \
+                               " complete discovery",
+                       metavar = "FILE")
+    group.add_argument("--replay",
+                       help = "replay the requests made from the crawl" \
+                               " archive FILE without any network access",
+                       metavar = "FILE")
+
     group = parser.add_mutually_exclusive_group()
     group.add_argument("--latest",
                        help = "report only the available latest repos",
@@ -63,9 +109,32 @@ class ReposCommand(command.Command):
   def run(self):
     all = not (self.args.latest or self.args.nightly or self.args.released)
 
+    if self.args.record is not None:
+      Repository.useCrawlArchive(self.args.record, CrawlArchive.RECORD)
+    elif self.args.replay is not None:
+      Repository.useCrawlArchive(self.args.replay, CrawlArchive.REPLAY)
+    if self.args.offline:
+      Repository.useOffline()
+
+    if self.args.exportCache is not None:
+      self.__exportCache(self.args.exportCache)
+      return
+    if self.args.importCache is not None:
+      self.__importCache(self.args.importCache)
+      return
+
+    if self.args.daemon:
+      CacheWarmer(self.args).run()
+      return
+
     for choice in Repository.choices():
       instance = Repository.makeItem(choice, self.args)
       for architecture in architectures.Architecture.choices():
+        if self.args.offline:
+          print("{0} {1} {2}:".format(instance.name(),
+                                      architecture,
+                                      self.__cacheAgeDescription(
+                                        instance.cacheAge(architecture))))
         if all or self.args.released:
           print("{0} {1} released roots:".format(instance.name(),
                                                  architecture))
@@ -97,3 +166,30 @@ class ReposCommand(command.Command):
   ####################################################################
   # Private instance-behavior methods
   ####################################################################
+  def __cacheAgeDescription(self, age):
+    if age is None:
+      return "not completely cached"
+    return "cached {0} minute(s) ago".format(int(age // 60))
+
+  ####################################################################
+  def __exportCache(self, path):
+    bundle = CacheBundle(path)
+    for choice in Repository.choices():
+      instance = Repository.makeItem(choice, self.args)
+      entries = instance.exportCache()
+      bundle.setEntries(instance.className(), entries)
+      print("{0}: exported {1} cache entries".format(instance.name(),
+                                                     len(entries)))
+    bundle.save()
+
+  ####################################################################
+  def __importCache(self, path):
+    bundle = CacheBundle(path)
+    bundle.load()
+    for choice in Repository.choices():
+      instance = Repository.makeItem(choice, self.args)
+      entries = bundle.entries(instance.className())
+      print("{0}: imported {1} of {2} cache entries"
+              .format(instance.name(),
+                      instance.importCache(entries),
+                      len(entries)))
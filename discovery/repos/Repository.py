@@ -17,23 +17,76 @@ else:
   from urllib import parse as urlparse
 
 import argparse
-import errno
-import fcntl
+import asyncio
+import codecs
+import concurrent.futures
+import contextlib
 import functools
+import importlib
 import itertools
-import json
 import logging
 import os
+import pickle
 import socket
 import subprocess
 import sys
+import threading
 import time
+import zlib
 
 from mill import defaults, factory
 from discovery import architectures
+from .AsyncCrawler import AsyncCrawler
+from .CacheStorage import CacheStorage, CacheStorageBusyException
+from .CircuitBreaker import CircuitBreaker, CircuitOpenException
+from .ConnectionPool import ConnectionPool
+from .CrawlArchive import CrawlArchive
+from .FileCacheStorage import FileCacheStorage
+from .ListingParser import ListingParser
+from .ListingStore import ListingStore
+from .Retrieval import Retrieval
+from .RetryPolicy import RetryPolicy
+from .SqliteCacheStorage import SqliteCacheStorage
+from .TransportPolicy import TransportPolicy
 
 log = logging.getLogger(__name__)
 
+######################################################################
+######################################################################
+class _AsyncPassIncomplete(Exception):
+  """Raised within an asynchronous discovery pass when it cannot complete
+  without uri listings which have yet to be retrieved or without waiting on
+  a cache entry's lock or claim.
+  """
+  pass
+
+######################################################################
+######################################################################
+class _DeadlineExceeded(Exception):
+  """Raised within a retrieval when the discovery deadline has passed.
+  """
+  pass
+
+######################################################################
+######################################################################
+class _IdentityDecompressor(object):
+  """Decompressor for bodies with no content encoding.
+  """
+  def decompress(self, data):
+    return data
+
+  def flush(self):
+    return b""
+
+######################################################################
+######################################################################
+class PartialResult(dict):
+  """Dictionary of discovered roots (or distributions) which is incomplete
+  because discovery was cut short by its deadline or, offline, some of the
+  roots were not cached.
+  """
+  pass
+
 ######################################################################
 ######################################################################
 class Repository(factory.Factory, defaults.DefaultsFileInfo):
@@ -52,10 +105,70 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
   __cachedNightly = None
   __cachedReleased = None
 
-  # Cached contents to avoid multiple requests for the same data.
-  __cachedUriContents = {}
-
-  # Text indicating an error in retrieving URI contents.
+  # Cached results to avoid multiple requests for the same data; keyed by
+  # the kind of result (uri listing "entries" or "existence") then by uri.
+  # Access is serialized by the lock; retrievals in progress are tracked (by
+  # kind and uri) so that concurrent requests share one retrieval.
+  __cachedUris = { "entries" : {}, "existence" : {} }
+  __cachedUrisLock = threading.Lock()
+  __pendingUris = {}
+
+  # Network locations which reject HEAD requests.
+  __headRejectingHosts = {}
+
+  # Circuit breaker, shared by all subclasses, through which requests to
+  # unreachable hosts fail fast; created, per the transport defaults, on
+  # first use.
+  __circuitBreaker = None
+
+  # Classification of responses for retrying, shared by all subclasses.
+  __retryPolicy = RetryPolicy()
+
+  # Limits on requests, from the transport defaults, and the persistent
+  # connections subject to them shared by all subclasses; created on first
+  # use.
+  __transportPolicy = None
+  __connectionPool = None
+  __transportLock = threading.RLock()
+
+  # Engine for asynchronous discovery shared by all subclasses; created on
+  # first use.
+  __asyncCrawler = None
+
+  # Archive in which the transports record requests or from which they
+  # replay them, if any, shared by all subclasses; determined, from the
+  # archive defaults, on first use unless set via useCrawlArchive.
+  __crawlArchive = None
+  __crawlArchiveResolved = False
+
+  # The processes refreshing cache entries in the background keyed by the
+  # paths of the entries.
+  __refreshing = {}
+  __refreshingLock = threading.Lock()
+
+  # Whether discovery is offline, using only cached results and making no
+  # requests, shared by all subclasses; determined, from the cache defaults,
+  # on first use unless set via useOffline.
+  __offline = None
+
+  # Network locations served by Apache, from which we request listings in
+  # its compact autoindex format; keyed by netloc.
+  __apacheHosts = {}
+
+  # The resolution, in seconds, of the modification times in detailed
+  # listings.
+  __LISTING_MTIME_RESOLUTION = 60
+
+  # Stored listings with which to revalidate uri listings; keyed by path.
+  __listingStores = {}
+  __listingStoresLock = threading.Lock()
+
+  # Storage of the cached results; keyed by the kind of storage, its
+  # durability and the cache directory.
+  __storages = {}
+  __storagesLock = threading.Lock()
+
+  # Text indicating an error in retrieving URIs.
   uriError = "<<uriError>>"
 
   # Dictionary saved to cache files if uri error.
@@ -69,11 +182,15 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     the URI for the release repo.
 
     This method prioritizes released over latest over nightly versions.
+
+    If discovery is cut short by the deadline the result is a PartialResult.
     """
-    available = self._cachedNightly(architecture)
-    available.update(self._cachedLatest(architecture))
-    available.update(self._cachedReleased(architecture))
-    return available
+    ((nightly, latest, released), partial) = self.__privateCached(
+                                                                architecture)
+    available = nightly
+    available.update(latest)
+    available.update(released)
+    return self.__privateResult(available, partial)
 
   ####################################################################
   def availableLatestRoots(self, architecture = None):
@@ -81,11 +198,15 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     the URI for the release repo.
 
     This method prioritizes latest over released over nightly versions.
+
+    If discovery is cut short by the deadline the result is a PartialResult.
     """
-    available = self._cachedNightly(architecture)
-    available.update(self._cachedReleased(architecture))
-    available.update(self._cachedLatest(architecture))
-    return available
+    ((nightly, latest, released), partial) = self.__privateCached(
+                                                                architecture)
+    available = nightly
+    available.update(released)
+    available.update(latest)
+    return self.__privateResult(available, partial)
 
   ####################################################################
   def availableNightlyRoots(self, architecture = None):
@@ -93,72 +214,324 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     the URI for the release repo.
 
     This method prioritizes nightly over latest over released versions.
+
+    If discovery is cut short by the deadline the result is a PartialResult.
+    """
+    ((nightly, latest, released), partial) = self.__privateCached(
+                                                                architecture)
+    available = released
+    available.update(latest)
+    available.update(nightly)
+    return self.__privateResult(available, partial)
+
+  ####################################################################
+  async def availableRootsAsync(self, architecture = None):
+    """Asynchronous counterpart of availableRoots.
+    """
+    ((nightly, latest, released), partial) = await self.__privateCachedAsync(
+                                                                architecture)
+    available = nightly
+    available.update(latest)
+    available.update(released)
+    return self.__privateResult(available, partial)
+
+  ####################################################################
+  async def availableLatestRootsAsync(self, architecture = None):
+    """Asynchronous counterpart of availableLatestRoots.
+    """
+    ((nightly, latest, released), partial) = await self.__privateCachedAsync(
+                                                                architecture)
+    available = nightly
+    available.update(released)
+    available.update(latest)
+    return self.__privateResult(available, partial)
+
+  ####################################################################
+  async def availableNightlyRootsAsync(self, architecture = None):
+    """Asynchronous counterpart of availableNightlyRoots.
+    """
+    ((nightly, latest, released), partial) = await self.__privateCachedAsync(
+                                                                architecture)
+    available = released
+    available.update(latest)
+    available.update(nightly)
+    return self.__privateResult(available, partial)
+
+  ####################################################################
+  def cacheAge(self, architecture = None):
+    """Returns the age, in seconds, of the oldest of the cached results from
+    which the architecture's available roots are determined or None if any
+    of them is not cached.
+    """
+    if architecture is None:
+      architecture = architectures.Architecture.defaultChoice()
+    names = []
+    for category in (self._categoryNightly(architecture),
+                     self._categoryLatest(architecture),
+                     self._categoryReleased(architecture)):
+      names.extend([self.__privateAgnosticFileName(category),
+                    self.__privateAvailableFileName(category, architecture)])
+    mtimes = [self.__privateStorage.mtime(name) for name in names]
+    if None in mtimes:
+      return None
+    return max(0, time.time() - min(mtimes))
+
+  ####################################################################
+  def cacheDirectory(self):
+    """Returns the path of the directory holding the cached results.
+    """
+    return self.__privateDirPath()
+
+  ####################################################################
+  def exportCache(self):
+    """Returns a list of the cached results, of every architecture, as
+    dictionaries with keys "name", "category", "architecture", "refreshed"
+    and "roots" being, respectively, the cache entry name, the category of
+    the results, their architecture (None if architecture agnostic), the
+    time (per time.time()) they were saved and the roots themselves.
+    """
+    exported = {}
+    for (name, category, architecture) in self.__privateEntryNames():
+      if ((name in exported)
+          or (self.__privateStorage.mtime(name) is None)):
+        continue
+      with self.__privateStorage.open(name, shared = True) as entry:
+        (roots, mtime) = (entry.roots(), entry.mtime())
+      if roots is not None:
+        exported[name] = { "name"         : name,
+                           "category"     : category,
+                           "architecture" : architecture,
+                           "refreshed"    : mtime,
+                           "roots"        : roots }
+    return [exported[name] for name in sorted(exported)]
+
+  ####################################################################
+  def importCache(self, entries):
+    """Merges the cached results, as returned by exportCache (e.g., on
+    another host), into the cache returning the number of cache entries
+    replaced.
+
+    Each entry is merged holding its claim, so that it is not scanned
+    meanwhile, and replaced, atomically, only if the imported results are
+    more recent than those cached; the imported results retain the time
+    they were saved and expire accordingly.  Results derived from a
+    category's agnostic results (e.g., its available results) are merged
+    only if the category's cached agnostic results are then those imported.
+    Entries which are malformed or not of the repo class are ignored.
     """
-    available = self._cachedReleased(architecture)
-    available.update(self._cachedLatest(architecture))
-    available.update(self._cachedNightly(architecture))
-    return available
+    known = dict([(name, (category, architecture))
+                   for (name, category, architecture)
+                     in self.__privateEntryNames()])
+    imported = {}
+    for entry in entries:
+      try:
+        (name, roots, mtime) = (entry["name"], entry["roots"],
+                                entry["refreshed"])
+      except (KeyError, TypeError):
+        log.warn("ignoring malformed imported cache entry")
+        continue
+      if ((name not in known) or (not isinstance(roots, dict))
+          or (not isinstance(mtime, (int, float)))):
+        log.warn("ignoring imported cache entry: {0}".format(name))
+        continue
+      imported[name] = (roots, mtime)
+
+    replaced = 0
+    # The agnostic entries are merged first as they determine which of
+    # their dependents are.
+    for name in sorted(imported, key = lambda name: known[name][1] is not None):
+      (category, architecture) = known[name]
+      (roots, mtime) = imported[name]
+      if architecture is not None:
+        agnosticName = self.__privateAgnosticFileName(category)
+        if agnosticName not in imported:
+          continue
+        with self.__privateStorage.open(agnosticName, shared = True) as entry:
+          if entry.roots() != imported[agnosticName][0]:
+            continue
+      if self.__privateMergeEntry(name, roots, mtime):
+        replaced += 1
+    self.__privateStorage.sync()
+    return replaced
+
+  ####################################################################
+  def refreshCache(self, architecture = None):
+    """Refreshes, by scanning anew, those of the cached results from which
+    the architecture's available roots are determined which expire within
+    the refresh lead (per the cache defaults) or are not cached.  Each cache
+    entry is replaced atomically once its scan completes so the cached
+    results remain available throughout.
+
+    Returns a dictionary, keyed by cache entry name, of dictionaries with
+    keys "refreshed", "due" and "expires" being, respectively, the time
+    (per time.time()) the entry was last refreshed, from which it is due to
+    be refreshed and at which it expires; for an entry which is not cached
+    (e.g., its scan was cut short) these are None.
+    """
+    if architecture is None:
+      architecture = architectures.Architecture.defaultChoice()
+    # Retrievals made before now are not to be reused.
+    with self.__cachedUrisLock:
+      for cache in self.__cachedUris.values():
+        cache.clear()
+
+    status = {}
+    for (kind, category, finder) in (
+          (self.__privateNightlyKind(architecture),
+           self._categoryNightly(architecture),
+           self._findAgnosticNightlyRoots),
+          ("latest", self._categoryLatest(architecture),
+           self._findAgnosticLatestRoots),
+          ("released", self._categoryReleased(architecture),
+           self._findAgnosticReleasedRoots)):
+      agnosticName = self.__privateAgnosticFileName(category)
+      availableName = self.__privateAvailableFileName(category, architecture)
+      if availableName in status:
+        continue
+      (roots, status[agnosticName]) = self.__privateWarmEntry(
+                                        agnosticName,
+                                        kind,
+                                        functools.partial(finder,
+                                                          architecture))
+      if roots is None:
+        continue
+      (_, status[availableName]) = self.__privateWarmEntry(
+                                    availableName,
+                                    kind,
+                                    functools.partial(
+                                      self.__privateFilterRepos,
+                                      category,
+                                      architecture,
+                                      roots),
+                                    status[agnosticName]["refreshed"])
+    self.__privateStorage.sync()
+    return status
+
+  ####################################################################
+  @classmethod
+  def useCrawlArchive(cls, path, mode = CrawlArchive.RECORD):
+    """Uses the crawl archive at path, per mode (CrawlArchive.RECORD or
+    CrawlArchive.REPLAY), for all subsequent requests made in discovery; a
+    path of None stops the use of any archive.  Overrides the archive
+    defaults.
+
+    In replay mode discovery makes no network access.  Raises
+    CrawlArchiveException if the archive cannot be used.
+    """
+    archive = None if path is None else CrawlArchive(path, mode)
+    with Repository.__transportLock:
+      if Repository.__crawlArchive is not None:
+        Repository.__crawlArchive.save()
+      Repository.__crawlArchive = archive
+      Repository.__crawlArchiveResolved = True
+      # The transports are recreated to use the archive.
+      if Repository.__connectionPool is not None:
+        Repository.__connectionPool.close()
+      Repository.__connectionPool = None
+      Repository.__asyncCrawler = None
+
+  ####################################################################
+  @classmethod
+  def useOffline(cls, offline = True):
+    """Sets whether discovery is offline, overriding the cache defaults.
+
+    Offline, cached results are used regardless of their age (or of forced
+    scans) and no requests are made; results which are not cached are
+    omitted and the roots returned as PartialResults.
+    """
+    with Repository.__transportLock:
+      Repository.__offline = bool(offline)
 
   ####################################################################
   # Overridden instance-behavior methods
   ####################################################################
-  def __init__(self, args = None):
+  def __init__(self, args = None, deadline = None):
+    """deadline, if not None, is the time (as returned by time.time()) by
+    which discovery must complete.  Retrievals not complete by then are
+    abandoned and the results discovered so far returned as PartialResults;
+    partial results are never saved to the cache.
+    """
     if args is None:
       args = self._defaultArguments()
+    self.__deadline = deadline
+    # Whether the discovery in progress has been cut short by the deadline.
+    self.__partial = False
     self.__cacheRoot = None
+    self.__cacheStorage = None
     self.__cacheSubdir = None
+    self.__cacheDurability = None
     self.__cacheRefresh = None
+    # The refreshes, in seconds, keyed by kind of category.
+    self.__categoryRefreshes = {}
+    self.__errorsTtl = None
+    self.__incremental = None
+    self.__listingsTtl = None
+    self.__listingsSize = None
+    self.__probeWorkers = None
+    # The scan in progress, if scanning incrementally, as a list of the name
+    # of its walked entry, the walked entry's results from the last scan
+    # (None until read) and the results of this one (see _walkEntry).
+    self.__walk = None
+    # The names of, and the results to be saved as, the walked entries of
+    # the cache entries scanned, keyed by the cache entries' names.
+    self.__walkedResults = {}
+    self.__refreshLead = None
+    self.__staleWhileRevalidate = None
+    # Whether the instance is performing a background refresh (see
+    # _refreshDetached); it does not start others.
+    self.__revalidating = False
+    self.__crawlConcurrency = None
+    # The uris whose listings are needed by the asynchronous discovery pass
+    # in progress, if any.
+    self.__asyncPending = None
     super(Repository, self).__init__(args)
 
   ####################################################################
   # Protected methods
   ####################################################################
   def _agnosticLatest(self, architecture):
-    return self.__privateAgnosticRoots(self._categoryLatest(architecture),
+    return self.__privateAgnosticRoots("latest",
+                                       self._categoryLatest(architecture),
                                        functools.partial(
                                         self._findAgnosticLatestRoots,
                                         architecture))
 
   ####################################################################
   def _agnosticNightly(self, architecture):
-    return self.__privateAgnosticRoots(self._categoryNightly(architecture),
+    return self.__privateAgnosticRoots(self.__privateNightlyKind(architecture),
+                                       self._categoryNightly(architecture),
                                        functools.partial(
                                         self._findAgnosticNightlyRoots,
                                         architecture))
 
   ####################################################################
   def _agnosticReleased(self, architecture):
-    return self.__privateAgnosticRoots(self._categoryReleased(architecture),
+    return self.__privateAgnosticRoots("released",
+                                       self._categoryReleased(architecture),
                                        functools.partial(
                                         self._findAgnosticReleasedRoots,
                                         architecture))
 
   ####################################################################
   def _availableLatest(self, architecture):
-    return self.__privateAvailableRoots(self._categoryLatest(architecture),
+    return self.__privateAvailableRoots("latest",
+                                        self._categoryLatest(architecture),
                                         architecture,
-                                        functools.partial(
-                                          self. _filterRepos,
-                                          self._agnosticLatest(architecture),
-                                          architecture))
+                                        self._agnosticLatest(architecture))
 
   ####################################################################
   def _availableNightly(self, architecture):
-    return self.__privateAvailableRoots(self._categoryNightly(architecture),
+    return self.__privateAvailableRoots(self.__privateNightlyKind(architecture),
+                                        self._categoryNightly(architecture),
                                         architecture,
-                                        functools.partial(
-                                          self. _filterRepos,
-                                          self._agnosticNightly(architecture),
-                                          architecture))
+                                        self._agnosticNightly(architecture))
 
   ####################################################################
   def _availableReleased(self, architecture):
-    return self.__privateAvailableRoots(self._categoryReleased(architecture),
+    return self.__privateAvailableRoots("released",
+                                        self._categoryReleased(architecture),
                                         architecture,
-                                        functools.partial(
-                                          self. _filterRepos,
-                                          self._agnosticReleased(architecture),
-                                          architecture))
+                                        self._agnosticReleased(architecture))
 
   ####################################################################
   def _cachedLatest(self, architecture = None):
@@ -167,7 +540,11 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     if architecture is None:
       architecture = architectures.Architecture.defaultChoice()
     if architecture not in self.__cachedLatest:
-      self.__cachedLatest[architecture] = self._availableLatest(architecture)
+      (roots, partial) = self.__privateTrackPartial(self._availableLatest,
+                                                    architecture)
+      if partial:
+        return roots
+      self.__cachedLatest[architecture] = roots
     return self.__cachedLatest[architecture].copy()
 
   ####################################################################
@@ -177,7 +554,11 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     if architecture is None:
       architecture = architectures.Architecture.defaultChoice()
     if architecture not in self.__cachedNightly:
-      self.__cachedNightly[architecture] = self._availableNightly(architecture)
+      (roots, partial) = self.__privateTrackPartial(self._availableNightly,
+                                                    architecture)
+      if partial:
+        return roots
+      self.__cachedNightly[architecture] = roots
     return self.__cachedNightly[architecture].copy()
 
   ####################################################################
@@ -187,8 +568,11 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     if architecture is None:
       architecture = architectures.Architecture.defaultChoice()
     if architecture not in self.__cachedReleased:
-      self.__cachedReleased[architecture] = self._availableReleased(
-                                                                architecture)
+      (roots, partial) = self.__privateTrackPartial(self._availableReleased,
+                                                    architecture)
+      if partial:
+        return roots
+      self.__cachedReleased[architecture] = roots
     return self.__cachedReleased[architecture].copy()
 
   ####################################################################
@@ -220,12 +604,30 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
 
     Subclasses need to override this to account for their unique
     organization of repositories but must also call this first to
-    remove any contents that indicate an error in retrieval.
+    remove any entries that indicate an error in retrieval.
     """
     repos = dict([ (key, value) for (key, value) in repos.items()
                                 if key != self.uriError ])
     return repos
 
+  ####################################################################
+  def _filterReposConcurrently(self, repos, predicate):
+    """Returns the subset of repos for which predicate(key, value) is true.
+
+    The predicate, typically a probe of the repo's listing, is evaluated
+    concurrently for the repos using at most the configured number of probe
+    workers.  The result is identical to that of evaluating the predicate
+    serially.
+    """
+    items = list(repos.items())
+    workers = min(self.__privateProbeWorkers, len(items))
+    if (workers <= 1) or (self.__asyncPending is not None):
+      keep = [predicate(key, value) for (key, value) in items]
+    else:
+      with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        keep = list(executor.map(lambda item: predicate(*item), items))
+    return dict([ item for (item, kept) in zip(items, keep) if kept ])
+
   ####################################################################
   def _findAgnosticLatestRoots(self, architecture):
     raise NotImplementedError
@@ -251,6 +653,20 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
       path = self._releasedStartingPath(architecture)
     return path
 
+  ####################################################################
+  def _matchEntries(self, entries, pattern):
+    """Returns a list of tuples, one per directory entry whose name matches
+    the pattern (a compiled regular expression), of the entry's name followed
+    by the match's groups.
+    """
+    matches = []
+    for entry in entries:
+      if entry.isDir:
+        match = pattern.match(entry.name)
+        if match is not None:
+          matches.append((entry.name,) + match.groups())
+    return matches
+
   ####################################################################
   def _nightlyStartingPath(self, architecture = None):
     path = self.defaults([self.name().lower(), "paths", "nightly"])
@@ -260,6 +676,28 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
       path = self._latestStartingPath(architecture)
     return path
 
+  ####################################################################
+  @staticmethod
+  def _refreshDetached(stream):
+    """Performs the refresh of a stale cache entry, as requested (by
+    __privateRevalidate) via the stream, in the detached process started to
+    do so.
+
+    The refresh is performed by an instance of its own, of the requesting
+    instance's class and arguments, and so is independent of the requesting
+    instance's discovery (e.g., its asynchronous passes or deadline) and
+    retrievals.
+    """
+    request = pickle.load(stream)
+    repository = getattr(importlib.import_module(request["module"]),
+                         request["class"])(request["args"])
+    repository.__revalidating = True
+    repository.__privateRefresh(request["name"],
+                                request["finder"],
+                                request["logMessage"],
+                                request["mtime"],
+                                request["dependency"])
+
   ####################################################################
   def _releasedHost(self):
     host = self.defaults([self.name().lower(), "hosts", "released"])
@@ -273,49 +711,119 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     return path
 
   ####################################################################
-  def _path_contents(self, path = None):
-    contents = ""
+  def _path_entries(self, path = None, detailed = False):
+    entries = []
     if path is None:
       path = self._releasedStartingPath()
     if (path is not None) and (self._host() is not None):
-      contents = self._uri_contents("http://{0}{1}".format(self._host(), path))
-    return contents
+      entries = self._uri_entries("http://{0}{1}".format(self._host(), path),
+                                  detailed = detailed)
+    return entries
+
+  ####################################################################
+  def _scanningIncrementally(self):
+    """Returns True if the scan in progress is incremental; i.e., walks its
+    listing entries via _walkEntry, which requires their modification times
+    and so detailed listings (see _uri_entries).  Otherwise detailed listings
+    are of no use.
+    """
+    return self.__walk is not None
 
   ####################################################################
   def _startingPathPrefix(self, architecture):
     return ""
 
   ####################################################################
-  def _uri_contents(self, uri, retries = 3):
+  def _uri_entries(self, uri, retries = None, detailed = False):
+    """Returns a list of the entries (ListingParser.Entry) in the uri's
+    listing or None if the listing could not be retrieved.
+
+    If retries is None the number of attempts is per the transport defaults
+    for the uri's host.  If detailed is True the listing is requested in a
+    format giving the entries' modification times (from Apache, its fancy
+    rather than compact format).
+    """
     if not uri.endswith("/"):
       uri = "{0}/".format(uri)
-    if uri not in self.__cachedUriContents:
-      log.debug("retrieving contents from uri: {0}".format(uri))
-      parsed = urlparse.urlparse(uri)
-      for iteration in range(retries):
-        try:
-          connection = httplib.HTTPConnection(parsed.netloc, timeout = 10)
-          connection.request("GET", parsed.path)
-          response = connection.getresponse()
-          if response.status == 200:
-            self.__cachedUriContents[uri] = response.read().decode("UTF-8")
-            break
-          log.debug("response status {0} on iteration {1}"
-                      .format(response.status, iteration))
-          if (iteration < (retries - 1)):
-            sleep = min(5, 1 << iteration)
-            log.debug("sleeping {0} second(s) before retrying".format(sleep))
-            time.sleep(sleep)
-        except (socket.gaierror, socket.timeout):
-          log.debug("socket error on iteration {0}".format(iteration))
-      else: # for
-        # We log this at info level because some distributions don't
-        # necessarily support all the architectures of potential interest.
-        log.info("retries exhausted; caching uri error contents for {0}"
-                  .format(uri))
-        self.__cachedUriContents[uri] = self.uriError
-
-    return self.__cachedUriContents[uri]
+    if detailed:
+      uri = "{0}?F=1".format(uri)
+    return self.__privateCachedRetrieval("entries", uri, [], None,
+                                         functools.partial(
+                                          self.__privateRetrieval,
+                                          uri,
+                                          retries))
+
+  ####################################################################
+  def _uri_streamed_entries(self, uri):
+    """Generator yielding the entries (ListingParser.Entry) in the uri's
+    listing.
+
+    If the listing has yet to be retrieved it is streamed, the entries being
+    yielded as they are read; if the caller stops (closing the generator)
+    before the end of the listing the remainder is not read, its connection
+    being closed, and the listing is not cached.  Should streaming fail the
+    listing is retrieved as by _uri_entries.
+    """
+    if not uri.endswith("/"):
+      uri = "{0}/".format(uri)
+    streamed = 0
+    with self.__cachedUrisLock:
+      cached = uri in self.__cachedUris["entries"]
+    if (not cached) and (self.__asyncPending is None):
+      streamed = yield from self.__privateStreamEntries(uri)
+      if streamed is None:
+        return
+    entries = self._uri_entries(uri)
+    for entry in ([] if entries is None else entries[streamed:]):
+      yield entry
+
+  ####################################################################
+  def _uri_exists(self, uri, retries = None):
+    """Returns True if the uri exists.
+
+    Existence is probed with HEAD, falling back to GET only if the server
+    rejects HEAD.  Only the result of the probe is cached.  If retries is
+    None the number of attempts is per the transport defaults for the uri's
+    host.
+    """
+    return self.__privateCachedRetrieval("existence", uri, True, False,
+                                         functools.partial(
+                                          self.__privateExistenceProbe,
+                                          uri,
+                                          retries))
+
+  ####################################################################
+  def _walkEntry(self, key, mtime, walker):
+    """Returns walker(), the result of walking the listing entry (e.g., a
+    version's directory) identified by key and last modified at mtime (per
+    a detailed listing; see _uri_entries).
+
+    If scanning incrementally (per the cache defaults) and not forced the
+    result of the last scan's walk of the entry is carried forward, rather
+    than calling walker, if the entry has not been modified since.  Results
+    containing a uri error are not carried forward.
+
+    As listings give modification times to the minute, an entry last
+    modified within a minute of its walk is considered to have been modified
+    since; a change later in that minute is not evident in the listing.
+    """
+    if (self.__walk is None) or (mtime is None):
+      return walker()
+    if self.__walk[1] is None:
+      self.__walk[1] = {}
+      if not self.args.forceScan:
+        with self.__privateOpenEntry(self.__walk[0]) as entry:
+          self.__walk[1] = entry.roots() or {}
+    walked = self.__walk[1].get(key)
+    if (isinstance(walked, list) and (len(walked) == 3)
+        and (walked[0] == mtime)
+        and ((walked[2] - mtime) >= self.__LISTING_MTIME_RESOLUTION)):
+      (result, walkedAt) = (walked[1], walked[2])
+    else:
+      (result, walkedAt) = (walker(), time.time())
+    if not (isinstance(result, dict) and (self.uriError in result)):
+      self.__walk[2][key] = [mtime, result, walkedAt]
+    return result
 
   ####################################################################
   # Private methods
@@ -324,48 +832,131 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
     return "agnostic.{0}.json".format(category)
 
   ####################################################################
-  def __privateAgnosticRoots(self, category, finder):
+  def __privateAgnosticRoots(self, kind, category, finder):
     if self.__agnosticRoots is None:
       self.__agnosticRoots = {}
     if category not in self.__agnosticRoots:
-      openFile = self.__privateOpenFile(
-                  self.__privateAgnosticFileName(category))
-      try:
-        roots = self.__privateLoadFile(
-                  openFile,
-                  finder,
-                  "Updating saved {0} {1} repos".format(self.className(),
-                                                        category),
-                  forceScan = self.args.forceScan)
-        self.__agnosticRoots[category] = roots
-      finally:
-        openFile.close()
+      (roots, partial) = self.__privateTrackPartial(
+                self.__privateLoadEntry,
+                self.__privateAgnosticFileName(category),
+                kind,
+                finder,
+                "Updating saved {0} {1} repos".format(self.className(),
+                                                      category),
+                forceScan = self.args.forceScan)
+      if partial:
+        return roots
+      self.__agnosticRoots[category] = roots
     return self.__agnosticRoots[category]
 
   ####################################################################
-  def __privateAvailableFileName(self, category, architecture):
-    return "available.{0}.{1}.json".format(category, architecture)
+  async def __privateAsync(self, function, *args):
+    """Runs function(*args) without blocking the event loop returning a tuple
+    of its result and whether it was cut short by the deadline.
+
+    The function is run in passes during which uri listings (or existence)
+    not yet retrieved are given a placeholder value and recorded rather than
+    retrieved.  The recorded uris are retrieved concurrently after the pass
+    and the function is run again; this repeats until a pass completes with
+    nothing outstanding.  Cache files are only updated by a complete pass so
+    the traversal of each level of the repository hierarchy is performed
+    concurrently.
+
+    The passes are run on the event loop; they perform no network I/O, only
+    that of the cache storage (brief, local reads and replacements of its
+    entries), never wait on an entry's lock or claim and refresh stale
+    entries in detached processes rather than threads.  Network I/O is only
+    performed by, and awaited on, the crawler.
+    """
+    async with self.__privateCrawler.session():
+      while True:
+        (result, pending) = self.__privateAsyncPass(function, *args)
+        if pending is None:
+          return result
+
+        if len(pending) == 0:
+          # Waiting on a cache entry's lock or claim held by another.
+          await asyncio.sleep(0.1)
+        else:
+          await self.__privateCrawler.gather(
+                        pending,
+                        lambda key: self.__privateRetrieveAsync(key,
+                                                                pending[key]))
 
   ####################################################################
-  def __privateAvailableRoots(self, category, architecture, finder):
-    roots = None
-    openFile = self.__privateOpenFile(
-                 self.__privateAvailableFileName(category, architecture))
+  def __privateAsyncPass(self, function, *args):
+    """Runs a pass of asynchronous discovery (see __privateAsync) returning
+    a tuple of the pass's result, as per __privateTrackPartial, and None or,
+    if the pass is incomplete, None and the retrievals it awaits keyed by
+    (kind, uri).
+
+    The listing store is loaded ahead of its use by the retrievals.
+    """
+    self.__privateListingStore.load()
+    self.__asyncPending = {}
     try:
-      with self.__privateOpenFile(
-            self.__privateAgnosticFileName(category)) as f:
-        mtime = self.__privateFileMtime(f)
-      roots = self.__privateLoadFile(
-                openFile,
-                finder,
-                "Updating saved {0} {1} {2} repos ".format(self.className(),
-                                                           category,
-                                                           architecture),
-                mtime,
-                forceScan = self.args.forceScan)
+      return (self.__privateTrackPartial(function, *args), None)
+    except _AsyncPassIncomplete:
+      return (None, self.__asyncPending)
     finally:
-      openFile.close()
-    return roots
+      self.__asyncPending = None
+
+  ####################################################################
+  def __privateAvailableFileName(self, category, architecture):
+    return "available.{0}.{1}.json".format(category, architecture)
+
+  ####################################################################
+  def __privateAvailableFinder(self, category, architecture):
+    """Returns a tuple of the finder, to be called with the category's
+    agnostic roots, of the category's roots available for the architecture
+    and the message logged on scanning them.
+    """
+    return (functools.partial(self.__privateFilterRepos, category,
+                              architecture),
+            "Updating saved {0} {1} {2} repos ".format(self.className(),
+                                                       category,
+                                                       architecture))
+
+  ####################################################################
+  def __privateAvailableRoots(self, kind, category, architecture, repos):
+    with self.__privateOpenEntry(
+          self.__privateAgnosticFileName(category)) as agnostic:
+      mtime = agnostic.mtime()
+    if mtime is None:
+      # The agnostic roots are to be scanned anew, superseding any available
+      # roots.
+      mtime = time.time()
+    (finder, logMessage) = self.__privateAvailableFinder(category,
+                                                         architecture)
+    return self.__privateLoadEntry(
+              self.__privateAvailableFileName(category, architecture),
+              kind,
+              finder,
+              logMessage,
+              mtime,
+              forceScan = self.args.forceScan,
+              dependency = (self.__privateAgnosticFileName(category), repos))
+
+  ####################################################################
+  @property
+  def __privateCacheDurability(self):
+    if self.__cacheDurability is None:
+      try:
+        self.__cacheDurability = self.defaults(["cache", "durability"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default durability: {0}".format(CacheStorage.FSYNC))
+
+      if self.__cacheDurability is None:
+        self.__cacheDurability = CacheStorage.FSYNC
+      if self.__cacheDurability not in (CacheStorage.FSYNC,
+                                        CacheStorage.BATCH,
+                                        CacheStorage.NONE):
+        log.warn("unknown durability: {0}".format(self.__cacheDurability))
+        log.info("using default durability: {0}".format(CacheStorage.FSYNC))
+        self.__cacheDurability = CacheStorage.FSYNC
+
+    return self.__cacheDurability
 
   ####################################################################
   @property
@@ -380,29 +971,10 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
       if self.__cacheRefresh is None:
         self.__cacheRefresh = "1-0-0"
 
-      refresh = self.__cacheRefresh.split("-")
-      if len(refresh) > 3:
-        log.warn("more than three refresh fields specified: {0}"
-                  .format(self.__cacheRefresh))
-        refresh = refresh[-3:]
-        log.info("using rightmost fields as refresh: {0}"
-                  .format("-".join(refresh)))
-
-      try:
-        refresh = list(map(lambda x: int(x), refresh))
-      except ValueError:
-        log.warn("could not convert one or more fields to integers: {0}"
-                  .format("-".join(refresh)))
-        log.info("using default refresh: 1 day")
-        refresh = [1, 0, 0]
-
-      refresh.reverse()
-      refresh = dict(itertools.zip_longest(("minutes", "hours", "days"),
-                                           refresh, fillvalue = 0))
-
-      self.__cacheRefresh = ((refresh["days"] * 86400)
-                              + (refresh["hours"] * 3600)
-                              + (refresh["minutes"] * 60))
+      self.__cacheRefresh = self.__privateIntervalSeconds(self.__cacheRefresh,
+                                                          "refresh",
+                                                          "1 day",
+                                                          [1, 0, 0])
       if self.__cacheRefresh < 60:
         log.debug("forcing refresh minimum: 1 minute")
         self.__cacheRefresh = 60
@@ -429,6 +1001,25 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
 
     return self.__cacheRoot
 
+  ####################################################################
+  @property
+  def __privateCacheStorage(self):
+    if self.__cacheStorage is None:
+      try:
+        self.__cacheStorage = self.defaults(["cache", "storage"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default storage: files")
+
+      if self.__cacheStorage is None:
+        self.__cacheStorage = "files"
+      if self.__cacheStorage not in ("files", "sqlite"):
+        log.warn("unknown storage: {0}".format(self.__cacheStorage))
+        log.info("using default storage: files")
+        self.__cacheStorage = "files"
+
+    return self.__cacheStorage
+
   ####################################################################
   @property
   def __privateCacheSubdir(self):
@@ -445,6 +1036,271 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
 
     return self.__cacheSubdir
 
+  ####################################################################
+  def __privateCached(self, architecture):
+    """Returns a tuple of a tuple of the cached nightly, latest and released
+    roots for the architecture and whether any was cut short by the
+    deadline.
+    """
+    results = [self.__privateTrackPartial(function, architecture)
+                for function in (self._cachedNightly,
+                                 self._cachedLatest,
+                                 self._cachedReleased)]
+    self.__privateStorage.sync()
+    return (tuple([roots for (roots, _) in results]),
+            any([partial for (_, partial) in results]))
+
+  ####################################################################
+  async def __privateCachedAsync(self, architecture):
+    """Asynchronous counterpart of __privateCached discovering the roots
+    concurrently.
+    """
+    results = await asyncio.gather(
+                  self.__privateAsync(self._cachedNightly, architecture),
+                  self.__privateAsync(self._cachedLatest, architecture),
+                  self.__privateAsync(self._cachedReleased, architecture))
+    self.__privateStorage.sync()
+    return (tuple([roots for (roots, _) in results]),
+            any([partial for (_, partial) in results]))
+
+  ####################################################################
+  def __privateCachedRetrieval(self, kind, uri, placeholder, missing,
+                               retrieval):
+    """Returns the cached result of the kind for the uri, performing the
+    retrieval (a generator function run via Retrieval) if there is none.
+
+    If the deadline passes before the retrieval completes missing is
+    returned (and not cached) in its stead.
+    """
+    key = (kind, uri)
+    cache = self.__cachedUris[kind]
+    while True:
+      with self.__cachedUrisLock:
+        if uri in cache:
+          return cache[uri]
+        if self.__privateOffline:
+          log.debug("offline; not retrieving uri: {0}".format(uri))
+          self.__partial = True
+          return missing
+        if self.__privateRemaining() == 0:
+          log.debug("deadline passed; abandoning uri: {0}".format(uri))
+          self.__partial = True
+          return missing
+        if self.__asyncPending is not None:
+          # Asynchronous discovery performs the retrieval after the pass;
+          # until then the placeholder stands in for the result.
+          self.__asyncPending[key] = retrieval
+          return placeholder
+        pending = self.__pendingUris.get(key)
+        if pending is None:
+          pending = threading.Event()
+          self.__pendingUris[key] = pending
+          break
+      # Another thread is performing the retrieval; wait for it and use its
+      # result.  If it failed to produce one we try the retrieval ourselves.
+      pending.wait()
+
+    try:
+      result = Retrieval(retrieval()).run(self.__privateConnectionPool)
+      with self.__cachedUrisLock:
+        cache[uri] = result
+    except _DeadlineExceeded:
+      log.debug("deadline passed; abandoning uri: {0}".format(uri))
+      self.__partial = True
+      result = missing
+    finally:
+      with self.__cachedUrisLock:
+        del self.__pendingUris[key]
+      pending.set()
+
+    return result
+
+  ####################################################################
+  def __privateCategoryLead(self, kind):
+    """Returns the refresh lead, in seconds, of the cached results of the
+    kind of category; at most half the category's refresh.
+    """
+    lead = self.__privateRefreshLead
+    if lead > (self.__privateCategoryRefresh(kind) // 2):
+      log.debug("forcing {0} lead maximum: half the refresh".format(kind))
+      lead = self.__privateCategoryRefresh(kind) // 2
+    return lead
+
+  ####################################################################
+  def __privateCategoryRefresh(self, kind):
+    """Returns the refresh, in seconds, of the cached results of the kind of
+    category (nightly, latest or released) per, in order, the distribution's
+    refresh defaults, the cache category-refresh defaults and the cache
+    refresh.
+    """
+    if kind not in self.__categoryRefreshes:
+      refresh = None
+      try:
+        refresh = self.defaults([self.name().lower(), "refresh", kind])
+        if refresh is None:
+          refresh = self.defaults(["cache", "category-refresh", kind])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default {0} refresh: the refresh".format(kind))
+
+      if refresh is None:
+        seconds = self.__privateCacheRefresh
+      else:
+        seconds = self.__privateIntervalSeconds(
+                    refresh,
+                    "{0} refresh".format(kind),
+                    "the refresh",
+                    [self.__privateCacheRefresh // 60])
+        if seconds < 60:
+          log.debug("forcing {0} refresh minimum: 1 minute".format(kind))
+          seconds = 60
+      self.__categoryRefreshes[kind] = seconds
+
+    return self.__categoryRefreshes[kind]
+
+  ####################################################################
+  def __privateCheckDeadline(self):
+    """Raises _DeadlineExceeded if the deadline has passed.
+    """
+    if self.__privateRemaining() == 0:
+      raise _DeadlineExceeded()
+
+  ####################################################################
+  @property
+  def __privateCircuitBreaker(self):
+    with self.__transportLock:
+      if Repository.__circuitBreaker is None:
+        Repository.__circuitBreaker = CircuitBreaker(
+                            transportPolicy = self.__privateTransportPolicy)
+    return Repository.__circuitBreaker
+
+  ####################################################################
+  @property
+  def __privateConnectionPool(self):
+    with self.__transportLock:
+      if Repository.__connectionPool is None:
+        Repository.__connectionPool = ConnectionPool(
+                              circuitBreaker = self.__privateCircuitBreaker,
+                              transportPolicy = self.__privateTransportPolicy,
+                              archive = self.__privateCrawlArchive)
+    return Repository.__connectionPool
+
+  ####################################################################
+  @property
+  def __privateCrawlArchive(self):
+    with self.__transportLock:
+      if not Repository.__crawlArchiveResolved:
+        Repository.__crawlArchiveResolved = True
+        settings = None
+        try:
+          settings = self.defaults(["archive"])
+        except defaults.DefaultsException as ex:
+          log.warn("exception accessing defaults: {0}".format(ex))
+          log.info("using no crawl archive")
+
+        if settings is None:
+          settings = {}
+        if not isinstance(settings, dict):
+          log.warn("archive settings are not a dictionary: {0}"
+                    .format(settings))
+          log.info("using no crawl archive")
+          settings = {}
+
+        (path, mode) = (settings.get("file"), settings.get("mode"))
+        if (path is not None) or (mode is not None):
+          if path is None:
+            log.warn("no crawl archive file for mode: {0}".format(mode))
+            log.info("using no crawl archive")
+          elif mode not in (CrawlArchive.RECORD, CrawlArchive.REPLAY):
+            log.warn("unknown crawl archive mode: {0}".format(mode))
+            log.info("using no crawl archive")
+          else:
+            # An unreadable archive to replay is an error rather than
+            # grounds for accessing the network.
+            Repository.__crawlArchive = CrawlArchive(path, mode)
+    return Repository.__crawlArchive
+
+  ####################################################################
+  @property
+  def __privateCrawlConcurrency(self):
+    if self.__crawlConcurrency is None:
+      try:
+        self.__crawlConcurrency = self.defaults(["crawl", "concurrency"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default crawl concurrency: 16")
+
+      if self.__crawlConcurrency is None:
+        self.__crawlConcurrency = 16
+
+      try:
+        self.__crawlConcurrency = int(self.__crawlConcurrency)
+      except ValueError:
+        log.warn("could not convert crawl concurrency to integer: {0}"
+                  .format(self.__crawlConcurrency))
+        log.info("using default crawl concurrency: 16")
+        self.__crawlConcurrency = 16
+
+      if self.__crawlConcurrency < 1:
+        log.debug("forcing crawl concurrency minimum: 1")
+        self.__crawlConcurrency = 1
+
+    return self.__crawlConcurrency
+
+  ####################################################################
+  @property
+  def __privateCrawler(self):
+    if Repository.__asyncCrawler is None:
+      Repository.__asyncCrawler = AsyncCrawler(
+                              self.__privateCrawlConcurrency,
+                              circuitBreaker = self.__privateCircuitBreaker,
+                              transportPolicy = self.__privateTransportPolicy,
+                              archive = self.__privateCrawlArchive)
+    return Repository.__asyncCrawler
+
+  ####################################################################
+  def __privateDecodeBody(self, body, encoding):
+    if encoding is not None:
+      encoding = encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+      body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+      # Servers differ as to whether deflate is zlib-wrapped or raw.
+      try:
+        body = zlib.decompress(body)
+      except zlib.error:
+        body = zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+  ####################################################################
+  def __privateDecompressor(self, encoding):
+    """Returns an object for incrementally decoding a body with the
+    specified content encoding.
+    """
+    if encoding is not None:
+      encoding = encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+      return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+      # Accepts zlib-wrapped deflate; raw deflate is left to the fallback of
+      # full retrieval.
+      return zlib.decompressobj(32 + zlib.MAX_WBITS)
+    return _IdentityDecompressor()
+
+  ####################################################################
+  @contextlib.contextmanager
+  def __privateClaimEntry(self, name):
+    """Context manager holding the claim to scan the named cache entry anew.
+    Asynchronous discovery passes must not hold up the instance's other
+    passes; they raise _AsyncPassIncomplete rather than waiting on the claim.
+    """
+    with self.__privateStorage.claim(
+          name,
+          blocking = self.__asyncPending is None) as claimed:
+      if not claimed:
+        raise _AsyncPassIncomplete()
+      yield
+
   ####################################################################
   def __privateDirPath(self):
     return os.path.sep.join([self.__privateCacheRoot,
@@ -452,73 +1308,1018 @@ class Repository(factory.Factory, defaults.DefaultsFileInfo):
                              self.className()])
 
   ####################################################################
-  def __privateFileMtime(self, openFile):
-    stats = os.fstat(openFile.fileno())
-    return stats.st_mtime
+  def __privateEntryNames(self):
+    """Returns a list of tuples of the name, category and architecture
+    (None if architecture agnostic) of every cache entry of the repo class.
+    """
+    names = []
+    for architecture in sorted(architectures.Architecture.choices()):
+      for category in (self._categoryNightly(architecture),
+                       self._categoryLatest(architecture),
+                       self._categoryReleased(architecture)):
+        names.extend([
+          (self.__privateAgnosticFileName(category), category, None),
+          (self.__privateAvailableFileName(category, architecture),
+           category, architecture)])
+    return names
 
   ####################################################################
-  def __privateLoadFile(self, openFile, finder, logMessage,
-                        dependencyMtime = None, forceScan = False):
-    roots = None
-    stats = os.fstat(openFile.fileno())
-    # Truncate the file if ...
-    #   - we've been explicitly told to or
-    #   - its dependency is more recent than the file itself or
-    #   - it's been more than the cache refresh time since it was updated or
-    #   - it contains no actual data (i.e., it's zero size, indicating a newly
-    #     created file) or
-    #   - the contained data indicates an error occurred.
-    forceScan = (forceScan
-                  or ((dependencyMtime is not None)
-                      and (dependencyMtime > stats.st_mtime))
-                  or ((time.time() - stats.st_mtime)
-                      >= self.__privateCacheRefresh)
-                  or (stats.st_size == 0))
-    if not forceScan:
-      roots = json.loads(openFile.read())
-      forceScan = self.uriError in roots
-
-    if forceScan:
+  @property
+  def __privateErrorsTtl(self):
+    if self.__errorsTtl is None:
+      try:
+        self.__errorsTtl = self.defaults(["cache", "errors", "ttl"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default errors ttl: 1 hour")
+
+      if self.__errorsTtl is None:
+        self.__errorsTtl = "1-0"
+
+      self.__errorsTtl = self.__privateIntervalSeconds(self.__errorsTtl,
+                                                       "errors ttl",
+                                                       "1 hour",
+                                                       [1, 0])
+
+    return self.__errorsTtl
+
+  ####################################################################
+  def __privateExistenceProbe(self, uri, retries):
+    """Generator implementing the probe of the existence of the uri; run
+    via Retrieval.
+    """
+    exists = False
+    log.debug("probing existence of uri: {0}".format(uri))
+    if retries is None:
+      retries = self.__privateTransportPolicy.retries(
+                                                urlparse.urlparse(uri).netloc)
+    location = uri
+    redirects = 0
+    iteration = 0
+    while iteration < retries:
+      self.__privateCheckDeadline()
+      parsed = urlparse.urlparse(location)
+      method = ("GET" if self.__headRejectingHosts.get(parsed.netloc, False)
+                      else "HEAD")
+      responseHeaders = None
+      try:
+        (status, responseHeaders, _) = yield Retrieval.Request(parsed.netloc,
+                                                               method,
+                                                               parsed.path,
+                                                               None,
+                                                  self.__privateRemaining())
+        if (method == "HEAD") and (status in (405, 501)):
+          log.debug("HEAD rejected by {0}; probing with GET"
+                      .format(parsed.netloc))
+          self.__headRejectingHosts[parsed.netloc] = True
+          (status, responseHeaders, _) = yield Retrieval.Request(
+                                                    parsed.netloc,
+                                                    "GET",
+                                                    parsed.path,
+                                                    None,
+                                                    self.__privateRemaining())
+        if status == 200:
+          exists = True
+          break
+        if self.__retryPolicy.isRedirect(status):
+          location = self.__retryPolicy.redirection(location,
+                                                    responseHeaders,
+                                                    redirects)
+          if location is None:
+            log.info("unfollowable redirect; caching non-existence of {0}"
+                      .format(uri))
+            break
+          log.debug("following redirect to {0}".format(location))
+          redirects += 1
+          continue
+        if not self.__retryPolicy.isRetryable(status):
+          log.debug("response status {0}; caching non-existence of {1}"
+                      .format(status, uri))
+          break
+        log.debug("response status {0} on iteration {1}"
+                    .format(status, iteration))
+      except CircuitOpenException as ex:
+        log.info("{0}; caching non-existence of {1}".format(ex, uri))
+        break
+      except self.__retryPolicy.retryExceptions as ex:
+        log.debug("socket error on iteration {0}: {1}".format(iteration, ex))
+
+      iteration += 1
+      if iteration < retries:
+        sleep = self.__retryPolicy.delay(iteration - 1, responseHeaders)
+        if self.__privateRemaining() is not None:
+          sleep = min(sleep, self.__privateRemaining())
+        log.debug("sleeping {0:.2f} second(s) before retrying".format(sleep))
+        yield Retrieval.Sleep(sleep)
+    else: # while
+      log.info("retries exhausted; caching non-existence of {0}".format(uri))
+
+    return exists
+
+  ####################################################################
+  def __privateExpiry(self, mtime, roots, kind):
+    """Returns the time at which the roots, of the kind of category and saved
+    at mtime, expire.
+    """
+    expires = mtime + self.__privateCategoryRefresh(kind)
+    if (roots is not None) and (self.uriError in roots):
+      expires = min(expires, mtime + self.__privateErrorsTtl)
+    return expires
+
+
+  ####################################################################
+  def __privateFilterRepos(self, category, architecture, repos):
+    """Returns the repos of the category available for the architecture per
+    _filterRepos.
+
+    If scanning incrementally (per the cache defaults) and not forced those
+    repos found available, at the same uri, when the category's available
+    roots were last saved are carried forward; only the others (new, moved
+    or previously unavailable) are filtered.
+    """
+    if (not self.__privateIncremental) or self.args.forceScan:
+      return self._filterRepos(repos, architecture)
+
+    with self.__privateOpenEntry(
+        self.__privateAvailableFileName(category, architecture)) as entry:
+      available = entry.roots()
+    if available is None:
+      return self._filterRepos(repos, architecture)
+
+    unchanged = dict([ (key, value) for (key, value) in repos.items()
+                        if (key != self.uriError)
+                          and (available.get(key) == value) ])
+    changed = dict([ (key, value) for (key, value) in repos.items()
+                      if key not in unchanged ])
+    log.debug("carrying forward {0} of {1} {2} {3} {4} repos"
+                .format(len(unchanged), len(repos), self.className(),
+                        category, architecture))
+    filtered = self._filterRepos(changed, architecture)
+    return dict([ (key, value) for (key, value) in repos.items()
+                  if (key in filtered) or (key in unchanged) ])
+
+  ####################################################################
+  def __privateFinderName(self, finder):
+    """Returns the name of the instance's method of which the finder, a
+    functools.partial, is a partial application, by which the method may be
+    looked up on another instance, or None if it is not one.
+    """
+    method = getattr(finder, "func", None)
+    if getattr(method, "__self__", None) is not self:
+      return None
+    name = method.__name__
+    if name.startswith("__") and (not name.endswith("__")):
+      # A private method; its name as mangled by its class.
+      name = "_{0}{1}".format(method.__qualname__.split(".")[-2].lstrip("_"),
+                              name)
+    if (getattr(getattr(self, name, None), "__func__", None)
+        is not method.__func__):
+      return None
+    return name
+
+  ####################################################################
+  @property
+  def __privateIncremental(self):
+    if self.__incremental is None:
+      try:
+        self.__incremental = self.defaults(["cache", "incremental"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default incremental: False")
+
+      if self.__incremental is None:
+        self.__incremental = False
+      if not isinstance(self.__incremental, bool):
+        log.warn("incremental is not a boolean: {0}"
+                  .format(self.__incremental))
+        log.info("using default incremental: False")
+        self.__incremental = False
+
+    return self.__incremental
+
+  ####################################################################
+  def __privateIntervalSeconds(self, interval, name, defaultDescription,
+                               defaultFields):
+    """Returns the number of seconds specified by the interval formatted as
+    <days>-<hours>-<minutes> with fields interpreted right-to-left.
+    """
+    fields = "{0}".format(interval).split("-")
+    if len(fields) > 3:
+      log.warn("more than three {0} fields specified: {1}"
+                .format(name, interval))
+      fields = fields[-3:]
+      log.info("using rightmost fields as {0}: {1}"
+                .format(name, "-".join(fields)))
+
+    try:
+      fields = list(map(lambda x: int(x), fields))
+    except ValueError:
+      log.warn("could not convert one or more fields to integers: {0}"
+                .format("-".join(fields)))
+      log.info("using default {0}: {1}".format(name, defaultDescription))
+      fields = list(defaultFields)
+
+    fields.reverse()
+    fields = dict(itertools.zip_longest(("minutes", "hours", "days"),
+                                        fields, fillvalue = 0))
+
+    return ((fields["days"] * 86400)
+            + (fields["hours"] * 3600)
+            + (fields["minutes"] * 60))
+
+  ####################################################################
+  def __privateIsRefreshing(self, name):
+    """Returns True if this process is refreshing the named cache entry in
+    the background; False if it is not or name is None.
+    """
+    if name is None:
+      return False
+    with self.__refreshingLock:
+      process = self.__refreshing.get(
+                  os.path.sep.join([self.__privateDirPath(), name]))
+      return (process is not None) and (process.poll() is None)
+
+  ####################################################################
+  def __privateListingRequest(self, parsed, stored):
+    """Returns a tuple of the path and headers with which to request the
+    listing at the parsed uri given its stored listing, if any.
+    """
+    # Listings are requested compressed and, from Apache, in its compact
+    # autoindex format (an unadorned list of links) unless the uri specifies
+    # the format.
+    path = parsed.path
+    if parsed.query != "":
+      path = "{0}?{1}".format(path, parsed.query)
+    elif self.__apacheHosts.get(parsed.netloc, False):
+      path = "{0}?F=0".format(path)
+
+    # If we have a stored listing for the uri we revalidate it rather than
+    # retrieving it anew.
+    headers = { "Accept-Encoding" : "gzip, deflate" }
+    if stored is not None:
+      if stored["etag"] is not None:
+        headers["If-None-Match"] = stored["etag"]
+      if stored["last-modified"] is not None:
+        headers["If-Modified-Since"] = stored["last-modified"]
+
+    return (path, headers)
+
+  ####################################################################
+  @property
+  def __privateListingStore(self):
+    path = os.path.sep.join([self.__privateDirPath(), "listings.json"])
+    with self.__listingStoresLock:
+      if path not in self.__listingStores:
+        self.__listingStores[path] = ListingStore(
+                                    path,
+                                    self.__privateListingsTtl,
+                                    self.__privateListingsSize,
+                                    (self.__privateCacheDurability
+                                      == CacheStorage.FSYNC))
+      return self.__listingStores[path]
+
+  ####################################################################
+  @property
+  def __privateListingsSize(self):
+    if self.__listingsSize is None:
+      try:
+        self.__listingsSize = self.defaults(["cache", "listings", "size"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default listings size: 16384 KiB")
+
+      if self.__listingsSize is None:
+        self.__listingsSize = 16384
+
+      try:
+        self.__listingsSize = int(self.__listingsSize)
+      except ValueError:
+        log.warn("could not convert listings size to integer: {0}"
+                  .format(self.__listingsSize))
+        log.info("using default listings size: 16384 KiB")
+        self.__listingsSize = 16384
+
+      self.__listingsSize *= 1024
+
+    return self.__listingsSize
+
+  ####################################################################
+  @property
+  def __privateListingsTtl(self):
+    # A ttl of zero indicates listings are not cached; i.e., they are
+    # always revalidated.
+    if self.__listingsTtl is None:
+      try:
+        self.__listingsTtl = self.defaults(["cache", "listings", "ttl"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default listings ttl: none")
+
+      if self.__listingsTtl is None:
+        self.__listingsTtl = 0
+      else:
+        self.__listingsTtl = self.__privateIntervalSeconds(self.__listingsTtl,
+                                                           "listings ttl",
+                                                           "none",
+                                                           [0])
+
+    return None if self.__listingsTtl == 0 else self.__listingsTtl
+
+  ####################################################################
+  def __privateLoadEntry(self, name, kind, finder, logMessage,
+                         dependencyMtime = None, forceScan = False,
+                         dependency = None):
+    """Returns the roots of the named cache entry, of the kind of category
+    (nightly, latest or released), scanning them anew via finder if need be.
+
+    dependency, if not None, is a tuple of the name of the cache entry from
+    whose roots the entry's are derived and those roots; finder is called
+    with the roots (or, refreshing in the background, those then saved).
+
+    The entry is read under a shared lock, so that its readers proceed
+    concurrently.  A scan is performed holding only the entry's claim, so
+    that the entry is scanned by at most one at a time, and its result
+    atomically replaces the entry's roots; the entry's readers continue to
+    use its current roots meanwhile.
+    """
+    dependencyName = None
+    if dependency is not None:
+      dependencyName = dependency[0]
+    with self.__privateOpenEntry(name) as entry:
+      (roots, rescan) = self.__privateReadEntry(entry, name, kind, finder,
+                                                logMessage, dependencyMtime,
+                                                forceScan, dependencyName)
+    if not rescan:
+      return roots
+
+    with self.__privateClaimEntry(name):
+      if not forceScan:
+        # Another may have rescanned the entry while we awaited its claim.
+        with self.__privateOpenEntry(name) as entry:
+          (roots, rescan) = self.__privateReadEntry(entry, name, kind,
+                                                    finder, logMessage,
+                                                    dependencyMtime,
+                                                    dependency = dependencyName)
+        if not rescan:
+          return roots
+
       log.info(logMessage)
-      openFile.truncate(0)
-      openFile.seek(0)
-      self.__privateSaveFile(openFile, finder())
-      openFile.seek(0)
-      roots = json.loads(openFile.read())
+      if dependency is not None:
+        finder = functools.partial(finder, dependency[1])
+      (roots, partial) = self.__privateScan(name, finder)
+      if (self.__asyncPending is not None) and (len(self.__asyncPending) > 0):
+        # The scan is incomplete; leave the entry as is until it is not.
+        raise _AsyncPassIncomplete()
+      if partial:
+        # The scan was cut short by the deadline; a partial result must not
+        # replace the entry's contents.
+        log.warn("deadline passed; not saving partial {0} results"
+                  .format(self.className()))
+        self.__privateListingStore.save()
+        return roots
+      self.__privateReplaceEntry(name, roots)
+      self.__privateListingStore.save()
+      with self.__privateOpenEntry(name) as entry:
+        roots = entry.roots()
 
     return roots
 
   ####################################################################
-  def __privateOpenFile(self, name):
+  def __privateMergeEntry(self, name, roots, mtime):
+    """Replaces the roots of the named cache entry with the imported roots,
+    saved at mtime, unless those cached are as recent, returning True if
+    replaced.
+    """
+    with self.__privateStorage.claim(name):
+      cached = self.__privateStorage.mtime(name)
+      if (cached is not None) and (cached >= mtime):
+        return False
+      log.info("Importing saved {0} {1}".format(self.className(), name))
+      self.__privateStorage.replace(name, roots, mtime)
+    return True
+
+  ####################################################################
+  def __privateNightlyKind(self, architecture):
+    """Returns the kind of category as which the architecture's nightly
+    roots are refreshed; where they are the latest roots (e.g., Fedora's)
+    that is latest.
+    """
+    if (self._categoryNightly(architecture)
+        == self._categoryLatest(architecture)):
+      return "latest"
+    return "nightly"
+
+  ####################################################################
+  @property
+  def __privateOffline(self):
+    with self.__transportLock:
+      if Repository.__offline is None:
+        offline = None
+        try:
+          offline = self.defaults(["cache", "offline"])
+        except defaults.DefaultsException as ex:
+          log.warn("exception accessing defaults: {0}".format(ex))
+          log.info("using default offline: False")
+
+        if offline is None:
+          offline = False
+        if not isinstance(offline, bool):
+          log.warn("offline is not a boolean: {0}".format(offline))
+          log.info("using default offline: False")
+          offline = False
+
+        Repository.__offline = offline
+    return Repository.__offline
+
+  ####################################################################
+  def __privateOpenEntry(self, name):
+    """Returns the named cache entry, for reading, once its shared lock is
+    acquired.  Asynchronous discovery passes must not hold up the instance's
+    other passes; they raise _AsyncPassIncomplete rather than waiting on the
+    lock.
+    """
     try:
-      os.makedirs(self.__privateDirPath(), 0o700)
-    except OSError as ex:
-      if ex.errno != errno.EEXIST:
-        raise
+      return self.__privateStorage.open(name,
+                                        blocking = self.__asyncPending is None,
+                                        shared = True)
+    except CacheStorageBusyException:
+      raise _AsyncPassIncomplete()
+
+  ####################################################################
+  def __privateNoteServer(self, netloc, server):
+    self.__apacheHosts[netloc] = (
+      (server is not None) and server.lower().startswith("apache"))
+
+  ####################################################################
+  @property
+  def __privateProbeWorkers(self):
+    if self.__probeWorkers is None:
+      try:
+        self.__probeWorkers = self.defaults(["probes", "workers"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default probe workers: 8")
+
+      if self.__probeWorkers is None:
+        self.__probeWorkers = 8
+
+      try:
+        self.__probeWorkers = int(self.__probeWorkers)
+      except ValueError:
+        log.warn("could not convert probe workers to integer: {0}"
+                  .format(self.__probeWorkers))
+        log.info("using default probe workers: 8")
+        self.__probeWorkers = 8
+
+      if self.__probeWorkers < 1:
+        log.debug("forcing probe workers minimum: 1")
+        self.__probeWorkers = 1
+
+    return self.__probeWorkers
+
+
+  ####################################################################
+  def __privateRetrieval(self, uri, retries):
+    """Generator implementing the retrieval of the entries of the uri's
+    listing; run via Retrieval.
+    """
+    entries = None
+    log.debug("retrieving listing from uri: {0}".format(uri))
+
+    stored = self.__privateListingStore.get(uri)
+    if (stored is not None) and self.__privateListingStore.isFresh(stored):
+      log.debug("using stored listing for uri: {0}".format(uri))
+      return self.__privateStoredEntries(stored)
+
+    if retries is None:
+      retries = self.__privateTransportPolicy.retries(
+                                                urlparse.urlparse(uri).netloc)
+    location = uri
+    redirects = 0
+    iteration = 0
+    while iteration < retries:
+      self.__privateCheckDeadline()
+      parsed = urlparse.urlparse(location)
+      (path, headers) = self.__privateListingRequest(parsed, stored)
+      responseHeaders = None
+      try:
+        (status, responseHeaders, body) = yield Retrieval.Request(
+                                                    parsed.netloc,
+                                                    "GET",
+                                                    path,
+                                                    headers,
+                                                    self.__privateRemaining())
+        self.__privateNoteServer(parsed.netloc, responseHeaders.get("server"))
+        if (status == 304) and (stored is not None):
+          log.debug("stored listing still valid for uri: {0}".format(uri))
+          entries = self.__privateStoredEntries(stored)
+          self.__privateListingStore.revalidated(uri)
+          break
+        if status == 200:
+          entries = ListingParser.parse(self.__privateDecodeBody(
+                              body,
+                              responseHeaders.get("content-encoding")
+                                              ).decode("UTF-8"))
+          self.__privateListingStore.put(
+                                      uri,
+                                      entries,
+                                      responseHeaders.get("etag"),
+                                      responseHeaders.get("last-modified"))
+          break
+        if self.__retryPolicy.isRedirect(status):
+          location = self.__retryPolicy.redirection(location,
+                                                    responseHeaders,
+                                                    redirects)
+          if location is None:
+            log.info("unfollowable redirect; caching uri error for {0}"
+                      .format(uri))
+            break
+          log.debug("following redirect to {0}".format(location))
+          redirects += 1
+          continue
+        if not self.__retryPolicy.isRetryable(status):
+          # We log this at info level because some distributions don't
+          # necessarily support all the architectures of potential interest.
+          log.info("response status {0}; caching uri error for {1}"
+                    .format(status, uri))
+          break
+        log.debug("response status {0} on iteration {1}"
+                    .format(status, iteration))
+      except CircuitOpenException as ex:
+        log.info("{0}; caching uri error for {1}".format(ex, uri))
+        break
+      except self.__retryPolicy.retryExceptions as ex:
+        log.debug("socket error on iteration {0}: {1}".format(iteration, ex))
+      except (zlib.error, UnicodeDecodeError):
+        log.debug("undecodable response on iteration {0}".format(iteration))
+
+      iteration += 1
+      if iteration < retries:
+        sleep = self.__retryPolicy.delay(iteration - 1, responseHeaders)
+        if self.__privateRemaining() is not None:
+          sleep = min(sleep, self.__privateRemaining())
+        log.debug("sleeping {0:.2f} second(s) before retrying".format(sleep))
+        yield Retrieval.Sleep(sleep)
+    else: # while
+      # We log this at info level because some distributions don't
+      # necessarily support all the architectures of potential interest.
+      log.info("retries exhausted; caching uri error for {0}".format(uri))
+
+    return entries
+
+  ####################################################################
+  def __privateReadEntry(self, entry, name, kind, finder, logMessage,
+                         dependencyMtime = None, forceScan = False,
+                         dependency = None):
+    """Returns a tuple of the roots of the open cache entry, of the kind of
+    category, and whether they are to be scanned anew.  dependency, if not
+    None, is the name of the cache entry from whose roots the entry's are
+    derived (see __privateLoadEntry).
+    """
+    mtime = entry.mtime()
+    if self.__privateOffline:
+      # Use whatever is cached, whatever its age, and never scan.
+      if mtime is None:
+        log.warn("{0} skipped; offline with no saved results"
+                  .format(logMessage.strip()))
+        self.__partial = True
+        return ({}, False)
+      return (entry.roots(), False)
+
+    # Rescan the entry if ...
+    #   - we've been explicitly told to or
+    #   - it contains no actual data (e.g., it's newly created) or
+    #   - it's stale; i.e.,
+    #     - its dependency is more recent than the entry itself or
+    #     - it's been more than its category's refresh time since it was
+    #       updated or
+    #     - the contained data indicates an error occurred and it's been more
+    #       than the errors ttl since it was updated.
+    # Stale data may instead be used while the entry is refreshed in the
+    # background; as may that of an entry whose dependency is being
+    # refreshed in the background, the entry being refreshed thereafter.
+    if forceScan or (mtime is None):
+      return (None, True)
+    roots = entry.roots()
+    stale = (((dependencyMtime is not None) and (dependencyMtime > mtime))
+             or (time.time() >= self.__privateExpiry(mtime, roots, kind)))
+    if ((stale or self.__privateIsRefreshing(dependency))
+        and self.__privateStaleWhileRevalidate
+        and (not self.__revalidating)
+        and self.__privateRevalidate(name, finder, logMessage, mtime,
+                                     dependency)):
+      return (roots, False)
+    return (roots, stale)
+
+  ####################################################################
+  @property
+  def __privateRefreshLead(self):
+    if self.__refreshLead is None:
+      try:
+        self.__refreshLead = self.defaults(["cache", "lead"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default lead: 1 hour")
+
+      if self.__refreshLead is None:
+        self.__refreshLead = "1-0"
+
+      self.__refreshLead = self.__privateIntervalSeconds(self.__refreshLead,
+                                                         "lead",
+                                                         "1 hour",
+                                                         [1, 0])
+
+    return self.__refreshLead
+
+  ####################################################################
+  def __privateRefresh(self, name, finder, logMessage, mtime,
+                       dependency = None):
+    """Refreshes the named cache entry, last modified at mtime, unless
+    another refresher (in any process) has done or is doing so; finder is a
+    tuple of the name of the instance's method by which the entry is found
+    and the arguments with which it is called.  Once an entry from whose
+    roots others are derived is refreshed those cached are refreshed in turn.
+
+    dependency, if not None, is the name of the cache entry from whose roots
+    the entry's are derived; the entry is derived from them as saved.
+
+    Performed by the instance of a detached process; see _refreshDetached.
+    """
+    path = os.path.sep.join([self.__privateDirPath(), name])
     try:
-      fd = os.open(os.path.sep.join([self.__privateDirPath(), name]),
-                   os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o640)
-    except OSError as ex:
-      if ex.errno != errno.EEXIST:
-        raise
-      fd = os.open(os.path.sep.join([self.__privateDirPath(), name]),
-                   os.O_RDWR, 0o640)
+      with self.__privateStorage.claim(name, blocking = False) as claimed:
+        if not claimed:
+          log.debug("already refreshing: {0}".format(path))
+          return
+        saved = self.__privateStorage.mtime(name)
+        if ((saved != mtime)
+            and ((dependency is None)
+                 or ((saved is not None)
+                     and (saved >= (self.__privateStorage.mtime(dependency)
+                                    or 0))))):
+          log.debug("already refreshed: {0}".format(path))
+          return
+
+        finder = functools.partial(getattr(self, finder[0]), *finder[1])
+        if dependency is not None:
+          with self.__privateOpenEntry(dependency) as entry:
+            dependencyRoots = entry.roots()
+          if dependencyRoots is None:
+            log.debug("not refreshing {0}; {1} not saved"
+                        .format(path, dependency))
+            return
+          finder = functools.partial(finder, dependencyRoots)
+        log.info(logMessage)
+        (roots, partial) = self.__privateScan(name, finder)
+        if partial:
+          log.warn("deadline passed; not saving partial {0} results"
+                    .format(self.className()))
+          return
+        self.__privateReplaceEntry(name, roots)
+        self.__privateStorage.sync()
+        self.__privateListingStore.save()
+    except Exception as ex:
+      log.warn("exception refreshing {0}: {1}".format(path, ex))
+      return
+
+    if dependency is not None:
+      return
+    dependents = set([(dependent, category, architecture)
+                        for (dependent, category, architecture)
+                          in self.__privateEntryNames()
+                        if ((architecture is not None)
+                            and (self.__privateAgnosticFileName(category)
+                                 == name))])
+    for (dependent, category, architecture) in sorted(dependents):
+      dependentMtime = self.__privateStorage.mtime(dependent)
+      if dependentMtime is None:
+        continue
+      (finder, logMessage) = self.__privateAvailableFinder(category,
+                                                           architecture)
+      self.__privateRefresh(dependent,
+                            (self.__privateFinderName(finder), finder.args),
+                            logMessage,
+                            dependentMtime,
+                            name)
+
+  ####################################################################
+  def __privateRemaining(self):
+    """Returns the number of seconds remaining before the deadline or None
+    if there is no deadline.
+    """
+    if self.__deadline is None:
+      return None
+    return max(0, self.__deadline - time.time())
+
+  ####################################################################
+  def __privateReplaceEntry(self, name, roots):
+    """Replaces the roots of the named cache entry with those scanned anew
+    followed, if scanning incrementally and the scan walked any listing
+    entries, by the results of their walks (as the entry's walked entry).
+    """
+    self.__privateStorage.replace(name, roots)
+    walked = self.__walkedResults.pop(name, None)
+    if (walked is not None) and (len(walked[1]) > 0):
+      self.__privateStorage.replace(*walked)
+
+  ####################################################################
+  def __privateResult(self, roots, partial):
+    return PartialResult(roots) if partial else roots
+
+  ####################################################################
+  async def __privateRetrieveAsync(self, key, retrieval):
+    (kind, uri) = key
     try:
-      openFile = os.fdopen(fd, "r+")
-    except:
-      os.close(fd)
-      raise
+      result = await Retrieval(retrieval()).runAsync(self.__privateCrawler)
+    except _DeadlineExceeded:
+      # The next pass finds the uri missing and the deadline passed.
+      return
+    with self.__cachedUrisLock:
+      self.__cachedUris[kind][uri] = result
+
+  ####################################################################
+  def __privateRevalidate(self, name, finder, logMessage, mtime,
+                          dependency = None):
+    """Starts the refresh, in a detached process, of the named stale cache
+    entry unless this process is already refreshing it or its dependency
+    (the name of the entry from whose roots the entry's are derived), if
+    any; the refresh of the dependency refreshes the entry thereafter.
+    Returns True if the entry is being refreshed, else False (e.g., the
+    process could not be started) in which case the entry is to be scanned
+    anew by the caller.
+
+    The process is detached so as to outlive this one; e.g., an interactive
+    invocation exits once it has used the stale roots.
+    """
+    path = os.path.sep.join([self.__privateDirPath(), name])
+    with self.__refreshingLock:
+      for (refreshing, process) in list(self.__refreshing.items()):
+        if process.poll() is not None:
+          del self.__refreshing[refreshing]
+      if path in self.__refreshing:
+        return True
+      if ((dependency is not None)
+          and (os.path.sep.join([self.__privateDirPath(), dependency])
+               in self.__refreshing)):
+        log.debug("using stale {0}; refreshing after {1}"
+                    .format(path, dependency))
+        return True
+
+      finderName = self.__privateFinderName(finder)
+      if finderName is None:
+        log.warn("cannot refresh {0} in background; finder is not a method"
+                 " of {1}".format(path, self.className()))
+        return False
+      request = { "module"     : type(self).__module__,
+                  "class"      : type(self).__name__,
+                  "args"       : self.args,
+                  "name"       : name,
+                  "finder"     : (finderName, finder.args),
+                  "logMessage" : logMessage,
+                  "mtime"      : mtime,
+                  "dependency" : dependency }
+      # The process imports the repo class as this one did.
+      environment = dict(os.environ)
+      environment["PYTHONPATH"] = os.pathsep.join(sys.path)
+      try:
+        process = subprocess.Popen(
+                    [sys.executable, "-c",
+                     "import sys; from {0} import Repository;"
+                     " Repository._refreshDetached(sys.stdin.buffer)"
+                      .format(__name__)],
+                    stdin = subprocess.PIPE,
+                    stdout = subprocess.DEVNULL,
+                    stderr = subprocess.DEVNULL,
+                    env = environment,
+                    start_new_session = True)
+        try:
+          pickle.dump(request, process.stdin)
+        finally:
+          process.stdin.close()
+      except (OSError, pickle.PicklingError) as ex:
+        log.warn("cannot refresh {0} in background: {1}".format(path, ex))
+        return False
+      self.__refreshing[path] = process
+    log.debug("using stale {0}; refreshing in background".format(path))
+    return True
+
+  ####################################################################
+  def __privateScan(self, name, finder):
+    """Returns a tuple of the roots of the named cache entry scanned anew via
+    finder and whether the scan was cut short by the deadline.
 
+    If scanning incrementally the results of the listing entries walked by
+    the scan (see _walkEntry) are recorded to be saved, with the roots, as
+    the entry's walked entry (see __privateReplaceEntry).
+    """
+    if not self.__privateIncremental:
+      return self.__privateTrackPartial(finder)
+    outer = self.__walk
+    self.__walk = [self.__privateWalkedFileName(name), None, {}]
     try:
-      fcntl.flock(openFile, fcntl.LOCK_EX)
-    except:
-      openFile.close()
-      raise
+      result = self.__privateTrackPartial(finder)
+      self.__walkedResults[name] = (self.__walk[0], self.__walk[2])
+    finally:
+      self.__walk = outer
+    return result
 
-    return openFile
+  ####################################################################
+  @property
+  def __privateStaleWhileRevalidate(self):
+    if self.__staleWhileRevalidate is None:
+      try:
+        self.__staleWhileRevalidate = self.defaults(
+                                      ["cache", "stale-while-revalidate"])
+      except defaults.DefaultsException as ex:
+        log.warn("exception accessing defaults: {0}".format(ex))
+        log.info("using default stale-while-revalidate: False")
+
+      if self.__staleWhileRevalidate is None:
+        self.__staleWhileRevalidate = False
+      if not isinstance(self.__staleWhileRevalidate, bool):
+        log.warn("stale-while-revalidate is not a boolean: {0}"
+                  .format(self.__staleWhileRevalidate))
+        log.info("using default stale-while-revalidate: False")
+        self.__staleWhileRevalidate = False
+
+    return self.__staleWhileRevalidate
+
+  ####################################################################
+  @property
+  def __privateStorage(self):
+    key = (self.__privateCacheStorage, self.__privateCacheDurability,
+           self.__privateDirPath())
+    with self.__storagesLock:
+      if key not in self.__storages:
+        if self.__privateCacheStorage == "sqlite":
+          self.__storages[key] = SqliteCacheStorage(
+                                    os.path.sep.join(
+                                      [self.__privateCacheRoot,
+                                       self.__privateCacheSubdir,
+                                       "cache.sqlite"]),
+                                    self.className(),
+                                    self.__privateCacheDurability)
+        else:
+          self.__storages[key] = FileCacheStorage(
+                                    self.__privateDirPath(),
+                                    self.__privateCacheDurability)
+      return self.__storages[key]
+
+  ####################################################################
+  def __privateStoredEntries(self, stored):
+    return [ListingParser.Entry(*entry) for entry in stored["entries"]]
+
+  ####################################################################
+  def __privateStreamEntries(self, uri):
+    """Generator yielding the entries in the uri's listing as it is read.
+
+    Returns None if the listing was completely read (in which case it is
+    cached) else the number of entries yielded before streaming failed.  If
+    the generator is closed before the end of the listing the remainder is
+    not read and the listing is not cached.
+    """
+    parsed = urlparse.urlparse(uri)
+    store = self.__privateListingStore
+    stored = store.get(uri)
+    if (stored is not None) and store.isFresh(stored):
+      return 0
+    if self.__privateOffline or (self.__privateRemaining() == 0):
+      return 0
+    (path, headers) = self.__privateListingRequest(parsed, stored)
+
+    log.debug("streaming listing from uri: {0}".format(uri))
+    parser = ListingParser()
+    entries = []
+    yielded = 0
+    # Entries of a revalidated listing, yielded once it's cached.
+    unstreamed = []
+    try:
+      with self.__privateConnectionPool.response(
+                                    parsed.netloc, "GET", path, headers,
+                                    self.__privateRemaining()) as response:
+        self.__privateNoteServer(parsed.netloc, response.getheader("server"))
+        if (response.status == 304) and (stored is not None):
+          response.read()
+          log.debug("stored listing still valid for uri: {0}".format(uri))
+          store.revalidated(uri)
+          entries = self.__privateStoredEntries(stored)
+          unstreamed = entries
+        elif self.__retryPolicy.isMiss(response.status):
+          response.read()
+          log.info("response status {0}; caching uri error for {1}"
+                    .format(response.status, uri))
+          entries = None
+        elif response.status != 200:
+          response.read()
+          log.debug("response status {0} streaming uri: {1}"
+                      .format(response.status, uri))
+          return 0
+        else:
+          decompressor = self.__privateDecompressor(
+                                      response.getheader("content-encoding"))
+          decoder = codecs.getincrementaldecoder("UTF-8")()
+          while True:
+            data = response.read(8192)
+            text = decoder.decode(decompressor.decompress(data)
+                                    if len(data) > 0
+                                    else decompressor.flush(),
+                                  len(data) == 0)
+            for entry in (parser.feed(text) if len(data) > 0
+                            else parser.feed(text) + parser.close()):
+              entries.append(entry)
+              yielded += 1
+              # Should the caller stop (closing the generator) the remainder
+              # is not read; the response being unfinished its connection is
+              # closed rather than returned to the pool.
+              yield entry
+            if len(data) == 0:
+              break
+          store.put(uri,
+                    entries,
+                    response.getheader("etag"),
+                    response.getheader("last-modified"))
+    except (socket.error, httplib.HTTPException, zlib.error,
+            UnicodeDecodeError) as ex:
+      log.debug("error streaming uri {0}: {1}".format(uri, ex))
+      return yielded
+
+    with self.__cachedUrisLock:
+      self.__cachedUris["entries"][uri] = entries
+
+    for entry in unstreamed:
+      yield entry
+    return None
+
+  ####################################################################
+  def __privateTrackPartial(self, function, *args, **kwargs):
+    """Returns a tuple of function(*args, **kwargs) and whether it was cut
+    short by the deadline.
+    """
+    outer = self.__partial
+    self.__partial = False
+    try:
+      result = function(*args, **kwargs)
+      partial = self.__partial
+    finally:
+      self.__partial = outer or self.__partial
+    return (result, partial)
+
+  ####################################################################
+  @property
+  def __privateTransportPolicy(self):
+    with self.__transportLock:
+      if Repository.__transportPolicy is None:
+        settings = None
+        try:
+          settings = self.defaults(["transport"])
+        except defaults.DefaultsException as ex:
+          log.warn("exception accessing defaults: {0}".format(ex))
+          log.info("using default transport settings")
+
+        if (settings is not None) and (not isinstance(settings, dict)):
+          log.warn("transport settings are not a dictionary: {0}"
+                    .format(settings))
+          log.info("using default transport settings")
+          settings = None
+
+        Repository.__transportPolicy = TransportPolicy(settings)
+    return Repository.__transportPolicy
+
+  ####################################################################
+  def __privateWarmEntry(self, name, kind, finder, dependencyMtime = None):
+    """Rescans the named cache entry, of the kind of category (nightly,
+    latest or released), if it expires within the refresh lead,
+    is not cached or is older than its dependency (modified at
+    dependencyMtime) returning a tuple of its roots and a dictionary of its
+    refresh times as described in refreshCache.
+    """
+    with self.__privateClaimEntry(name):
+      with self.__privateOpenEntry(name) as entry:
+        (roots, mtime) = (entry.roots(), entry.mtime())
+
+      if ((roots is None)
+          or ((dependencyMtime is not None)
+              and (dependencyMtime > mtime))
+          or (time.time() >= (self.__privateExpiry(mtime, roots, kind)
+                              - self.__privateCategoryLead(kind)))):
+        log.info("Refreshing saved {0} {1}".format(self.className(), name))
+        (scanned, partial) = self.__privateScan(name, finder)
+        if partial:
+          log.warn("not saving partial {0} results"
+                    .format(self.className()))
+        else:
+          self.__privateReplaceEntry(name, scanned)
+          self.__privateListingStore.save()
+          roots = scanned
+          mtime = self.__privateStorage.mtime(name)
+
+    if roots is None:
+      return (None, { "refreshed" : None, "due" : None, "expires" : None })
+    expires = self.__privateExpiry(mtime, roots, kind)
+    return (roots, { "refreshed" : mtime,
+                     "due"       : expires - self.__privateCategoryLead(kind),
+                     "expires"   : expires })
 
   ####################################################################
-  def __privateSaveFile(self, openFile, roots):
-    openFile.write(json.dumps(roots))
-    openFile.flush()
-    os.fsync(openFile.fileno())
+  def __privateWalkedFileName(self, name):
+    return "walked.{0}".format(name)
@@ -0,0 +1,96 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import collections
+import time
+
+######################################################################
+######################################################################
+class Retrieval(object):
+  """A retrieval expressed as a generator which yields the operations,
+  Retrieval.Request and Retrieval.Sleep, it needs performed and receives
+  their results (or has their exceptions thrown into it).  The generator's
+  return value is the result of the retrieval.
+
+  Separating the retrieval logic from the performance of its operations
+  allows the same retrieval to be run synchronously, via run(), or within
+  an asyncio event loop, via runAsync().
+  """
+  # A request to be performed; the result is a tuple of the response
+  # status, headers (lower-cased keys) and body.
+  Request = collections.namedtuple("Request", ["netloc",
+                                               "method",
+                                               "path",
+                                               "headers",
+                                               "timeout"])
+
+  # A delay before continuing; the result is None.
+  Sleep = collections.namedtuple("Sleep", ["seconds"])
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def run(self, transport):
+    """Runs the retrieval synchronously performing its requests via the
+    specified transport which must provide a request method akin to that of
+    ConnectionPool.
+    """
+    return self.__drive(lambda operation: self.__perform(transport,
+                                                         operation))
+
+  ####################################################################
+  async def runAsync(self, transport):
+    """Runs the retrieval asynchronously performing its requests via the
+    specified transport which must provide request and sleep coroutine
+    methods akin to those of AsyncCrawler.
+    """
+    result = None
+    exception = None
+    while True:
+      try:
+        operation = (self.__generator.send(result) if exception is None
+                      else self.__generator.throw(exception))
+      except StopIteration as ex:
+        return ex.value
+      (result, exception) = (None, None)
+      try:
+        if isinstance(operation, self.Sleep):
+          await transport.sleep(operation.seconds)
+        else:
+          result = await transport.request(*operation)
+      except Exception as ex:
+        exception = ex
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, generator):
+    super(Retrieval, self).__init__()
+    self.__generator = generator
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __drive(self, perform):
+    result = None
+    exception = None
+    while True:
+      try:
+        operation = (self.__generator.send(result) if exception is None
+                      else self.__generator.throw(exception))
+      except StopIteration as ex:
+        return ex.value
+      (result, exception) = (None, None)
+      try:
+        result = perform(operation)
+      except Exception as ex:
+        exception = ex
+
+  ####################################################################
+  def __perform(self, transport, operation):
+    if isinstance(operation, self.Sleep):
+      time.sleep(operation.seconds)
+      return None
+    return transport.request(*operation)
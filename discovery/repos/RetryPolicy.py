@@ -0,0 +1,111 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import platform
+if int(platform.python_version_tuple()[0]) < 3:
+  import httplib
+  import urlparse
+else:
+  from http import client as httplib
+  from urllib import parse as urlparse
+
+import email.utils
+import random
+import socket
+import time
+
+######################################################################
+######################################################################
+class RetryPolicy(object):
+  """Classification of the responses to (and failures of) requests as
+  definitive, to be followed (redirects) or to be retried, and of the delay
+  before a retry.
+
+  Retries are delayed by an exponential backoff, with jitter, unless the
+  response specifies the delay via Retry-After.
+  """
+  # Statuses indicating the uri definitively does not exist.
+  __MISS_STATUSES = (404, 410)
+
+  # Statuses indicating the uri is to be requested from another location.
+  __REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+  # Statuses indicating a transient condition of the server.
+  __RETRY_STATUSES = (429,)
+
+  # Exceptions indicating a transient failure of the request; these include
+  # refused and reset connections, timeouts and name resolution failures.
+  retryExceptions = (socket.error, httplib.HTTPException)
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def delay(self, iteration, headers = None):
+    """Returns the number of seconds to wait before retrying following the
+    specified (zero-based) iteration's response headers, if any.
+    """
+    retryAfter = None
+    if headers is not None:
+      retryAfter = self.__retryAfter(headers.get("retry-after"))
+    if retryAfter is not None:
+      return min(self.__maxRetryAfter, retryAfter)
+    backoff = min(self.__maxBackoff, self.__baseBackoff * (1 << iteration))
+    return random.uniform(backoff / 2.0, backoff)
+
+  ####################################################################
+  def isMiss(self, status):
+    return status in self.__MISS_STATUSES
+
+  ####################################################################
+  def isRedirect(self, status):
+    return status in self.__REDIRECT_STATUSES
+
+  ####################################################################
+  def isRetryable(self, status):
+    return (status in self.__RETRY_STATUSES) or (status >= 500)
+
+  ####################################################################
+  def redirection(self, uri, headers, redirects):
+    """Returns the uri to which a redirect response for the uri redirects or
+    None if the response lacks a location, the redirect limit has been
+    reached given the number of redirects already followed or the location
+    is of another scheme (e.g., https for an http uri); requests are made
+    per the uri's scheme.
+    """
+    location = headers.get("location")
+    if (location is None) or (redirects >= self.__maxRedirects):
+      return None
+    location = urlparse.urljoin(uri, location)
+    if (urlparse.urlparse(location).scheme.lower()
+        != urlparse.urlparse(uri).scheme.lower()):
+      return None
+    return location
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, baseBackoff = 1, maxBackoff = 5, maxRetryAfter = 30,
+               maxRedirects = 5):
+    super(RetryPolicy, self).__init__()
+    self.__baseBackoff = baseBackoff
+    self.__maxBackoff = maxBackoff
+    self.__maxRetryAfter = maxRetryAfter
+    self.__maxRedirects = maxRedirects
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __retryAfter(self, value):
+    # Retry-After is either a number of seconds or an HTTP date.
+    if value is None:
+      return None
+    try:
+      return max(0, int(value))
+    except ValueError:
+      pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+      return None
+    return max(0, email.utils.mktime_tz(parsed) - time.time())
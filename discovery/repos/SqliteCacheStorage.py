@@ -0,0 +1,307 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import contextlib
+import errno
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .CacheStorage import CacheEntry, CacheStorage, CacheStorageBusyException
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class _SqliteCacheEntry(CacheEntry):
+  """Cache entry held in a row of the database; the row is read when the
+  entry is opened, as it cannot change while the entry is locked, and parsed
+  on first use.
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def close(self):
+    if self.__release is not None:
+      (release, self.__release) = (self.__release, None)
+      release()
+
+  ####################################################################
+  def mtime(self):
+    return None if self.roots() is None else self.__mtime
+
+  ####################################################################
+  def roots(self):
+    if self.__data is not None:
+      (data, self.__data) = (self.__data, None)
+      self.__roots = self._parse(data, self.__source)
+    return self.__roots
+
+  ####################################################################
+  def save(self, roots, mtime = None):
+    (data, self.__mtime) = self.__storage._save(self.__name, roots, mtime)
+    (self.__data, self.__roots) = (None, json.loads(data))
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, storage, name, source, data, mtime, release):
+    super(_SqliteCacheEntry, self).__init__()
+    self.__storage = storage
+    self.__name = name
+    self.__source = source
+    self.__data = data
+    self.__roots = None
+    self.__mtime = mtime
+    self.__release = release
+
+######################################################################
+######################################################################
+class _RangeLock(object):
+  """Reader/writer lock of one byte of a lock file; held, via lockf, by the
+  process whenever any of its threads holds it.  The writer may reacquire
+  the lock, either way, while holding it.
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def acquire(self, shared, blocking):
+    """Returns True if the lock is acquired or False if blocking is False
+    and another holds it.
+    """
+    me = threading.current_thread()
+    with self.__condition:
+      if self.__writer is me:
+        self.__depth += 1
+        return True
+      while (self.__writer is not None) or ((not shared)
+                                            and (self.__readers > 0)):
+        if not blocking:
+          return False
+        self.__condition.wait()
+      if self.__readers == 0:
+        # No thread of the process holds the lock.
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+          fcntl.lockf(self.__fd,
+                      operation if blocking else (operation | fcntl.LOCK_NB),
+                      1, self.__offset)
+        except (IOError, OSError) as ex:
+          if blocking or (ex.errno not in (errno.EAGAIN, errno.EACCES)):
+            raise
+          return False
+      if shared:
+        self.__readers += 1
+      else:
+        self.__writer = me
+        self.__depth = 1
+      return True
+
+  ####################################################################
+  def release(self):
+    with self.__condition:
+      if self.__writer is threading.current_thread():
+        self.__depth -= 1
+        if self.__depth > 0:
+          return
+        self.__writer = None
+      else:
+        self.__readers -= 1
+        if self.__readers > 0:
+          return
+      fcntl.lockf(self.__fd, fcntl.LOCK_UN, 1, self.__offset)
+      self.__condition.notify_all()
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, fd, offset):
+    super(_RangeLock, self).__init__()
+    self.__fd = fd
+    self.__offset = offset
+    self.__condition = threading.Condition(threading.Lock())
+    self.__readers = 0
+    self.__writer = None
+    self.__depth = 0
+
+######################################################################
+######################################################################
+class SqliteCacheStorage(CacheStorage):
+  """Cache storage holding the entries of every scope (e.g., repo class) in
+  a single SQLite database in write-ahead logging mode; readers do not block
+  (nor are blocked by) the writer, each entry is found by an indexed lookup
+  and each save is a transaction.
+
+  The database's synchronous setting is per the durability: FULL for
+  FSYNC, NORMAL for BATCH (whose sync() checkpoints the write-ahead log,
+  syncing it and the database) and OFF for NONE.
+
+  Entries are locked via byte-range locks, one byte (at an offset hashed
+  from the entry's scope and name) per entry, on a lock file alongside the
+  database.  As such locks are held by the process, rather than the open
+  file, each is shared by the process's threads as a reader/writer lock.
+  The storage is safe for use by multiple threads and processes.
+  """
+  # The byte-range lock file descriptors, keyed by path, and the locks,
+  # keyed by lock file path and offset.  The descriptors remain open as
+  # closing any descriptor of a file releases all the process's locks on
+  # it.
+  __lockFiles = {}
+  __locks = {}
+  __locksLock = threading.Lock()
+
+  # Seconds a connection waits on the database's write lock.
+  __TIMEOUT = 60
+
+  # The database's synchronous setting per durability.
+  __SYNCHRONOUS = { CacheStorage.FSYNC : "FULL",
+                    CacheStorage.BATCH : "NORMAL",
+                    CacheStorage.NONE  : "OFF" }
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  @contextlib.contextmanager
+  def claim(self, name, blocking = True):
+    release = self.__lock("refresh", name, blocking, False)
+    try:
+      yield release is not None
+    finally:
+      if release is not None:
+        release()
+
+  ####################################################################
+  def mtime(self, name):
+    """Returns, as does the entry, None if the named entry's row is
+    unreadable; the row is read, though not locked, to determine so.
+    """
+    row = self.__connection().execute(
+            "SELECT data, mtime FROM roots WHERE scope = ? AND name = ?",
+            (self.__scope, name)).fetchone()
+    if row is None:
+      return None
+    source = "{0}:{1}/{2}".format(self.__path, self.__scope, name)
+    with _SqliteCacheEntry(self, name, source, row[0], row[1],
+                           None) as entry:
+      return entry.mtime()
+
+  ####################################################################
+  def open(self, name, blocking = True, shared = False):
+    source = "{0}:{1}/{2}".format(self.__path, self.__scope, name)
+    release = self.__lock("entry", name, blocking, shared)
+    if release is None:
+      raise CacheStorageBusyException(source)
+    try:
+      row = self.__connection().execute(
+              "SELECT data, mtime FROM roots WHERE scope = ? AND name = ?",
+              (self.__scope, name)).fetchone()
+    except:
+      release()
+      raise
+    (data, mtime) = (None, None) if row is None else row
+    return _SqliteCacheEntry(self, name, source, data, mtime, release)
+
+  ####################################################################
+  def sync(self):
+    with self.__pendingLock:
+      (pending, self.__pending) = (self.__pending, False)
+    if pending:
+      self.__connection().execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, path, scope, durability = CacheStorage.FSYNC):
+    super(SqliteCacheStorage, self).__init__(durability)
+    self.__path = path
+    self.__lockPath = "{0}.lock".format(path)
+    self.__scope = scope
+    self.__local = threading.local()
+    # Whether, with BATCH durability, entries have been saved since the
+    # last sync.
+    self.__pending = False
+    self.__pendingLock = threading.Lock()
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _save(self, name, roots, mtime = None):
+    """Saves the roots to the named entry, which must be locked, returning
+    a tuple of the saved data and its mtime (now if mtime is None).
+    """
+    data = json.dumps(roots)
+    if mtime is None:
+      mtime = time.time()
+    with self.__connection() as connection:
+      connection.execute(
+        "INSERT OR REPLACE INTO roots (scope, name, data, mtime)"
+        " VALUES (?, ?, ?, ?)",
+        (self.__scope, name, data, mtime))
+    if self.durability() == self.BATCH:
+      with self.__pendingLock:
+        self.__pending = True
+    return (data, mtime)
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __connection(self):
+    """Returns the calling thread's connection to the database.
+    """
+    connection = getattr(self.__local, "connection", None)
+    if connection is None:
+      self.__makeDirectory()
+      os.close(os.open(self.__path, os.O_CREAT | os.O_RDWR, 0o640))
+      connection = sqlite3.connect(self.__path, timeout = self.__TIMEOUT)
+      connection.execute("PRAGMA journal_mode = WAL")
+      connection.execute("PRAGMA synchronous = {0}"
+                          .format(self.__SYNCHRONOUS[self.durability()]))
+      with connection:
+        connection.execute(
+          "CREATE TABLE IF NOT EXISTS roots"
+          " (scope TEXT NOT NULL, name TEXT NOT NULL, data TEXT NOT NULL,"
+          "  mtime REAL NOT NULL, PRIMARY KEY (scope, name))")
+      self.__local.connection = connection
+    return connection
+
+  ####################################################################
+  def __lock(self, kind, name, blocking, shared):
+    """Acquires the lock of the kind for the named entry returning the
+    function which releases it or, if blocking is False and another holds
+    the lock, None.
+    """
+    offset = zlib.crc32("{0}\0{1}\0{2}".format(kind, self.__scope,
+                                                name).encode("UTF-8"))
+    offset &= 0x7fffffff
+    with self.__locksLock:
+      if self.__lockPath not in self.__lockFiles:
+        self.__makeDirectory()
+        self.__lockFiles[self.__lockPath] = os.open(self.__lockPath,
+                                                    os.O_CREAT | os.O_RDWR,
+                                                    0o640)
+      key = (self.__lockPath, offset)
+      if key not in self.__locks:
+        self.__locks[key] = _RangeLock(self.__lockFiles[self.__lockPath],
+                                       offset)
+      lock = self.__locks[key]
+
+    if not lock.acquire(shared, blocking):
+      return None
+    return lock.release
+
+  ####################################################################
+  def __makeDirectory(self):
+    try:
+      os.makedirs(os.path.dirname(self.__path), 0o700)
+    except OSError as ex:
+      if ex.errno != errno.EEXIST:
+        raise
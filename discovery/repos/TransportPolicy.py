@@ -0,0 +1,187 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+######################################################################
+######################################################################
+class TransportPolicy(object):
+  """Per network location (i.e., host[:port]) limits on the requests made
+  to it: the maximum number of requests in flight, the rate of requests
+  (enforced by a token bucket), connect and read timeouts, the number of
+  attempts made of each retrieval and the consecutive failures after which,
+  and the seconds for which, its circuit opens (see CircuitBreaker).
+
+  The settings are a dictionary, as found in the transport section of the
+  defaults, whose top-level values apply to every network location and
+  whose "hosts" dictionary, keyed by host[:port] or host, overrides them
+  for specific network locations.  The policy is safe for use by multiple
+  threads.
+  """
+  # Default settings; None indicates no limit.
+  __DEFAULTS = { "circuit-cool-down" : 60,
+                 "circuit-threshold" : 5,
+                 "in-flight"         : None,
+                 "rate"              : None,
+                 "retries"           : 3,
+                 "timeouts"          : { "connect" : 10, "read" : 10 } }
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def circuitCoolDown(self, netloc):
+    """Returns the number of seconds for which the network location's
+    circuit remains open.
+    """
+    return self.__settings(netloc)["circuit-cool-down"]
+
+  ####################################################################
+  def circuitThreshold(self, netloc):
+    """Returns the number of consecutive connection failures to the network
+    location after which its circuit opens.
+    """
+    return self.__settings(netloc)["circuit-threshold"]
+
+  ####################################################################
+  def delay(self, netloc):
+    """Reserves a request to the network location returning the number of
+    seconds to wait before performing it so as to remain within its rate.
+    """
+    rate = self.__settings(netloc)["rate"]
+    if rate is None:
+      return 0
+    # The bucket holds at most a second's worth of requests (at least one).
+    capacity = max(1.0, rate)
+    with self.__lock:
+      now = time.time()
+      (tokens, last) = self.__buckets.get(netloc, (capacity, now))
+      tokens = min(capacity, tokens + ((now - last) * rate)) - 1
+      self.__buckets[netloc] = (tokens, now)
+    return 0 if tokens >= 0 else (-tokens / rate)
+
+  ####################################################################
+  def maxInFlight(self, netloc):
+    """Returns the maximum number of requests to the network location which
+    may be in flight or None if there is no maximum.
+    """
+    return self.__settings(netloc)["in-flight"]
+
+  ####################################################################
+  def retries(self, netloc):
+    """Returns the number of attempts to make of a retrieval from the
+    network location.
+    """
+    return self.__settings(netloc)["retries"]
+
+  ####################################################################
+  def semaphore(self, netloc):
+    """Returns the semaphore bounding the requests to the network location
+    in flight or None if they are not bounded.
+    """
+    maxInFlight = self.maxInFlight(netloc)
+    if maxInFlight is None:
+      return None
+    with self.__lock:
+      if netloc not in self.__semaphores:
+        self.__semaphores[netloc] = threading.BoundedSemaphore(maxInFlight)
+      return self.__semaphores[netloc]
+
+  ####################################################################
+  def timeouts(self, netloc):
+    """Returns a tuple of the connect and read timeouts, in seconds, for
+    requests to the network location.
+    """
+    timeouts = self.__settings(netloc)["timeouts"]
+    return (timeouts["connect"], timeouts["read"])
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, settings = None):
+    super(TransportPolicy, self).__init__()
+    self.__configured = {} if settings is None else settings
+    self.__lock = threading.Lock()
+    # Resolved settings, token buckets (as a tuple of tokens and time of
+    # last update) and semaphores; keyed by netloc.
+    self.__resolved = {}
+    self.__buckets = {}
+    self.__semaphores = {}
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __number(self, netloc, name, value, default, convert, minimum):
+    if value is None:
+      return default
+    try:
+      value = convert(value)
+    except (TypeError, ValueError):
+      log.warn("could not convert transport {0} for {1}: {2}"
+                .format(name, netloc, value))
+      log.info("using default transport {0}: {1}".format(name, default))
+      return default
+    if value < minimum:
+      log.debug("forcing transport {0} minimum: {1}".format(name, minimum))
+      value = minimum
+    return value
+
+  ####################################################################
+  def __resolve(self, netloc):
+    configured = {}
+    hosts = self.__configured.get("hosts") or {}
+    for source in (self.__configured,
+                   hosts.get(netloc.rsplit(":", 1)[0]) or {},
+                   hosts.get(netloc) or {}):
+      for (key, value) in source.items():
+        if value is None:
+          continue
+        if key == "timeouts":
+          # A single value applies to both connect and read.
+          if not isinstance(value, dict):
+            value = { "connect" : value, "read" : value }
+          configured.setdefault(key, {}).update(
+            dict([(k, v) for (k, v) in value.items() if v is not None]))
+        elif key != "hosts":
+          configured[key] = value
+
+    timeouts = configured.get("timeouts", {})
+    return {
+      "circuit-cool-down" : self.__number(netloc, "circuit-cool-down",
+                                          configured.get("circuit-cool-down"),
+                                          self.__DEFAULTS["circuit-cool-down"],
+                                          float, 0),
+      "circuit-threshold" : self.__number(netloc, "circuit-threshold",
+                                          configured.get("circuit-threshold"),
+                                          self.__DEFAULTS["circuit-threshold"],
+                                          int, 1),
+      "in-flight" : self.__number(netloc, "in-flight",
+                                  configured.get("in-flight"),
+                                  self.__DEFAULTS["in-flight"], int, 1),
+      "rate"      : self.__number(netloc, "rate",
+                                  configured.get("rate"),
+                                  self.__DEFAULTS["rate"], float, 0.001),
+      "retries"   : self.__number(netloc, "retries",
+                                  configured.get("retries"),
+                                  self.__DEFAULTS["retries"], int, 1),
+      "timeouts"  : {
+        "connect" : self.__number(netloc, "connect timeout",
+                                  timeouts.get("connect"),
+                                  self.__DEFAULTS["timeouts"]["connect"],
+                                  float, 0.001),
+        "read"    : self.__number(netloc, "read timeout",
+                                  timeouts.get("read"),
+                                  self.__DEFAULTS["timeouts"]["read"],
+                                  float, 0.001) } }
+
+  ####################################################################
+  def __settings(self, netloc):
+    with self.__lock:
+      if netloc not in self.__resolved:
+        self.__resolved[netloc] = self.__resolve(netloc)
+      return self.__resolved[netloc]
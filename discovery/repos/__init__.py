@@ -3,11 +3,17 @@
 #
 # Copyright Red Hat
 #
+from .CacheBundle import CacheBundle, CacheBundleException
+from .CacheStorage import CacheEntry, CacheStorage, CacheStorageBusyException
+from .CacheWarmer import CacheWarmer
 from .CentOS import CentOS
+from .CrawlArchive import CrawlArchive, CrawlArchiveException
 from .Fedora import Fedora
+from .FileCacheStorage import FileCacheStorage
 from .ReposCommand import ReposCommand
-from .Repository import Repository
+from .Repository import PartialResult, Repository
 from .RHEL import RHEL
+from .SqliteCacheStorage import SqliteCacheStorage
 
 from mill import command
 def repos():
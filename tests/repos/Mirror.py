@@ -0,0 +1,194 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import hashlib
+import os
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from http import server as httpserver
+
+######################################################################
+######################################################################
+class _MirrorHandler(httpserver.BaseHTTPRequestHandler):
+  """Serves the mirror's directory tree as Apache would; directories as
+  autoindex listings (compact if requested with ?F=0, else fancy, giving
+  their entries' modification times) validated by ETag.
+  """
+  protocol_version = "HTTP/1.1"
+  server_version = "Apache/2.4"
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def do_GET(self):
+    self.__respond(True)
+
+  ####################################################################
+  def do_HEAD(self):
+    self.__respond(False)
+
+  ####################################################################
+  def log_message(self, *args):
+    pass
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __listing(self, path, compact):
+    lines = []
+    for name in sorted(os.listdir(path)):
+      child = os.path.join(path, name)
+      if os.path.isdir(child):
+        name = "{0}/".format(name)
+      if compact:
+        lines.append("<li><a href=\"{0}\"> {0}</a></li>".format(name))
+      else:
+        lines.append("<a href=\"{0}\">{0}</a>      {1}    -".format(
+                      name,
+                      time.strftime("%d-%b-%Y %H:%M",
+                                    time.gmtime(os.stat(child).st_mtime))))
+    return "<html><body><pre>\n{0}\n</pre></body></html>\n".format(
+            "\n".join(lines)).encode("UTF-8")
+
+  ####################################################################
+  def __respond(self, withBody):
+    (path, _, query) = self.path.partition("?")
+    self.server.mirror._requested(self.command, self.path)
+    time.sleep(self.server.mirror._delay())
+    fsPath = os.path.join(self.server.mirror.root(), path.lstrip("/"))
+    headers = {}
+    if os.path.isdir(fsPath):
+      if not path.endswith("/"):
+        self.__send(301, { "Location" : "{0}/".format(path) }, b"", withBody)
+        return
+      body = self.__listing(fsPath, query == "F=0")
+      headers["ETag"] = "\"{0}\"".format(hashlib.md5(body).hexdigest())
+      if self.headers.get("If-None-Match") == headers["ETag"]:
+        self.__send(304, headers, b"", False)
+        return
+      headers["Content-Type"] = "text/html"
+      self.__send(200, headers, body, withBody)
+    elif os.path.isfile(fsPath):
+      with open(fsPath, "rb") as openFile:
+        self.__send(200, headers, openFile.read(), withBody)
+    else:
+      self.__send(404, headers, b"", withBody)
+
+  ####################################################################
+  def __send(self, status, headers, body, withBody):
+    self.send_response(status)
+    for (key, value) in headers.items():
+      self.send_header(key, value)
+    if status != 304:
+      self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    if withBody:
+      self.wfile.write(body)
+
+######################################################################
+######################################################################
+class _MirrorServer(socketserver.ThreadingMixIn, httpserver.HTTPServer):
+  daemon_threads = True
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def handle_error(self, request, clientAddress):
+    # Clients closing connections (e.g., those abandoning a response) are
+    # expected.
+    if not isinstance(sys.exc_info()[1], ConnectionError):
+      super(_MirrorServer, self).handle_error(request, clientAddress)
+
+######################################################################
+######################################################################
+class Mirror(object):
+  """Directory tree, in a temporary directory, served via HTTP on the
+  loopback interface; the requests made of it are recorded.
+  """
+  # The modification time given to the tree's directories by settle().
+  __SETTLED = time.time() - (7 * 24 * 60 * 60)
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  def add(self, path):
+    """Creates the directory at path, relative to the mirror's root, and
+    any missing parents.
+    """
+    os.makedirs(os.path.join(self.__root, path.lstrip("/")), exist_ok = True)
+
+  ####################################################################
+  def clearRequests(self):
+    with self.__lock:
+      self.__requests = []
+
+  ####################################################################
+  def close(self):
+    self.__server.shutdown()
+    self.__server.server_close()
+    shutil.rmtree(self.__root, ignore_errors = True)
+
+  ####################################################################
+  def netloc(self):
+    return "{0}:{1}".format(*self.__server.server_address)
+
+  ####################################################################
+  def requests(self):
+    """Returns a list of tuples of the method and path (with any query) of
+    the requests made since the mirror was started or its requests cleared.
+    """
+    with self.__lock:
+      return list(self.__requests)
+
+  ####################################################################
+  def root(self):
+    return self.__root
+
+  ####################################################################
+  def setDelay(self, seconds):
+    """Delays the mirror's responses by seconds.
+    """
+    with self.__lock:
+      self.__delay = seconds
+
+  ####################################################################
+  def settle(self):
+    """Sets the modification times of all the tree's directories to a week
+    ago so that later changes are evident in the listings.
+    """
+    for (directory, _, _) in os.walk(self.__root):
+      os.utime(directory, (self.__SETTLED, self.__SETTLED))
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self):
+    super(Mirror, self).__init__()
+    self.__root = tempfile.mkdtemp(prefix = "mirror.")
+    self.__lock = threading.Lock()
+    self.__requests = []
+    self.__delay = 0
+    self.__server = _MirrorServer(("127.0.0.1", 0), _MirrorHandler)
+    self.__server.mirror = self
+    threading.Thread(target = self.__server.serve_forever,
+                     name = "mirror",
+                     daemon = True).start()
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _delay(self):
+    with self.__lock:
+      return self.__delay
+
+  ####################################################################
+  def _requested(self, method, path):
+    with self.__lock:
+      self.__requests.append((method, path))
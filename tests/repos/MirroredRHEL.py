@@ -0,0 +1,130 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from discovery.repos import RHEL
+
+from Mirror import Mirror
+
+######################################################################
+######################################################################
+class MirroredRHEL(RHEL):
+  """RHEL whose repos are discovered from a Mirror per the class's settings,
+  keyed as are the repos defaults, rather than per the defaults.
+
+  The mirror's tree is that of RHEL's released repos; see addRelease().
+  The settings are passed, via the environment, to the processes refreshing
+  the repos in the background.
+  """
+  __SETTINGS = "MIRRORED_RHEL_SETTINGS"
+  settings = json.loads(os.environ.get(__SETTINGS, "{}"))
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  @classmethod
+  def addRelease(cls, mirror, release, architectures = ("x86_64",)):
+    """Adds the release (e.g., "9.1.0") to the mirror with repos for the
+    architectures.
+    """
+    major = int(release.split(".")[0])
+    path = "/rhel/RHEL-{0}/{1}/{2}".format(major,
+                                           release,
+                                           "Server" if major < 8
+                                                    else "BaseOS")
+    mirror.add(path)
+    for architecture in architectures:
+      mirror.add("{0}/{1}".format(path, architecture))
+
+  ####################################################################
+  def age(self, seconds = 30 * 24 * 60 * 60):
+    """Ages the cached results by seconds so that they have expired.
+    """
+    directory = self.cacheDirectory()
+    for name in os.listdir(directory):
+      if name.startswith(("agnostic.", "available.")) \
+          and name.endswith(".json"):
+        path = os.path.join(directory, name)
+        mtime = os.stat(path).st_mtime - seconds
+        os.utime(path, (mtime, mtime))
+
+  ####################################################################
+  @classmethod
+  def configure(cls, cacheRoot, mirror, **cache):
+    """Configures the class to discover repos from the mirror caching them in
+    cacheRoot with, additionally, the cache settings.
+    """
+    cache.update({ "directories" : { "root" : cacheRoot } })
+    cls.settings = { "cache" : cache,
+                     "rhel"  : { "hosts" : { "released" : mirror.netloc() },
+                                 "paths" : { "released" : "/rhel" } } }
+    os.environ[cls.__SETTINGS] = json.dumps(cls.settings)
+
+  ####################################################################
+  @classmethod
+  def create(cls, forceScan = False):
+    return cls(argparse.Namespace(forceScan = forceScan))
+
+  ####################################################################
+  @staticmethod
+  def joinRefreshes(timeout = 30):
+    """Waits for the processes refreshing repos in the background, this
+    process's only children, to exit.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+      try:
+        os.waitpid(-1, os.WNOHANG)
+      except ChildProcessError:
+        return
+      time.sleep(0.05)
+    raise AssertionError("background refreshes did not complete")
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def defaults(self, keys, *args, **kwargs):
+    if keys[0] == self.name().lower():
+      keys = ["rhel"] + keys[1:]
+    value = self.settings
+    for key in keys:
+      if (not isinstance(value, dict)) or (key not in value):
+        return None
+      value = value[key]
+    return value
+
+######################################################################
+######################################################################
+class MirroredRHELTestCase(unittest.TestCase):
+  """Discovers RHEL repos, 8.6 and 9.0 (and, for x86_64 only, 9.1), from a
+  mirror.
+  """
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(MirroredRHELTestCase, self).setUp()
+    self.mirror = Mirror()
+    self.addCleanup(self.mirror.close)
+    self.cacheRoot = tempfile.mkdtemp(prefix = "cache.")
+    self.addCleanup(shutil.rmtree, self.cacheRoot, True)
+    for release in ("8.6.0", "9.0.0"):
+      MirroredRHEL.addRelease(self.mirror, release, ("aarch64", "x86_64"))
+    MirroredRHEL.addRelease(self.mirror, "9.1.0")
+    self.mirror.settle()
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _available(self, repository, architecture = "x86_64"):
+    return sorted(repository.availableRoots(architecture).keys())
@@ -0,0 +1,148 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import asyncio
+import socket
+import unittest
+
+from discovery.repos.AsyncCrawler import AsyncCrawler
+from discovery.repos.TransportPolicy import TransportPolicy
+
+######################################################################
+######################################################################
+class _Server(object):
+  """HTTP/1.1 server, on the loopback interface, answering every request
+  with "ok" and counting the connections made to it.
+
+  If closing it closes each connection after its first response; if
+  announcing it so indicates via "Connection: close".  Responses are delayed
+  by delay seconds.
+  """
+
+  ####################################################################
+  # Public methods
+  ####################################################################
+  async def close(self):
+    self.__server.close()
+    await self.__server.wait_closed()
+
+  ####################################################################
+  def netloc(self):
+    return "127.0.0.1:{0}".format(
+                              self.__server.sockets[0].getsockname()[1])
+
+  ####################################################################
+  async def start(self):
+    self.__server = await asyncio.start_server(self.__serve, "127.0.0.1", 0)
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def __init__(self, closing = False, announcing = False, delay = 0):
+    super(_Server, self).__init__()
+    self.closing = closing
+    self.announcing = announcing
+    self.delay = delay
+    self.connections = 0
+    self.__server = None
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  async def __serve(self, reader, writer):
+    self.connections += 1
+    try:
+      while True:
+        line = await reader.readline()
+        if len(line) == 0:
+          break
+        while (await reader.readline()) not in (b"\r\n", b""):
+          pass
+        await asyncio.sleep(self.delay)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n"
+                     + (b"Connection: close\r\n" if self.announcing else b"")
+                     + b"\r\nok")
+        await writer.drain()
+        if self.closing or self.announcing:
+          break
+    finally:
+      writer.close()
+
+######################################################################
+######################################################################
+class TestAsyncCrawler(unittest.TestCase):
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testConnectionCloseHonoured(self):
+    server = _Server(announcing = True)
+    self.assertEqual(asyncio.run(self.__requests(server, 3)), [b"ok"] * 3)
+    self.assertEqual(server.connections, 3)
+
+  ####################################################################
+  def testInFlightWaitBoundedByTimeout(self):
+    server = _Server(delay = 0.5)
+    async def requests():
+      await server.start()
+      crawler = AsyncCrawler(transportPolicy = TransportPolicy({ "in-flight"
+                                                                   : 1 }))
+      try:
+        first = asyncio.ensure_future(self.__request(crawler, server))
+        await asyncio.sleep(0.1)
+        with self.assertRaises(socket.timeout):
+          await crawler.request(server.netloc(), "GET", "/", timeout = 0.1)
+        return await first
+      finally:
+        await server.close()
+    self.assertEqual(asyncio.run(requests()), b"ok")
+
+  ####################################################################
+  def testKeptAliveWithinSession(self):
+    server = _Server()
+    self.assertEqual(asyncio.run(self.__requests(server, 3)), [b"ok"] * 3)
+    self.assertEqual(server.connections, 1)
+
+  ####################################################################
+  def testNotKeptAliveOutsideSession(self):
+    server = _Server()
+    self.assertEqual(asyncio.run(self.__requests(server, 3, False)),
+                     [b"ok"] * 3)
+    self.assertEqual(server.connections, 3)
+
+  ####################################################################
+  def testServerClosedConnectionReplaced(self):
+    server = _Server(closing = True)
+    self.assertEqual(asyncio.run(self.__requests(server, 3)), [b"ok"] * 3)
+    self.assertEqual(server.connections, 3)
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  async def __requests(self, server, count, inSession = True):
+    # Makes count sequential requests of the server returning their bodies.
+    await server.start()
+    crawler = AsyncCrawler()
+    bodies = []
+    try:
+      if inSession:
+        async with crawler.session():
+          for _ in range(count):
+            bodies.append(await self.__request(crawler, server))
+      else:
+        for _ in range(count):
+          bodies.append(await self.__request(crawler, server))
+    finally:
+      await server.close()
+    return bodies
+
+  ####################################################################
+  async def __request(self, crawler, server):
+    (status, _, body) = await crawler.request(server.netloc(), "GET", "/")
+    self.assertEqual(status, 200)
+    return body
+
+if __name__ == "__main__":
+  unittest.main()
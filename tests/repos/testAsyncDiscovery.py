@@ -0,0 +1,60 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import asyncio
+import os
+import unittest
+
+from MirroredRHEL import MirroredRHEL, MirroredRHELTestCase
+
+######################################################################
+######################################################################
+class _ExecutorlessLoop(asyncio.SelectorEventLoop):
+  """Event loop failing any attempt to run a function in its executor.
+  """
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def run_in_executor(self, executor, func, *args):
+    raise AssertionError("{0} run in executor".format(func))
+
+######################################################################
+######################################################################
+class TestAsyncDiscovery(MirroredRHELTestCase):
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testAsyncMatchesSync(self):
+    MirroredRHEL.configure(os.path.join(self.cacheRoot, "sync"),
+                           self.mirror)
+    expected = MirroredRHEL.create(forceScan = True).availableRoots("x86_64")
+
+    MirroredRHEL.configure(os.path.join(self.cacheRoot, "async"),
+                           self.mirror)
+    repository = MirroredRHEL.create(forceScan = True)
+    self.assertEqual(asyncio.run(repository.availableRootsAsync("x86_64")),
+                     expected)
+    # The results were cached.
+    self.assertEqual(MirroredRHEL.create().availableRoots("x86_64"), expected)
+
+  ####################################################################
+  def testPassesRunOnLoop(self):
+    MirroredRHEL.configure(self.cacheRoot, self.mirror)
+    expected = MirroredRHEL.create(forceScan = True).availableRoots("x86_64")
+
+    # Discovery runs nothing in the loop's executor (i.e., its threads).
+    loop = _ExecutorlessLoop()
+    try:
+      self.assertEqual(loop.run_until_complete(
+                        MirroredRHEL.create(forceScan = True)
+                          .availableRootsAsync("x86_64")),
+                       expected)
+    finally:
+      loop.close()
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,94 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from discovery.repos import CacheBundle, CacheBundleException
+
+from Mirror import Mirror
+from MirroredRHEL import MirroredRHEL
+
+######################################################################
+######################################################################
+class TestCacheBundle(unittest.TestCase):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestCacheBundle, self).setUp()
+    self.directory = tempfile.mkdtemp(prefix = "bundle.")
+    self.addCleanup(shutil.rmtree, self.directory, True)
+    self.path = os.path.join(self.directory, "cache.bundle")
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testImportedCacheUsed(self):
+    mirror = Mirror()
+    self.addCleanup(mirror.close)
+    MirroredRHEL.addRelease(mirror, "9.0.0")
+    MirroredRHEL.configure(os.path.join(self.directory, "exporter"), mirror)
+    expected = MirroredRHEL.create().availableRoots("x86_64")
+
+    exported = MirroredRHEL.create().exportCache()
+    bundle = CacheBundle(self.path)
+    bundle.setEntries("RHEL", exported)
+    bundle.save()
+
+    bundle = CacheBundle(self.path)
+    bundle.load()
+    MirroredRHEL.configure(os.path.join(self.directory, "importer"), mirror)
+    importer = MirroredRHEL.create()
+    self.assertEqual(importer.importCache(bundle.entries("RHEL")),
+                     len(exported))
+    # Not replaced by results no more recent than those cached.
+    self.assertEqual(importer.importCache(bundle.entries("RHEL")), 0)
+
+    mirror.clearRequests()
+    self.assertEqual(MirroredRHEL.create().availableRoots("x86_64"), expected)
+    self.assertEqual(mirror.requests(), [])
+
+  ####################################################################
+  def testRoundTrip(self):
+    bundle = CacheBundle(self.path)
+    entries = [{ "name"         : "agnostic.released.json",
+                 "category"     : "released",
+                 "architecture" : None,
+                 "refreshed"    : 1.5,
+                 "roots"        : { "9.0" : "http://mirror/rhel/9.0" } }]
+    bundle.setEntries("RHEL", entries)
+    bundle.save()
+
+    loaded = CacheBundle(self.path)
+    loaded.load()
+    self.assertEqual(loaded.classNames(), ["RHEL"])
+    self.assertEqual(loaded.entries("RHEL"), entries)
+    self.assertEqual(loaded.entries("Fedora"), [])
+    self.assertEqual(loaded.created(), bundle.created())
+
+  ####################################################################
+  def testUnreadable(self):
+    with open(self.path, "w") as bundleFile:
+      bundleFile.write("not a bundle")
+    with self.assertRaises(CacheBundleException):
+      CacheBundle(self.path).load()
+
+  ####################################################################
+  def testUnsupportedVersion(self):
+    with gzip.open(self.path, "wb") as bundleFile:
+      bundleFile.write(json.dumps({ "version" : 2,
+                                    "created" : 1.5,
+                                    "classes" : {} }).encode("UTF-8"))
+    with self.assertRaises(CacheBundleException):
+      CacheBundle(self.path).load()
+
+if __name__ == "__main__":
+  unittest.main()
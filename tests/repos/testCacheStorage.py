@@ -0,0 +1,296 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from discovery.repos import (CacheStorage, CacheStorageBusyException,
+                             FileCacheStorage, SqliteCacheStorage)
+from discovery.repos.SqliteCacheStorage import _RangeLock
+
+######################################################################
+######################################################################
+class _CacheStorageTests(object):
+  """Tests of the lock semantics common to all cache storages; mixed into a
+  TestCase providing _storage().
+  """
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(_CacheStorageTests, self).setUp()
+    self.directory = tempfile.mkdtemp(prefix = "storage.")
+    self.addCleanup(shutil.rmtree, self.directory, True)
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testClaimExcludesOthers(self):
+    storage = self._storage()
+    with storage.claim("entry") as claimed:
+      self.assertTrue(claimed)
+      self.assertFalse(self.__inThread(lambda: self.__claimed(storage)))
+    self.assertTrue(self.__inThread(lambda: self.__claimed(storage)))
+
+  ####################################################################
+  def testClaimIndependentOfLock(self):
+    storage = self._storage()
+    with storage.claim("entry") as claimed:
+      self.assertTrue(claimed)
+      with storage.open("entry", blocking = False) as entry:
+        entry.save({ "9.0" : "uri" })
+    self.assertEqual(self.__roots(storage), { "9.0" : "uri" })
+
+  ####################################################################
+  def testExclusiveExcludesReaders(self):
+    storage = self._storage()
+    with storage.open("entry"):
+      self.assertIsInstance(
+        self.__inThread(lambda: self.__open(storage, shared = True)),
+        CacheStorageBusyException)
+
+  ####################################################################
+  def testExclusiveExcludesOtherProcesses(self):
+    storage = self._storage()
+    context = multiprocessing.get_context("fork")
+    (locked, release) = (context.Event(), context.Event())
+    process = context.Process(target = self.__holdExclusive,
+                              args = (locked, release))
+    process.start()
+    self.addCleanup(process.join, 10)
+    self.addCleanup(release.set)
+    self.assertTrue(locked.wait(10))
+    with self.assertRaises(CacheStorageBusyException):
+      self.__open(storage, shared = True)
+    release.set()
+    process.join(10)
+    self.assertEqual(self.__roots(storage), { "9.0" : "uri" })
+
+  ####################################################################
+  def testReadersShare(self):
+    storage = self._storage()
+    storage.replace("entry", { "9.0" : "uri" })
+    with storage.open("entry", shared = True) as entry:
+      self.assertEqual(entry.roots(), { "9.0" : "uri" })
+      self.assertEqual(
+        self.__inThread(lambda: self.__roots(storage, blocking = False)),
+        { "9.0" : "uri" })
+
+  ####################################################################
+  def testReadersExcludeWriters(self):
+    storage = self._storage()
+    with storage.open("entry", shared = True):
+      self.assertIsInstance(self.__inThread(lambda: self.__open(storage)),
+                            CacheStorageBusyException)
+
+  ####################################################################
+  def testReplaceAwaitsReaders(self):
+    storage = self._storage()
+    storage.replace("entry", { "9.0" : "uri" })
+    replaced = threading.Event()
+    with storage.open("entry", shared = True) as entry:
+      thread = threading.Thread(
+                target = lambda: (storage.replace("entry", { "9.1" : "uri" }),
+                                  replaced.set()))
+      thread.start()
+      self.assertFalse(replaced.wait(0.5))
+      self.assertEqual(entry.roots(), { "9.0" : "uri" })
+    thread.join(10)
+    self.assertTrue(replaced.is_set())
+    self.assertEqual(self.__roots(storage), { "9.1" : "uri" })
+
+  ####################################################################
+  def testReplaceRetainsMtime(self):
+    storage = self._storage()
+    mtime = time.time() - 3600
+    storage.replace("entry", { "9.0" : "uri" }, mtime)
+    self.assertAlmostEqual(storage.mtime("entry"), mtime, places = 2)
+    self.assertIsNone(storage.mtime("missing"))
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __claimed(self, storage):
+    with storage.claim("entry", blocking = False) as claimed:
+      return claimed
+
+  ####################################################################
+  def __holdExclusive(self, locked, release):
+    storage = self._storage()
+    with storage.open("entry") as entry:
+      entry.save({ "9.0" : "uri" })
+      locked.set()
+      release.wait(10)
+    os._exit(0)
+
+  ####################################################################
+  def __inThread(self, function):
+    # Returns the result of, or the exception raised by, function in
+    # another thread.
+    results = []
+    def run():
+      try:
+        results.append(function())
+      except Exception as ex:
+        results.append(ex)
+    thread = threading.Thread(target = run)
+    thread.start()
+    thread.join(10)
+    return results[0]
+
+  ####################################################################
+  def __open(self, storage, shared = False):
+    with storage.open("entry", blocking = False, shared = shared):
+      return True
+
+  ####################################################################
+  def __roots(self, storage, blocking = True):
+    with storage.open("entry", blocking = blocking, shared = True) as entry:
+      return entry.roots()
+
+######################################################################
+######################################################################
+class TestFileCacheStorage(_CacheStorageTests, unittest.TestCase):
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testBatchSyncsWrittenEntries(self):
+    storage = self._storage(CacheStorage.BATCH)
+    storage.replace("entry", { "9.0" : "uri" })
+    synced = []
+    fsync = os.fsync
+    def recordingFsync(fd):
+      synced.append(os.readlink("/proc/self/fd/{0}".format(fd)))
+      fsync(fd)
+    os.fsync = recordingFsync
+    try:
+      storage.sync()
+      storage.sync()
+    finally:
+      os.fsync = fsync
+    self.assertEqual(synced, [os.path.join(self.directory, "entry"),
+                              self.directory])
+
+  ####################################################################
+  def testUnreadableEntryHasNoRoots(self):
+    storage = self._storage()
+    with open(os.path.join(self.directory, "entry"), "w") as entryFile:
+      entryFile.write("{\"9.0\" : ")
+    self.assertIsNone(self._CacheStorageTests__roots(storage))
+    self.assertIsNone(storage.mtime("entry"))
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _storage(self, durability = CacheStorage.FSYNC):
+    return FileCacheStorage(self.directory, durability)
+
+######################################################################
+######################################################################
+class TestSqliteCacheStorage(_CacheStorageTests, unittest.TestCase):
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testScopesIndependent(self):
+    storage = self._storage()
+    storage.replace("entry", { "9.0" : "uri" })
+    other = SqliteCacheStorage(os.path.join(self.directory, "cache.db"),
+                               "other")
+    with other.open("entry", blocking = False) as entry:
+      self.assertIsNone(entry.roots())
+
+  ####################################################################
+  # Protected methods
+  ####################################################################
+  def _storage(self, durability = CacheStorage.FSYNC):
+    return SqliteCacheStorage(os.path.join(self.directory, "cache.db"),
+                              "RHEL", durability)
+
+######################################################################
+######################################################################
+class TestRangeLock(unittest.TestCase):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestRangeLock, self).setUp()
+    (fd, path) = tempfile.mkstemp(prefix = "lock.")
+    self.addCleanup(os.unlink, path)
+    self.addCleanup(os.close, fd)
+    self.lock = _RangeLock(fd, 0)
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testReadersShare(self):
+    self.assertTrue(self.lock.acquire(True, False))
+    self.assertTrue(self.__inThread(lambda: self.__acquired(True)))
+    self.assertFalse(self.__inThread(lambda: self.__acquired(False)))
+    self.lock.release()
+    self.assertTrue(self.__inThread(lambda: self.__acquired(False)))
+
+  ####################################################################
+  def testWriterExcludesOthers(self):
+    self.assertTrue(self.lock.acquire(False, False))
+    self.assertFalse(self.__inThread(lambda: self.__acquired(True)))
+    self.assertFalse(self.__inThread(lambda: self.__acquired(False)))
+    self.lock.release()
+    self.assertTrue(self.__inThread(lambda: self.__acquired(True)))
+
+  ####################################################################
+  def testWriterReacquires(self):
+    self.assertTrue(self.lock.acquire(False, False))
+    self.assertTrue(self.lock.acquire(True, False))
+    self.assertTrue(self.lock.acquire(False, False))
+    self.lock.release()
+    self.lock.release()
+    # Still held until the outermost release.
+    self.assertFalse(self.__inThread(lambda: self.__acquired(True)))
+    self.lock.release()
+    self.assertTrue(self.__inThread(lambda: self.__acquired(True)))
+
+  ####################################################################
+  def testBlockedWriterWakes(self):
+    self.assertTrue(self.lock.acquire(True, False))
+    acquired = threading.Event()
+    def write():
+      self.lock.acquire(False, True)
+      acquired.set()
+      self.lock.release()
+    thread = threading.Thread(target = write)
+    thread.start()
+    self.assertFalse(acquired.wait(0.2))
+    self.lock.release()
+    thread.join(10)
+    self.assertTrue(acquired.is_set())
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __acquired(self, shared):
+    if not self.lock.acquire(shared, False):
+      return False
+    self.lock.release()
+    return True
+
+  ####################################################################
+  def __inThread(self, function):
+    results = []
+    thread = threading.Thread(target = lambda: results.append(function()))
+    thread.start()
+    thread.join(10)
+    return results[0]
+
+if __name__ == "__main__":
+  unittest.main()
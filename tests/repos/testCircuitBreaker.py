@@ -0,0 +1,85 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import socket
+import time
+import unittest
+
+from discovery.repos.CircuitBreaker import CircuitBreaker, CircuitOpenException
+
+######################################################################
+######################################################################
+class TestCircuitBreaker(unittest.TestCase):
+  __NETLOC = "mirror.example.com"
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestCircuitBreaker, self).setUp()
+    self.breaker = CircuitBreaker(threshold = 2, coolDown = 0.2)
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testFailedProbeReopens(self):
+    self.__open()
+    time.sleep(0.25)
+    self.__fail()
+    with self.assertRaises(CircuitOpenException):
+      self.__succeed()
+
+  ####################################################################
+  def testHalfOpenAdmitsSingleProbe(self):
+    self.__open()
+    time.sleep(0.25)
+    with self.breaker.attempt(self.__NETLOC):
+      with self.assertRaises(CircuitOpenException):
+        self.__succeed()
+
+  ####################################################################
+  def testOpensAfterThreshold(self):
+    self.__fail()
+    self.__succeed()
+    self.__fail()
+    # The failures were not consecutive.
+    self.__succeed()
+    self.__open()
+    with self.assertRaises(CircuitOpenException):
+      self.__succeed()
+    # Other network locations are unaffected.
+    with self.breaker.attempt("other.example.com"):
+      pass
+
+  ####################################################################
+  def testSuccessfulProbeCloses(self):
+    self.__open()
+    time.sleep(0.25)
+    self.__succeed()
+    self.__succeed()
+    self.__fail()
+    # The failure count restarted on closing.
+    self.__succeed()
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __fail(self):
+    with self.assertRaises(socket.timeout):
+      with self.breaker.attempt(self.__NETLOC):
+        raise socket.timeout("timed out")
+
+  ####################################################################
+  def __open(self):
+    for _ in range(2):
+      self.__fail()
+
+  ####################################################################
+  def __succeed(self):
+    with self.breaker.attempt(self.__NETLOC):
+      pass
+
+if __name__ == "__main__":
+  unittest.main()
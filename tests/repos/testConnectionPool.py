@@ -0,0 +1,68 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import gc
+import socket
+import time
+import unittest
+import weakref
+
+from discovery.repos.ConnectionPool import ConnectionPool
+from discovery.repos.TransportPolicy import TransportPolicy
+
+from Mirror import Mirror
+
+######################################################################
+######################################################################
+class TestConnectionPool(unittest.TestCase):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestConnectionPool, self).setUp()
+    self.mirror = Mirror()
+    self.addCleanup(self.mirror.close)
+    self.mirror.add("/rhel")
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testDiscardedPoolCollected(self):
+    pool = ConnectionPool()
+    self.assertEqual(pool.request(self.mirror.netloc(), "GET", "/rhel/")[0],
+                     200)
+    reference = weakref.ref(pool)
+    del pool
+    gc.collect()
+    self.assertIsNone(reference())
+
+  ####################################################################
+  def testInFlightWaitBoundedByTimeout(self):
+    pool = ConnectionPool(transportPolicy = TransportPolicy({ "in-flight"
+                                                                : 1 }))
+    self.addCleanup(pool.close)
+    with pool.response(self.mirror.netloc(), "GET", "/rhel/") as response:
+      start = time.time()
+      with self.assertRaises(socket.timeout):
+        pool.request(self.mirror.netloc(), "GET", "/rhel/", timeout = 0.2)
+      self.assertLess(time.time() - start, 2)
+      response.read()
+    self.assertEqual(pool.request(self.mirror.netloc(), "GET", "/rhel/",
+                                  timeout = 0.2)[0],
+                     200)
+
+  ####################################################################
+  def testRequests(self):
+    pool = ConnectionPool()
+    self.addCleanup(pool.close)
+    for _ in range(2):
+      (status, headers, body) = pool.request(self.mirror.netloc(), "GET",
+                                             "/rhel/")
+      self.assertEqual(status, 200)
+      self.assertEqual(int(headers["content-length"]), len(body))
+
+if __name__ == "__main__":
+  unittest.main()
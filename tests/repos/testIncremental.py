@@ -0,0 +1,103 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import os
+import unittest
+
+from MirroredRHEL import MirroredRHEL, MirroredRHELTestCase
+
+######################################################################
+######################################################################
+class TestIncremental(MirroredRHELTestCase):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestIncremental, self).setUp()
+    MirroredRHEL.configure(self.cacheRoot, self.mirror, incremental = True)
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testChangedVersionWalked(self):
+    repository = MirroredRHEL.create()
+    self.assertEqual(self._available(repository), ["8.6", "9.0", "9.1"])
+
+    MirroredRHEL.addRelease(self.mirror, "9.2.0")
+    repository.age()
+    self.mirror.clearRequests()
+    repository.refreshCache("x86_64")
+    self.assertEqual(self._available(MirroredRHEL.create()),
+                     ["8.6", "9.0", "9.1", "9.2"])
+
+    # Only the changed major's minors are listed anew and only the new minor
+    # is probed.
+    listed = [path.partition("?")[0] for (_, path) in self.mirror.requests()]
+    self.assertIn("/rhel/RHEL-9/", listed)
+    self.assertNotIn("/rhel/RHEL-8/", listed)
+    self.assertEqual([path for path in listed if "BaseOS" in path],
+                     ["/rhel/RHEL-9/9.2.0/BaseOS/"])
+
+  ####################################################################
+  def testMissesReprobed(self):
+    repository = MirroredRHEL.create()
+    self.assertEqual(self._available(repository, "aarch64"), ["8.6", "9.0"])
+
+    self.mirror.add("/rhel/RHEL-9/9.1.0/BaseOS/aarch64")
+    repository.age()
+    repository.refreshCache("aarch64")
+    self.assertEqual(self._available(MirroredRHEL.create(), "aarch64"),
+                     ["8.6", "9.0", "9.1"])
+
+    # Still re-probed once found; i.e., not carried forward as a miss from
+    # the first scan.
+    repository.age()
+    repository.refreshCache("aarch64")
+    self.assertEqual(self._available(MirroredRHEL.create(), "aarch64"),
+                     ["8.6", "9.0", "9.1"])
+
+  ####################################################################
+  def testRecentlyModifiedRewalked(self):
+    # The major's directory is modified within a minute of its walk.
+    MirroredRHEL.addRelease(self.mirror, "9.2.0")
+    repository = MirroredRHEL.create()
+    self.assertEqual(self._available(repository),
+                     ["8.6", "9.0", "9.1", "9.2"])
+
+    repository.age()
+    self.mirror.clearRequests()
+    repository.refreshCache("x86_64")
+    listed = [path.partition("?")[0] for (_, path) in self.mirror.requests()]
+    self.assertIn("/rhel/RHEL-9/", listed)
+    self.assertNotIn("/rhel/RHEL-8/", listed)
+
+  ####################################################################
+  def testUnchangedRescan(self):
+    repository = MirroredRHEL.create()
+    self.assertEqual(self._available(repository), ["8.6", "9.0", "9.1"])
+
+    repository.age()
+    self.mirror.clearRequests()
+    repository.refreshCache("x86_64")
+    self.assertEqual(self._available(MirroredRHEL.create()),
+                     ["8.6", "9.0", "9.1"])
+    self.assertEqual(self.mirror.requests(), [("GET", "/rhel/?F=1")])
+
+  ####################################################################
+  def testWalkedOnlyIfIncremental(self):
+    MirroredRHEL.configure(self.cacheRoot, self.mirror)
+    repository = MirroredRHEL.create()
+    self.assertEqual(self._available(repository), ["8.6", "9.0", "9.1"])
+    # Detailed (rather than compact) listings are not requested.
+    self.assertEqual([path for (_, path) in self.mirror.requests()
+                       if path.endswith("?F=1")],
+                     [])
+    self.assertEqual([name for name in os.listdir(repository.cacheDirectory())
+                       if name.startswith(("probed.", "walked."))],
+                     [])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,54 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import unittest
+
+from discovery.repos.RetryPolicy import RetryPolicy
+
+######################################################################
+######################################################################
+class TestRetryPolicy(unittest.TestCase):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestRetryPolicy, self).setUp()
+    self.policy = RetryPolicy(maxRedirects = 2)
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testClassification(self):
+    self.assertTrue(self.policy.isMiss(404))
+    self.assertFalse(self.policy.isRetryable(404))
+    self.assertTrue(self.policy.isRetryable(429))
+    self.assertTrue(self.policy.isRetryable(503))
+    self.assertTrue(self.policy.isRedirect(301))
+
+  ####################################################################
+  def testCrossSchemeRedirectUnfollowable(self):
+    self.assertIsNone(self.policy.redirection(
+                        "http://mirror/rhel/",
+                        { "location" : "https://mirror/rhel/" },
+                        0))
+
+  ####################################################################
+  def testRedirectLimit(self):
+    headers = { "location" : "/pub/rhel/" }
+    self.assertEqual(self.policy.redirection("http://mirror/rhel/", headers,
+                                             1),
+                     "http://mirror/pub/rhel/")
+    self.assertIsNone(self.policy.redirection("http://mirror/rhel/", headers,
+                                              2))
+    self.assertIsNone(self.policy.redirection("http://mirror/rhel/", {}, 0))
+
+  ####################################################################
+  def testRetryAfter(self):
+    self.assertEqual(self.policy.delay(0, { "retry-after" : "3" }), 3)
+    self.assertLessEqual(self.policy.delay(10), 5)
+
+if __name__ == "__main__":
+  unittest.main()
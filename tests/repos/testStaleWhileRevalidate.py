@@ -0,0 +1,91 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from MirroredRHEL import MirroredRHEL, MirroredRHELTestCase
+
+######################################################################
+######################################################################
+class TestStaleWhileRevalidate(MirroredRHELTestCase):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestStaleWhileRevalidate, self).setUp()
+    MirroredRHEL.configure(self.cacheRoot, self.mirror,
+                           **{ "stale-while-revalidate" : True })
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testAvailableRefreshedFromRefreshedAgnostic(self):
+    repository = MirroredRHEL.create()
+    self.assertEqual(self._available(repository), ["8.6", "9.0", "9.1"])
+
+    MirroredRHEL.addRelease(self.mirror, "9.2.0")
+    repository.age()
+
+    # The stale results are served while they are refreshed.
+    self.assertEqual(self._available(MirroredRHEL.create()),
+                     ["8.6", "9.0", "9.1"])
+    MirroredRHEL.joinRefreshes()
+
+    # The available results were refreshed from the refreshed agnostic
+    # results and not before them.
+    self.assertEqual(self._available(MirroredRHEL.create()),
+                     ["8.6", "9.0", "9.1", "9.2"])
+    directory = repository.cacheDirectory()
+    self.assertGreaterEqual(
+      os.stat(os.path.join(directory,
+                           "available.released.x86_64.json")).st_mtime,
+      os.stat(os.path.join(directory, "agnostic.released.json")).st_mtime)
+
+  ####################################################################
+  def testRefreshOutlivesRequester(self):
+    repository = MirroredRHEL.create()
+    self.assertEqual(self._available(repository), ["8.6", "9.0", "9.1"])
+
+    MirroredRHEL.addRelease(self.mirror, "9.2.0")
+    repository.age()
+    self.mirror.setDelay(0.5)
+
+    # The requesting process exits, with the stale results, without awaiting
+    # their refresh.
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(sys.path)
+    requester = subprocess.run(
+                  [sys.executable, "-c",
+                   "from MirroredRHEL import MirroredRHEL;"
+                   " print(sorted(MirroredRHEL.create()"
+                   ".availableRoots('x86_64')))"],
+                  env = environment,
+                  stdout = subprocess.PIPE,
+                  timeout = 30)
+    self.assertEqual(requester.stdout.decode().strip(),
+                     "['8.6', '9.0', '9.1']")
+    available = os.path.join(repository.cacheDirectory(),
+                             "available.released.x86_64.json")
+    self.assertNotIn("9.2", self.__read(available))
+
+    deadline = time.time() + 30
+    while (time.time() < deadline) and ("9.2" not in self.__read(available)):
+      time.sleep(0.1)
+    self.assertIn("9.2", self.__read(available))
+
+  ####################################################################
+  # Private methods
+  ####################################################################
+  def __read(self, path):
+    with open(path) as openFile:
+      return openFile.read()
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,47 @@
+#
+# SPDX-License-Identifier: GPL-2.0-only
+#
+# Copyright Red Hat
+#
+import unittest
+
+from MirroredRHEL import MirroredRHEL, MirroredRHELTestCase
+
+######################################################################
+######################################################################
+class TestStreamedListings(MirroredRHELTestCase):
+
+  ####################################################################
+  # Overridden methods
+  ####################################################################
+  def setUp(self):
+    super(TestStreamedListings, self).setUp()
+    MirroredRHEL.configure(self.cacheRoot, self.mirror)
+    for index in range(2000):
+      self.mirror.add("/rhel/listing/{0:04d}".format(index))
+    self.uri = "http://{0}/rhel/listing/".format(self.mirror.netloc())
+
+  ####################################################################
+  # Test methods
+  ####################################################################
+  def testCompleteListingCached(self):
+    repository = MirroredRHEL.create()
+    self.assertEqual(len(list(repository._uri_streamed_entries(self.uri))),
+                     2000)
+    self.assertEqual(len(repository._uri_entries(self.uri)), 2000)
+    self.assertEqual(len(self.mirror.requests()), 1)
+
+  ####################################################################
+  def testStoppedListingNotCached(self):
+    repository = MirroredRHEL.create()
+    entries = repository._uri_streamed_entries(self.uri)
+    self.assertEqual(next(entries).name, "0000")
+    entries.close()
+    self.assertEqual(len(self.mirror.requests()), 1)
+
+    # The partial listing was not cached.
+    self.assertEqual(len(repository._uri_entries(self.uri)), 2000)
+    self.assertEqual(len(self.mirror.requests()), 2)
+
+if __name__ == "__main__":
+  unittest.main()